@@ -0,0 +1,258 @@
+"""
+Result Compaction
+Shrinks action results before they are sent to the LLM for synthesis
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional, Set
+from bs4 import BeautifulSoup
+
+
+# Rough size of a token for English text and markup; close enough for budgeting
+CHARS_PER_TOKEN = 4
+
+HTML_PATTERN = re.compile(r"<(html|head|body|div|p|span|table|article|section)[\s>]", re.IGNORECASE)
+
+# Elements that never hold content worth summarizing
+BOILERPLATE_TAGS = [
+    "script", "style", "noscript", "svg", "iframe", "template",
+    "nav", "header", "footer", "aside", "form", "button"
+]
+
+META_FIELDS = {
+    "description": "description",
+    "og:title": "og_title",
+    "og:description": "og_description",
+    "og:type": "og_type",
+    "og:site_name": "site_name"
+}
+
+
+def estimate_tokens(value: Any) -> int:
+    """
+    Estimate the prompt tokens a value takes once serialized
+    
+    Args:
+        value: String or JSON-serializable value
+    
+    Returns:
+        Approximate token count
+    """
+    text = value if isinstance(value, str) else json.dumps(value, default=str)
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def compact_results(
+    results: List[Any],
+    result_tokens: int = 2000,
+    total_tokens: Optional[int] = 12000
+) -> List[Any]:
+    """
+    Compact action results for the synthesis prompt
+    
+    1. HTML strings are replaced by their readable text and structured
+       fields (title, meta description, headings, JSON-LD).
+    2. Lines repeated across results (menus, cookie banners, footers) are
+       kept only in the first result they appear in.
+    3. Each result is cut to its share of the token budget: at most
+       result_tokens, and together at most total_tokens, with the unused
+       share of small results handed to the larger ones.
+    
+    Args:
+        results: Raw action results
+        result_tokens: Token budget per result
+        total_tokens: Token budget for all results together (None for no
+            overall limit)
+    
+    Returns:
+        Compacted copies of the results, in the same order
+    """
+    pages: List[Dict[str, Any]] = []
+    compacted = [_extract(result, pages) for result in results]
+    _dedupe_lines(pages)
+    
+    return fit_budget(compacted, result_tokens, total_tokens)
+
+
+def fit_budget(
+    results: List[Any],
+    result_tokens: int,
+    total_tokens: Optional[int] = None
+) -> List[Any]:
+    """
+    Truncate results to a per-result and total token budget
+    
+    Args:
+        results: JSON-serializable results
+        result_tokens: Token budget per result
+        total_tokens: Token budget for all results together (None for no
+            overall limit)
+    
+    Returns:
+        Results that fit the budget, in the same order
+    """
+    sizes = [estimate_tokens(result) for result in results]
+    if total_tokens is None:
+        total_tokens = result_tokens * len(results)
+    budgets = _share_budget(sizes, result_tokens, total_tokens)
+    
+    return [
+        _fit(result, budget * CHARS_PER_TOKEN) if size > budget else result
+        for result, size, budget in zip(results, sizes, budgets)
+    ]
+
+
+def extract_page(html: str) -> Dict[str, Any]:
+    """
+    Extract readable text and structured fields from an HTML document
+    
+    Args:
+        html: HTML document or fragment
+    
+    Returns:
+        Dictionary with title, meta fields, headings, JSON-LD data and text
+    """
+    soup = BeautifulSoup(html, "lxml")
+    page: Dict[str, Any] = {}
+    
+    if soup.title and soup.title.string:
+        page["title"] = soup.title.string.strip()
+    
+    for meta in soup.find_all("meta"):
+        key = META_FIELDS.get(meta.get("name") or meta.get("property") or "")
+        if key and meta.get("content"):
+            page[key] = meta["content"].strip()
+    
+    structured = []
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            structured.append(json.loads(script.string or ""))
+        except ValueError:
+            continue
+    if structured:
+        page["structured_data"] = structured
+    
+    for tag in soup(BOILERPLATE_TAGS):
+        tag.decompose()
+    
+    headings = [
+        heading.get_text(" ", strip=True)
+        for heading in soup.find_all(["h1", "h2", "h3"])
+    ]
+    if headings:
+        page["headings"] = [heading for heading in headings if heading]
+    
+    body = soup.find("main") or soup.find("article") or soup.body or soup
+    page["text"] = _clean_text(body.get_text("\n"))
+    
+    return page
+
+
+def _extract(value: Any, pages: List[Dict[str, Any]]) -> Any:
+    """Replace HTML strings inside a result with extracted page content"""
+    if isinstance(value, str):
+        if len(value) > 200 and HTML_PATTERN.search(value):
+            page = extract_page(value)
+            pages.append(page)
+            return page
+        return value
+    
+    if isinstance(value, dict):
+        return {key: _extract(item, pages) for key, item in value.items()}
+    
+    if isinstance(value, list):
+        return [_extract(item, pages) for item in value]
+    
+    return value
+
+
+def _clean_text(text: str) -> str:
+    """Collapse whitespace and drop empty and repeated lines"""
+    lines = []
+    seen: Set[str] = set()
+    
+    for line in text.splitlines():
+        line = " ".join(line.split())
+        if line and line not in seen:
+            seen.add(line)
+            lines.append(line)
+    
+    return "\n".join(lines)
+
+
+def _dedupe_lines(pages: List[Dict[str, Any]]):
+    """Drop page text lines already seen on an earlier page (in place)"""
+    seen: Set[str] = set()
+    
+    for page in pages:
+        lines = [line for line in page["text"].split("\n") if line not in seen]
+        seen.update(lines)
+        page["text"] = "\n".join(lines)
+
+
+def _share_budget(sizes: List[int], result_tokens: int, total_tokens: int) -> List[int]:
+    """
+    Split the total budget over results (water-filling)
+    
+    Results smaller than an equal share keep their size, and what they
+    leave over is split between the rest.
+    """
+    budgets = [0] * len(sizes)
+    remaining = total_tokens
+    pending = sorted(range(len(sizes)), key=lambda index: sizes[index])
+    
+    while pending:
+        share = min(result_tokens, remaining // len(pending))
+        index = pending.pop(0)
+        budgets[index] = min(sizes[index], share)
+        remaining -= budgets[index]
+    
+    return budgets
+
+
+def _fit(value: Any, max_chars: int) -> Any:
+    """Truncate a value until it fits max_chars (keys and markers add overhead)"""
+    target = max_chars
+    
+    for _ in range(3):
+        fitted = _truncate(value, target)
+        size = len(json.dumps(fitted, default=str))
+        if size <= max_chars:
+            break
+        target = int(target * max_chars / size)
+    
+    return fitted
+
+
+def _truncate(value: Any, max_chars: int) -> Any:
+    """
+    Shrink a value to roughly max_chars once serialized
+    
+    Long strings and lists are cut in proportion to how far the value is
+    over budget; the largest parts shrink the most.
+    """
+    size = len(json.dumps(value, default=str))
+    if size <= max_chars:
+        return value
+    
+    ratio = max_chars / size
+    
+    if isinstance(value, str):
+        keep = max(0, int(len(value) * ratio) - 20)
+        return value[:keep] + " [truncated]"
+    
+    if isinstance(value, dict):
+        return {
+            key: _truncate(item, max(50, int(len(json.dumps(item, default=str)) * ratio)))
+            for key, item in value.items()
+        }
+    
+    if isinstance(value, list):
+        keep = max(1, int(len(value) * ratio))
+        items = [_truncate(item, max(50, max_chars // keep)) for item in value[:keep]]
+        if keep < len(value):
+            items.append(f"[{len(value) - keep} more items truncated]")
+        return items
+    
+    return value
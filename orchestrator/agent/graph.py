@@ -2,25 +2,73 @@
 LangGraph Agent Definition
 """
 
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple
 from langgraph.graph import StateGraph, END
-from langchain_openai import ChatOpenAI
 from .state import AgentState
-from .nodes import AgentNodes
+from .nodes import AgentNodes, checkpoint_sink, event_sink
 from .tools import ExtensionTools
-from config import settings
+from services.checkpoint_store import checkpoint_store
+from services.llm_gateway import llm_gateway
+
+
+def explicit_plan(request: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Build a plan from the actions given in a task request
+    
+    Args:
+        request: Task request dictionary
+    
+    Returns:
+        Plan to execute without LLM planning, or None if the request
+        asks for planning or carries no actions
+    """
+    if request.get("needsPlanning"):
+        return None
+    
+    if request.get("actions"):
+        return [
+            {key: value for key, value in dict(action).items() if value is not None}
+            for action in request["actions"]
+        ]
+    
+    if request.get("action"):
+        action = {"action": request["action"]}
+        if request.get("url"):
+            action["url"] = request["url"]
+        return [action]
+    
+    return None
+
+
+def _snapshot(state: AgentState) -> AgentState:
+    """
+    Copy the parts of the state that running steps still add to
+    
+    The copy is encoded in a worker thread while other steps of the run
+    keep going. Step results are not changed once stored, so copying the
+    containers that hold them is enough.
+    """
+    context = dict(state.get("context") or {})
+    if "completed" in context:
+        context["completed"] = dict(context["completed"])
+    
+    return {
+        **state,
+        "plan": list(state.get("plan") or []),
+        "actions_executed": list(state.get("actions_executed") or []),
+        "results": list(state.get("results") or []),
+        "context": context,
+        "metadata": dict(state.get("metadata") or {})
+    }
 
 
 class BrowsingAgent:
     """Autonomous browsing agent using LangGraph"""
     
     def __init__(self, extension_bridge):
-        # Initialize LLM
-        self.llm = ChatOpenAI(
-            model=settings.openai_model,
-            api_key=settings.openai_api_key,
-            base_url=settings.openai_base_url,
-            temperature=0.7
-        )
+        # Shared LLM client; calls are rate limited by the gateway
+        self.llm = llm_gateway.get_llm(temperature=0.7)
         
         # Initialize tools
         self.tools = ExtensionTools(extension_bridge)
@@ -28,32 +76,36 @@ class BrowsingAgent:
         # Initialize nodes
         self.nodes = AgentNodes(self.llm, self.tools)
         
-        # Build graph
+        # Build graphs: with LLM planning, and straight to execution for
+        # requests that already carry their actions
         self.graph = self._build_graph()
+        self.direct_graph = self._build_graph(planning=False)
     
-    def _build_graph(self) -> StateGraph:
+    def _build_graph(self, planning: bool = True) -> StateGraph:
         """Build the agent graph"""
         
         # Create graph
         workflow = StateGraph(AgentState)
         
-        # Add nodes
-        workflow.add_node("plan", self.nodes.plan)
-        workflow.add_node("execute", self.nodes.execute)
+        # Add nodes ("plan" is taken by the state key of the same name)
+        if planning:
+            workflow.add_node("planner", self._checkpointed(self.nodes.plan))
+        workflow.add_node("execute", self._checkpointed(self.nodes.execute))
         workflow.add_node("synthesize", self.nodes.synthesize)
         
         # Set entry point
-        workflow.set_entry_point("plan")
+        workflow.set_entry_point("planner" if planning else "execute")
         
         # Add edges
-        workflow.add_conditional_edges(
-            "plan",
-            lambda state: "execute" if not state.get("error") else "error",
-            {
-                "execute": "execute",
-                "error": END
-            }
-        )
+        if planning:
+            workflow.add_conditional_edges(
+                "planner",
+                lambda state: "execute" if not state.get("error") else "error",
+                {
+                    "execute": "execute",
+                    "error": END
+                }
+            )
         
         workflow.add_conditional_edges(
             "execute",
@@ -69,34 +121,129 @@ class BrowsingAgent:
         
         return workflow.compile()
     
-    async def execute_task(self, task: str, metadata: dict = None) -> dict:
+    def _checkpointed(self, node: Callable) -> Callable:
+        """Wrap a node so the state is checkpointed after it ran"""
+        async def run(state: AgentState) -> AgentState:
+            state = await node(state)
+            save = checkpoint_sink.get()
+            if save:
+                await save(state)
+            return state
+        
+        return run
+    
+    def _resume_state(
+        self,
+        checkpoint_key: Optional[str],
+        task: str,
+        metadata: dict = None,
+        deadline: float = None,
+        plan: Optional[List[Dict[str, Any]]] = None
+    ) -> Optional[AgentState]:
         """
-        Execute a task
+        Build the state to continue an interrupted run from its checkpoint
+        
+        Only a checkpoint with a plan for the same task (and the same
+        explicit actions, if given) is resumed. Finished steps keep their
+        results in context["completed"]; the rest run again.
         
-        Args:
-            task: Task description
-            metadata: Optional metadata
-            
         Returns:
-            Task result
+            State for the execution graph, or None to start from scratch
+        """
+        if not checkpoint_store or not checkpoint_key:
+            return None
+        
+        saved = checkpoint_store.load(checkpoint_key)
+        if not saved or not saved.get("plan") or saved.get("task") != (task or ""):
+            return None
+        if plan is not None and saved["plan"] != plan:
+            return None
+        
+        state = self._initial_state(task, metadata, deadline, plan)
+        state["plan"] = saved["plan"]
+        state["task_type"] = saved.get("task_type")
+        state["context"] = saved.get("context") or {}
+        state["metadata"]["resumed"] = True
+        state["metadata"]["resumed_steps"] = len(state["context"].get("completed", {}))
+        return state
+    
+    def _prepare(
+        self,
+        task: str,
+        metadata: dict = None,
+        deadline: float = None,
+        plan: Optional[List[Dict[str, Any]]] = None,
+        checkpoint_key: Optional[str] = None
+    ) -> Tuple[Any, AgentState]:
+        """Pick the graph and initial state, resuming from a checkpoint if possible"""
+        state = self._resume_state(checkpoint_key, task, metadata, deadline, plan)
+        if state:
+            return self.direct_graph, state
+        
+        graph = self.direct_graph if plan is not None else self.graph
+        return graph, self._initial_state(task, metadata, deadline, plan)
+    
+    def _checkpoint_saver(self, checkpoint_key: Optional[str]) -> Optional[Callable]:
         """
-        # Initialize state
-        initial_state = {
-            "task": task,
+        Get the coroutine function that saves the state of a run
+        
+        Encoding and the SQLite commit run in a worker thread. Saves of one
+        run are written one after another in the order they were made, so
+        an older state never replaces a newer one.
+        """
+        if not checkpoint_store or not checkpoint_key:
+            return None
+        
+        lock = asyncio.Lock()
+        
+        async def save(state: AgentState):
+            snapshot = _snapshot(state)
+            async with lock:
+                await asyncio.to_thread(checkpoint_store.save, checkpoint_key, snapshot)
+        
+        return save
+    
+    async def _finish_checkpoint(self, checkpoint_key: Optional[str], final_state: Optional[AgentState]):
+        """Drop the checkpoint of a run that succeeded; failed runs keep theirs"""
+        if checkpoint_store and checkpoint_key and final_state and not final_state.get("error"):
+            await asyncio.to_thread(checkpoint_store.delete, checkpoint_key)
+    
+    def _initial_state(
+        self,
+        task: str,
+        metadata: dict = None,
+        deadline: float = None,
+        plan: Optional[List[Dict[str, Any]]] = None
+    ) -> AgentState:
+        """Build the initial graph state for a task"""
+        metadata = dict(metadata or {})
+        if plan is not None:
+            metadata["plan_explicit"] = True
+        
+        return {
+            "task": task or "",
             "task_type": None,
-            "plan": [],
+            "plan": plan or [],
             "current_step": 0,
             "actions_executed": [],
             "results": [],
             "context": {},
             "final_result": None,
             "error": None,
-            "metadata": metadata or {}
+            "metadata": metadata,
+            "deadline": deadline
         }
+    
+    def format_result(self, final_state: AgentState) -> dict:
+        """
+        Build the task result from the final graph state
         
-        # Run graph
-        final_state = await self.graph.ainvoke(initial_state)
+        Args:
+            final_state: State after the graph finished
         
+        Returns:
+            Task result
+        """
         return {
             "result": final_state.get("final_result"),
             "plan": final_state.get("plan"),
@@ -105,31 +252,81 @@ class BrowsingAgent:
             "metadata": final_state.get("metadata")
         }
     
-    async def stream_task(self, task: str, metadata: dict = None):
+    async def execute_task(
+        self,
+        task: str,
+        metadata: dict = None,
+        deadline: float = None,
+        plan: Optional[List[Dict[str, Any]]] = None,
+        checkpoint_key: Optional[str] = None
+    ) -> dict:
+        """
+        Execute a task
+        
+        Args:
+            task: Task description
+            metadata: Optional metadata
+            deadline: Optional epoch time by which the task must finish
+            plan: Optional explicit actions; skips LLM planning
+            checkpoint_key: Optional run ID; the state is checkpointed after
+                every step and an earlier unfinished run is resumed
+        
+        Returns:
+            Task result
+        """
+        graph, state = self._prepare(task, metadata, deadline, plan, checkpoint_key)
+        token = checkpoint_sink.set(self._checkpoint_saver(checkpoint_key))
+        
+        try:
+            # Run graph
+            final_state = await graph.ainvoke(state)
+        finally:
+            checkpoint_sink.reset(token)
+        
+        await self._finish_checkpoint(checkpoint_key, final_state)
+        return self.format_result(final_state)
+    
+    async def stream_task(
+        self,
+        task: str,
+        metadata: dict = None,
+        on_event: Callable = None,
+        deadline: float = None,
+        plan: Optional[List[Dict[str, Any]]] = None,
+        checkpoint_key: Optional[str] = None
+    ):
         """
         Stream task execution
         
         Args:
             task: Task description
             metadata: Optional metadata
-            
+            on_event: Optional callback for events emitted inside nodes
+                (e.g. synthesis chunks) between state updates
+            deadline: Optional epoch time by which the task must finish
+            plan: Optional explicit actions; skips LLM planning
+            checkpoint_key: Optional run ID; the state is checkpointed after
+                every step and an earlier unfinished run is resumed
+        
         Yields:
-            State updates
+            State updates as {node_name: state}
         """
-        # Initialize state
-        initial_state = {
-            "task": task,
-            "task_type": None,
-            "plan": [],
-            "current_step": 0,
-            "actions_executed": [],
-            "results": [],
-            "context": {},
-            "final_result": None,
-            "error": None,
-            "metadata": metadata or {}
-        }
+        graph, initial_state = self._prepare(task, metadata, deadline, plan, checkpoint_key)
+        token = event_sink.set(on_event)
+        checkpoint_token = checkpoint_sink.set(self._checkpoint_saver(checkpoint_key))
+        final_state = None
+        
+        # A resumed run skips planning, so announce the plan it continues
+        if on_event and plan is None and initial_state["metadata"].get("resumed"):
+            on_event({"type": "plan", "data": initial_state["plan"]})
+        
+        try:
+            # Stream graph execution
+            async for state in graph.astream(initial_state):
+                final_state = next(iter(state.values()), final_state)
+                yield state
+        finally:
+            checkpoint_sink.reset(checkpoint_token)
+            event_sink.reset(token)
         
-        # Stream graph execution
-        async for state in self.graph.astream(initial_state):
-            yield state
+        await self._finish_checkpoint(checkpoint_key, final_state)
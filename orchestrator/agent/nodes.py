@@ -2,20 +2,272 @@
 Agent Graph Nodes
 """
 
-from typing import Dict, Any
+import asyncio
+from contextvars import ContextVar
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Set
 from langchain_openai import ChatOpenAI
 from langchain.prompts import ChatPromptTemplate
 import json
+import time
+from config import settings
+from services.blob_store import blob_store
+from services.llm_gateway import LLMGateway, llm_gateway
 from .state import AgentState
 from .tools import ExtensionTools
+from .plan_cache import PlanCache, plan_cache as default_plan_cache
+from .plan_stream import PlanStreamParser
+from .compaction import compact_results, estimate_tokens, fit_budget
+
+
+# Callback for streaming events out of nodes while a task is being streamed
+event_sink: ContextVar[Optional[Callable[[Dict[str, Any]], None]]] = ContextVar(
+    "event_sink", default=None
+)
+
+# Coroutine function that persists the state after each finished step of a run
+checkpoint_sink: ContextVar[Optional[Callable[[AgentState], Awaitable[None]]]] = ContextVar(
+    "checkpoint_sink", default=None
+)
+
+
+SYNTHESIS_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a data synthesis agent. Combine the following results into a coherent response for the user's task."),
+    ("user", """Task: {task}
+
+Results:
+{results}
+
+Provide a clear, structured summary of the results.""")
+])
+
+MAP_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a data synthesis agent. Summarize this part of the results for the user's task. Keep every fact, name and number that could matter; another step will combine your summary with the other parts."),
+    ("user", """Task: {task}
+
+Results:
+{results}""")
+])
+
+REDUCE_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", "You are a data synthesis agent. Combine the following partial summaries into a coherent response for the user's task."),
+    ("user", """Task: {task}
+
+Partial summaries:
+{summaries}
+
+Provide a clear, structured summary of the results.""")
+])
+
+# Concurrent chunk summaries across all tasks in this process
+synthesis_slots = asyncio.Semaphore(settings.synthesis_concurrency)
+
+
+def chunk_results(results: List[Any], chunk_tokens: int) -> List[List[Any]]:
+    """
+    Split results into consecutive chunks of about chunk_tokens each
+    
+    Args:
+        results: Results to split
+        chunk_tokens: Token budget per chunk (a larger single result gets
+            a chunk of its own)
+    
+    Returns:
+        List of chunks
+    """
+    chunks: List[List[Any]] = []
+    current: List[Any] = []
+    current_size = 0
+    
+    for result in results:
+        size = estimate_tokens(result)
+        if current and current_size + size > chunk_tokens:
+            chunks.append(current)
+            current, current_size = [], 0
+        current.append(result)
+        current_size += size
+    
+    if current:
+        chunks.append(current)
+    
+    return chunks
+
+
+def infer_dependencies(plan: List[Dict[str, Any]]) -> List[Set[int]]:
+    """
+    Work out which earlier steps each plan step has to wait for
+    
+    An explicit "depends_on" list of step indices from the planner is used
+    as given. Otherwise a step depends on the previous step with the same
+    URL (e.g. EXTRACT_* after LOAD_PAGE), and WAIT is a barrier: it waits
+    for every earlier step and every later step waits for it.
+    
+    Args:
+        plan: List of plan actions
+    
+    Returns:
+        Set of dependency indices per step
+    """
+    dependencies: List[Set[int]] = []
+    last_for_url: Dict[str, int] = {}
+    barrier: Optional[int] = None
+    
+    for index, action in enumerate(plan):
+        explicit = action.get("depends_on")
+        
+        if isinstance(explicit, list):
+            depends = {
+                step for step in explicit
+                if isinstance(step, int) and 0 <= step < index
+            }
+        elif action.get("action") == "WAIT":
+            depends = set(range(index))
+        else:
+            depends = set()
+            url = action.get("url")
+            if url in last_for_url:
+                depends.add(last_for_url[url])
+            if barrier is not None:
+                depends.add(barrier)
+        
+        if action.get("action") == "WAIT":
+            barrier = index
+        if action.get("url"):
+            last_for_url[action["url"]] = index
+        
+        dependencies.append(depends)
+    
+    return dependencies
+
+
+class StepRunner:
+    """
+    Runs plan steps as soon as their dependencies have finished
+    
+    Steps can be added while earlier ones are already running, which lets
+    the planner start execution before the whole plan has been generated.
+    """
+    
+    def __init__(self, nodes: "AgentNodes", state: AgentState, completed: int = 0):
+        """
+        Initialize runner
+        
+        Args:
+            nodes: AgentNodes used to run actions
+            state: Graph state the results are stored in
+            completed: Number of leading plan steps that already ran
+        
+        Steps recorded in state["context"]["completed"] by an earlier,
+        checkpointed attempt are not run again.
+        """
+        self.nodes = nodes
+        self.state = state
+        self.completed = completed
+        self.plan: List[Dict[str, Any]] = []
+        self.results: Dict[int, Any] = {}
+        self.finished: Dict[int, asyncio.Event] = {}
+        self.steps: List[asyncio.Task] = []
+        self.limit = asyncio.Semaphore(max(1, settings.max_parallel_actions))
+        self.emit = event_sink.get()
+        self.checkpoint = checkpoint_sink.get()
+        self.done_before: Dict[str, Any] = state["context"].setdefault("completed", {})
+    
+    def add(self, action: Dict[str, Any]):
+        """
+        Add the next plan step and start it once its dependencies are done
+        
+        Args:
+            action: Plan action
+        """
+        index = len(self.plan)
+        self.plan.append(action)
+        self.finished[index] = asyncio.Event()
+        
+        if index < self.completed:
+            self.finished[index].set()
+            return
+        
+        if str(index) in self.done_before:
+            self.results[index] = self.done_before[str(index)]
+            self.finished[index].set()
+            if self.emit:
+                self.emit({
+                    "type": "action",
+                    "data": {"step": index, "action": action, "result": self.results[index], "resumed": True}
+                })
+            return
+        
+        dependencies = infer_dependencies(self.plan)[index]
+        self.steps.append(asyncio.create_task(self._run(index, dependencies)))
+    
+    async def _run(self, index: int, dependencies: Set[int]):
+        for dependency in dependencies:
+            await self.finished[dependency].wait()
+        
+        async with self.limit:
+            result = await self.nodes._run_action(self.plan[index], self.state)
+        
+        # Keep large payloads out of the graph state
+        self.results[index] = await asyncio.to_thread(blob_store.spill, result)
+        
+        self.done_before[str(index)] = self.results[index]
+        if self.checkpoint:
+            await self.checkpoint(self.state)
+        
+        self.finished[index].set()
+        if self.emit:
+            self.emit({
+                "type": "action",
+                "data": {"step": index, "action": self.plan[index], "result": result}
+            })
+    
+    async def finish(self, error: Optional[str] = None):
+        """
+        Wait for all added steps and store their results in plan order
+        
+        Args:
+            error: Error to record instead of waiting (cancels running steps)
+        """
+        state = self.state
+        
+        try:
+            if error:
+                state["error"] = error
+            else:
+                await asyncio.gather(*self.steps)
+        except Exception as e:
+            if state.get("deadline") and time.time() >= state["deadline"]:
+                state["error"] = "Deadline exceeded"
+            else:
+                state["error"] = f"Action execution failed: {str(e)}"
+        finally:
+            # A failed step leaves its dependents waiting; stop the rest
+            for step in self.steps:
+                step.cancel()
+            await asyncio.gather(*self.steps, return_exceptions=True)
+        
+        for index in range(self.completed, len(self.plan)):
+            if index in self.results:
+                state["actions_executed"].append(self.plan[index])
+                state["results"].append(self.results[index])
+        
+        if not state.get("error"):
+            state["current_step"] = len(self.plan)
 
 
 class AgentNodes:
     """Agent graph nodes"""
     
-    def __init__(self, llm: ChatOpenAI, tools: ExtensionTools):
+    def __init__(
+        self,
+        llm: ChatOpenAI,
+        tools: ExtensionTools,
+        plan_cache: Optional[PlanCache] = None,
+        gateway: Optional[LLMGateway] = None
+    ):
         self.llm = llm
         self.tools = tools
+        self.plan_cache = plan_cache or default_plan_cache
+        self.gateway = gateway or llm_gateway
     
     async def plan(self, state: AgentState) -> AgentState:
         """
@@ -25,6 +277,15 @@ class AgentNodes:
         """
         task = state["task"]
         
+        # Reuse a cached plan template for tasks of the same shape
+        cached_plan = self.plan_cache.get(task)
+        if cached_plan is not None:
+            state["plan"] = cached_plan
+            state["current_step"] = 0
+            state["metadata"]["plan_created"] = True
+            state["metadata"]["plan_cached"] = True
+            return state
+        
         # Create planning prompt
         tool_descriptions = self.tools.get_tool_descriptions()
         tools_text = "\n".join([
@@ -44,27 +305,74 @@ Each action should have:
 - action: The action type (LOAD_PAGE, FETCH, EXTRACT_LINKEDIN, EXTRACT_INSTAGRAM, EXTRACT_MAPS, WAIT)
 - url: The URL to act on (if applicable)
 - duration: Duration in milliseconds (for WAIT action)
+- depends_on: Indices of earlier actions that must finish first (optional)
+
+Actions without dependencies run in parallel, so only add depends_on where an
+action needs the outcome of another one.
 
 Example response:
 [
   {{"action": "LOAD_PAGE", "url": "https://linkedin.com/in/example"}},
-  {{"action": "EXTRACT_LINKEDIN", "url": "https://linkedin.com/in/example"}}
+  {{"action": "EXTRACT_LINKEDIN", "url": "https://linkedin.com/in/example", "depends_on": [0]}}
 ]
 
 Respond ONLY with the JSON array, no other text."""),
             ("user", "{task}")
         ])
         
-        # Get plan from LLM
-        chain = prompt | self.llm
-        response = await chain.ainvoke({
+        inputs = {
             "tools": tools_text,
             "task": task
-        })
+        }
+        
+        # Get plan from LLM
+        chain = prompt | self.llm
+        
+        if not settings.stream_planning:
+            response = await self.gateway.ainvoke(chain, inputs, state["metadata"])
+            return self._store_plan(state, response.content)
+        
+        # Stream the plan and start each action as soon as it is complete
+        runner = StepRunner(self, state)
+        parser = PlanStreamParser()
+        emit = event_sink.get()
+        content = ""
+        
+        try:
+            async for chunk in self.gateway.astream(chain, inputs, state["metadata"]):
+                content += chunk.content
+                for action in parser.feed(chunk.content):
+                    if emit:
+                        emit({"type": "plan_step", "data": {"step": len(runner.plan), "action": action}})
+                    runner.add(action)
+        except Exception:
+            await runner.finish(error="Planning failed")
+            raise
+        
+        self._store_plan(state, content)
+        
+        if state.get("error"):
+            await runner.finish(error=state["error"])
+            return state
+        
+        # Start whatever the incremental parse could not pick up
+        for action in state["plan"][len(runner.plan):]:
+            runner.add(action)
+        
+        await runner.finish()
+        self._cache_plan(state)
+        return state
+    
+    def _store_plan(self, state: AgentState, content: str) -> AgentState:
+        """
+        Parse the complete planner response into the state
         
+        Args:
+            state: Graph state
+            content: LLM response text
+        """
         # Parse plan
         try:
-            content = response.content
             # Try to extract JSON from markdown code blocks
             if "```json" in content:
                 content = content.split("```json")[1].split("```")[0].strip()
@@ -79,16 +387,39 @@ Respond ONLY with the JSON array, no other text."""),
             state["plan"] = plan
             state["current_step"] = 0
             state["metadata"]["plan_created"] = True
-            
+        
         except Exception as e:
             state["error"] = f"Failed to parse plan: {str(e)}"
             state["plan"] = []
         
         return state
     
+    def _cache_plan(self, state: AgentState):
+        """
+        Store a planner-made plan as a template once all its steps succeeded
+        
+        Plans that failed, came from the cache or were given explicitly are
+        not stored.
+        
+        Args:
+            state: Graph state after execution
+        """
+        metadata = state["metadata"]
+        if state.get("error") or not metadata.get("plan_created"):
+            return
+        if metadata.get("plan_cached") or metadata.get("plan_explicit"):
+            return
+        
+        self.plan_cache.put(state["task"], state["plan"])
+    
     async def execute(self, state: AgentState) -> AgentState:
         """
         Execute the planned actions
+        
+        Steps run as a dependency graph: a step starts as soon as the steps
+        it depends on have finished, with at most settings.max_parallel_actions
+        extension requests in flight for the task. Results are stored in plan
+        order regardless of completion order.
         """
         plan = state["plan"]
         current_step = state["current_step"]
@@ -97,35 +428,74 @@ Respond ONLY with the JSON array, no other text."""),
             # All steps executed
             return state
         
-        action = plan[current_step]
+        # Steps before current_step already ran
+        runner = StepRunner(self, state, completed=current_step)
+        for action in plan:
+            runner.add(action)
+        
+        await runner.finish()
+        self._cache_plan(state)
+        return state
+    
+    async def _run_action(self, action: Dict[str, Any], state: AgentState) -> Any:
+        """
+        Run a single plan action, retrying failures per the action's policy
+        
+        settings.action_retry_policies maps an action type (or "default") to
+        {"retries": n, "backoff": seconds}; the delay doubles per attempt.
+        
+        Raises:
+            TimeoutError: If the task deadline has passed
+        """
         action_type = action.get("action")
+        policies = settings.action_retry_policies
+        policy = {**policies.get("default", {}), **policies.get(action_type, {})}
+        retries = int(policy.get("retries", 0))
+        backoff = float(policy.get("backoff", 1.0))
         
-        try:
-            # Execute action using tools
-            if action_type == "LOAD_PAGE":
-                result = await self.tools.load_page(action["url"])
-            elif action_type == "FETCH":
-                result = await self.tools.fetch_with_session(action["url"])
-            elif action_type == "EXTRACT_LINKEDIN":
-                result = await self.tools.extract_linkedin(action["url"])
-            elif action_type == "EXTRACT_INSTAGRAM":
-                result = await self.tools.extract_instagram(action["url"])
-            elif action_type == "EXTRACT_MAPS":
-                result = await self.tools.extract_maps(action["url"])
-            elif action_type == "WAIT":
-                result = await self.tools.wait(action.get("duration", 1000))
-            else:
-                result = {"error": f"Unknown action: {action_type}"}
-            
-            # Store result
-            state["actions_executed"].append(action)
-            state["results"].append(result)
-            state["current_step"] += 1
+        for attempt in range(retries + 1):
+            # Bound the extension request by the task deadline
+            timeout = settings.extension_timeout
+            if state.get("deadline"):
+                timeout = min(timeout, state["deadline"] - time.time())
+                if timeout <= 0:
+                    raise TimeoutError("Deadline exceeded")
             
-        except Exception as e:
-            state["error"] = f"Action execution failed: {str(e)}"
+            try:
+                return await self._call_tool(action, timeout, state)
+            except Exception:
+                delay = backoff * 2 ** attempt
+                out_of_time = state.get("deadline") and time.time() + delay >= state["deadline"]
+                if attempt == retries or out_of_time:
+                    raise
+                await asyncio.sleep(delay)
+    
+    async def _call_tool(self, action: Dict[str, Any], timeout: float, state: AgentState) -> Any:
+        """Dispatch an action to the matching extension tool"""
+        action_type = action.get("action")
         
-        return state
+        # Results are shared per tenant and browser session unless the caller opts out
+        metadata = state.get("metadata") or {}
+        cache_options = {
+            "session": str(metadata.get("session_id", "default")),
+            "bypass_cache": bool(metadata.get("bypass_cache", False)),
+            "tenant": str(metadata.get("tenant") or "default")
+        }
+        
+        if action_type == "LOAD_PAGE":
+            return await self.tools.load_page(action["url"], timeout=timeout, **cache_options)
+        elif action_type == "FETCH":
+            return await self.tools.fetch_with_session(action["url"], timeout=timeout, **cache_options)
+        elif action_type == "EXTRACT_LINKEDIN":
+            return await self.tools.extract_linkedin(action["url"], timeout=timeout, **cache_options)
+        elif action_type == "EXTRACT_INSTAGRAM":
+            return await self.tools.extract_instagram(action["url"], timeout=timeout, **cache_options)
+        elif action_type == "EXTRACT_MAPS":
+            return await self.tools.extract_maps(action["url"], timeout=timeout, **cache_options)
+        elif action_type == "WAIT":
+            return await self.tools.wait(action.get("duration", 1000))
+        else:
+            return {"error": f"Unknown action: {action_type}"}
     
     async def synthesize(self, state: AgentState) -> AgentState:
         """
@@ -139,30 +509,97 @@ Respond ONLY with the JSON array, no other text."""),
             state["final_result"] = results[0]
             return state
         
-        # If multiple results, ask LLM to synthesize
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", "You are a data synthesis agent. Combine the following results into a coherent response for the user's task."),
-            ("user", """Task: {task}
-
-Results:
-{results}
-
-Provide a clear, structured summary of the results.""")
-        ])
+        # Explicit actions without a prompt have nothing to summarize against
+        if not task:
+            state["final_result"] = {"summary": None, "raw_results": results}
+            return state
         
-        chain = prompt | self.llm
-        response = await chain.ainvoke({
-            "task": task,
-            "results": json.dumps(results, indent=2)
-        })
+        # Load spilled payloads and send extracted page text instead of whole
+        # HTML documents (in a thread so large pages do not stall other tasks)
+        def prepare(results: List[Any]) -> List[Any]:
+            results = blob_store.materialize(results)
+            if not settings.compact_results:
+                return results
+            return compact_results(
+                results,
+                result_tokens=settings.synthesis_result_tokens,
+                total_tokens=settings.synthesis_chunk_tokens * settings.synthesis_max_chunks
+            )
+        
+        results = await asyncio.to_thread(prepare, results)
+        
+        size = estimate_tokens(results)
+        state["metadata"]["synthesis_input_tokens"] = size
+        
+        # Too large for one prompt: summarize chunks in parallel, then combine
+        if settings.synthesis_map_reduce and size > settings.synthesis_total_tokens:
+            summary = await self._map_reduce(task, results, state)
+        else:
+            if settings.compact_results:
+                results = fit_budget(
+                    results,
+                    result_tokens=settings.synthesis_result_tokens,
+                    total_tokens=settings.synthesis_total_tokens
+                )
+            summary = await self._summarize(SYNTHESIS_PROMPT, {
+                "task": task,
+                "results": json.dumps(results, indent=2)
+            }, state)
         
         state["final_result"] = {
-            "summary": response.content,
-            "raw_results": results
+            "summary": summary,
+            "raw_results": state["results"]
         }
         
         return state
     
+    async def _summarize(self, prompt: ChatPromptTemplate, inputs: Dict[str, Any], state: AgentState) -> str:
+        """
+        Run a summary prompt, streaming the output if the task is streamed
+        """
+        chain = prompt | self.llm
+        
+        emit = event_sink.get()
+        if emit:
+            # Stream the summary so clients see it as it is generated
+            summary = ""
+            async for chunk in self.gateway.astream(chain, inputs, state["metadata"]):
+                summary += chunk.content
+                emit({"type": "synthesis_chunk", "data": chunk.content})
+            return summary
+        
+        response = await self.gateway.ainvoke(chain, inputs, state["metadata"])
+        return response.content
+    
+    async def _map_reduce(self, task: str, results: List[Any], state: AgentState) -> str:
+        """
+        Summarize results in chunks concurrently, then combine the summaries
+        
+        Chunk summaries share synthesis_slots with every other task, so a
+        burst of large tasks cannot take over the LLM gateway queue.
+        """
+        chunks = chunk_results(results, settings.synthesis_chunk_tokens)
+        state["metadata"]["synthesis_chunks"] = len(chunks)
+        
+        chain = MAP_PROMPT | self.llm
+        
+        async def summarize_chunk(chunk: List[Any]) -> str:
+            async with synthesis_slots:
+                response = await self.gateway.ainvoke(chain, {
+                    "task": task,
+                    "results": json.dumps(chunk, indent=2)
+                }, state["metadata"])
+            return response.content
+        
+        partials = await asyncio.gather(*[summarize_chunk(chunk) for chunk in chunks])
+        
+        return await self._summarize(REDUCE_PROMPT, {
+            "task": task,
+            "summaries": "\n\n".join(
+                f"Part {index + 1}:\n{partial}" for index, partial in enumerate(partials)
+            )
+        }, state)
+    
     def should_continue(self, state: AgentState) -> str:
         """
         Decide whether to continue execution or finish
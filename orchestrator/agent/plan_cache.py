@@ -0,0 +1,253 @@
+"""
+Plan Cache
+Reuses validated plans for tasks that differ only in URLs and entities
+"""
+
+import json
+import logging
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from api.models import ActionType
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# Slot patterns, in replacement order. Bare words and numbers are left in
+# the template: they are too short to locate reliably inside a plan.
+SLOT_PATTERNS = [
+    ("url", re.compile(r"https?://[^\s\"'<>]+")),
+    ("quoted", re.compile(r"\"[^\"]{3,}\"|'[^']{3,}'")),
+    ("handle", re.compile(r"@[\w.]{3,}"))
+]
+
+VALID_ACTIONS = {action.value for action in ActionType}
+
+
+def normalize_task(task: str) -> Tuple[str, List[str]]:
+    """
+    Turn a task into a template with URLs and entities replaced by slots
+    
+    Args:
+        task: Task description
+    
+    Returns:
+        (template, slot values) e.g. ("extract linkedin profile {slot0}", ["https://..."])
+    """
+    slots: List[str] = []
+    template = task.strip()
+    
+    for name, pattern in SLOT_PATTERNS:
+        def replace(match, name=name):
+            value = match.group(0).rstrip(".,;:!?)")
+            trailing = match.group(0)[len(value):]
+            if name == "quoted":
+                value = value[1:-1]
+            slots.append(value)
+            return "{" + f"slot{len(slots) - 1}" + "}" + trailing
+        
+        template = pattern.sub(replace, template)
+    
+    template = " ".join(template.lower().split())
+    return template, slots
+
+
+class PlanCache:
+    """
+    LRU + TTL cache of plan templates
+    
+    A plan is stored as a template only if every slot value of its task
+    appears in it, so filling in new values yields the equivalent plan.
+    """
+    
+    def __init__(self, max_size: int = 256, ttl: Optional[int] = 3600, storage_path: Optional[str] = None):
+        """
+        Initialize plan cache
+        
+        Args:
+            max_size: Maximum number of templates kept
+            ttl: Seconds a template stays valid (None for no expiry)
+            storage_path: Optional JSON file to persist templates across restarts
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.storage_path = Path(storage_path) if storage_path else None
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "stores": 0, "rejected": 0}
+        self.load()
+    
+    def get(self, task: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up a plan for a task
+        
+        Args:
+            task: Task description
+        
+        Returns:
+            Plan with the task's slot values filled in, or None on miss
+        """
+        template, slots = normalize_task(task)
+        entry = self.entries.get(template)
+        
+        if not entry or self._is_expired(entry):
+            if entry:
+                del self.entries[template]
+            self.stats["misses"] += 1
+            return None
+        
+        # Filled-in values can still break a plan (e.g. an empty URL)
+        plan = _fill(entry["plan"], slots)
+        if not _is_valid_plan(plan):
+            del self.entries[template]
+            self.stats["misses"] += 1
+            return None
+        
+        self.entries.move_to_end(template)
+        self.stats["hits"] += 1
+        return plan
+    
+    def put(self, task: str, plan: List[Dict[str, Any]]):
+        """
+        Store a validated plan as a template
+        
+        Args:
+            task: Task description the plan was created for
+            plan: Plan returned by the LLM
+        """
+        template, slots = normalize_task(task)
+        plan_template = _templatize(plan, slots) if _is_valid_plan(plan) else None
+        
+        if plan_template is None:
+            self.stats["rejected"] += 1
+            return
+        
+        self.entries[template] = {"plan": plan_template, "stored_at": time.time()}
+        self.entries.move_to_end(template)
+        
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+        
+        self.stats["stores"] += 1
+        self.save()
+    
+    def _is_expired(self, entry: Dict[str, Any]) -> bool:
+        return bool(self.ttl) and time.time() - entry["stored_at"] > self.ttl
+    
+    def load(self):
+        """Load templates from disk"""
+        if not self.storage_path or not self.storage_path.exists():
+            return
+        
+        try:
+            with open(self.storage_path, 'r') as f:
+                entries = json.load(f)
+            self.entries = OrderedDict(
+                (template, entry) for template, entry in entries.items()
+                if not self._is_expired(entry)
+            )
+            logger.info(f"Loaded {len(self.entries)} plan templates")
+        except Exception as e:
+            logger.error(f"Error loading plan cache: {e}")
+    
+    def save(self):
+        """Save templates to disk"""
+        if not self.storage_path:
+            return
+        
+        try:
+            self.storage_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.storage_path, 'w') as f:
+                json.dump(self.entries, f)
+        except Exception as e:
+            logger.error(f"Error saving plan cache: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            "size": len(self.entries),
+            "hit_rate": self.stats["hits"] / lookups if lookups else None,
+            **self.stats
+        }
+
+
+def _is_valid_plan(plan: Any) -> bool:
+    """Check that a plan is a non-empty list of known actions"""
+    if not isinstance(plan, list) or not plan:
+        return False
+    
+    for action in plan:
+        if not isinstance(action, dict) or action.get("action") not in VALID_ACTIONS:
+            return False
+        if action["action"] != ActionType.WAIT.value and not action.get("url"):
+            return False
+    
+    return True
+
+
+def _templatize(plan: List[Dict[str, Any]], slots: List[str]) -> Optional[List[Dict[str, Any]]]:
+    """
+    Replace slot values in a plan with slot markers
+    
+    Only string argument values are rewritten; action names and keys are
+    left alone, so a slot like "LOAD" cannot turn LOAD_PAGE into a marker.
+    
+    Returns:
+        Plan template, or None if some slot value is not used by the plan
+    """
+    # Longest values first so a slot that contains another is replaced whole
+    order = sorted(range(len(slots)), key=lambda i: -len(slots[i]))
+    used = set()
+    
+    def replace(text: str) -> str:
+        for index in order:
+            if slots[index] in text:
+                used.add(index)
+                text = text.replace(slots[index], _marker(index))
+        return text
+    
+    plan_template = _map_arguments(plan, replace)
+    return plan_template if len(used) == len(slots) else None
+
+
+def _fill(plan_template: List[Dict[str, Any]], slots: List[str]) -> List[Dict[str, Any]]:
+    """Substitute slot values into the string argument values of a plan template"""
+    def fill(text: str) -> str:
+        for index, value in enumerate(slots):
+            text = text.replace(_marker(index), value)
+        return text
+    
+    return _map_arguments(plan_template, fill)
+
+
+def _marker(index: int) -> str:
+    return f"{{{{slot{index}}}}}"
+
+
+def _map_arguments(plan: List[Dict[str, Any]], transform) -> List[Dict[str, Any]]:
+    """Apply a function to every string argument value of a plan (not to action names or keys)"""
+    return [
+        {key: value if key == "action" else _map_strings(value, transform) for key, value in action.items()}
+        for action in plan
+    ]
+
+
+def _map_strings(value: Any, transform) -> Any:
+    if isinstance(value, str):
+        return transform(value)
+    if isinstance(value, list):
+        return [_map_strings(item, transform) for item in value]
+    if isinstance(value, dict):
+        return {key: _map_strings(item, transform) for key, item in value.items()}
+    return value
+
+
+# Global plan cache instance
+plan_cache = PlanCache(
+    max_size=settings.plan_cache_size,
+    ttl=settings.plan_cache_ttl,
+    storage_path=settings.plan_cache_path
+)
@@ -0,0 +1,88 @@
+"""
+Plan Stream Parser
+Extracts plan actions from a JSON array while the LLM is still generating it
+"""
+
+import json
+from typing import Any, Dict, List
+
+
+class PlanStreamParser:
+    """
+    Incremental parser for a streamed JSON array of actions
+    
+    Feed it chunks of LLM output; every time an object directly inside the
+    top-level array is complete it is returned, so execution can start
+    before the rest of the plan has been generated. Text before the array
+    (e.g. a markdown code fence) is skipped.
+    """
+    
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.stack: List[str] = []
+        self.in_string = False
+        self.escaped = False
+        self.object_start = -1
+        self.closed = False
+    
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """
+        Add a chunk of output
+        
+        Args:
+            chunk: Next piece of LLM output
+        
+        Returns:
+            Actions completed by this chunk, in order
+        """
+        self.buffer += chunk
+        actions = []
+        
+        while self.position < len(self.buffer) and not self.closed:
+            char = self.buffer[self.position]
+            
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            
+            elif not self.stack:
+                # Only an array is parsed incrementally; anything else is
+                # left to the full parse once the response is complete
+                if char == "[":
+                    self.stack.append(char)
+                elif char == "{":
+                    self.closed = True
+            
+            elif char == '"':
+                self.in_string = True
+            
+            elif char in "[{":
+                if char == "{" and self.stack == ["["]:
+                    self.object_start = self.position
+                self.stack.append(char)
+            
+            elif char in "]}":
+                self.stack.pop()
+                
+                if char == "}" and self.stack == ["["]:
+                    action = self._decode(self.buffer[self.object_start:self.position + 1])
+                    if action is not None:
+                        actions.append(action)
+                elif not self.stack:
+                    self.closed = True
+            
+            self.position += 1
+        
+        return actions
+    
+    @staticmethod
+    def _decode(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except json.JSONDecodeError:
+            return None
@@ -0,0 +1,312 @@
+"""
+Tool Result Cache
+Shares extension results for the same URL between tasks
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Tuple
+from config import settings
+from utils.urls import normalize_url
+
+logger = logging.getLogger(__name__)
+
+
+class ResultCache:
+    """
+    LRU + TTL cache of extension results with an optional SQLite tier
+    
+    Entries are keyed by (action, normalized URL, session, tenant) so
+    results fetched with one user's session, or for one tenant, are never
+    served to another. Memory is bounded by the encoded size of the
+    results; with a disk path set, every stored result is also written to
+    SQLite and memory misses fall through to it. Concurrent misses for the
+    same key share one extension request. An entry that expired less than
+    the stale grace period ago is served right away while it is refreshed
+    in the background, and covers for a refresh that fails.
+    """
+    
+    def __init__(
+        self,
+        ttls: Dict[str, int],
+        max_bytes: int = 64 * 1024 * 1024,
+        storage_path: Optional[str] = None,
+        stale_grace: int = 0
+    ):
+        """
+        Initialize result cache
+        
+        Args:
+            ttls: Seconds a result stays fresh per action type (missing or
+                0 disables caching for that action)
+            max_bytes: Memory budget for encoded results
+            storage_path: Optional SQLite file for the disk tier
+            stale_grace: Seconds past expiry an entry may still be served
+                while it is refreshed
+        """
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.stale_grace = stale_grace
+        self.entries: "OrderedDict[Tuple[str, str, str, str], Dict[str, Any]]" = OrderedDict()
+        self.size = 0
+        self.inflight: Dict[Tuple[str, str, str, str], asyncio.Future] = {}
+        self.refreshing: Set[asyncio.Task] = set()
+        self.stats = {
+            "hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "shared": 0,
+            "stale_served": 0,
+            "refreshes": 0,
+            "stores": 0,
+            "evictions": 0,
+            "bytes_saved": 0
+        }
+        
+        self.conn = None
+        if storage_path:
+            path = Path(storage_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(path), check_same_thread=False)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            # Tables from before tenants were part of the key cannot say
+            # whose results they hold; start over
+            columns = {row[1] for row in self.conn.execute("PRAGMA table_info(results)")}
+            if columns and "tenant" not in columns:
+                self.conn.execute("DROP TABLE results")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    action TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    session TEXT NOT NULL,
+                    tenant TEXT NOT NULL,
+                    stored_at REAL NOT NULL,
+                    data TEXT NOT NULL,
+                    PRIMARY KEY (action, url, session, tenant)
+                )
+            """)
+            self.conn.commit()
+            self.purge_expired()
+    
+    async def get_or_fetch(
+        self,
+        action: str,
+        url: str,
+        fetch: Callable[[], Awaitable[Any]],
+        session: str = "default",
+        bypass: bool = False,
+        tenant: str = "default"
+    ) -> Any:
+        """
+        Return a cached result or fetch and store it
+        
+        Args:
+            action: Action type (e.g. LOAD_PAGE)
+            url: Target URL
+            fetch: Coroutine factory that performs the extension request
+            session: Identity of the browser session the request uses
+            bypass: Skip the lookup and refresh the entry
+            tenant: Tenant the result is fetched for
+        
+        Returns:
+            Extension result
+        """
+        ttl = self.ttls.get(action, 0)
+        if not ttl:
+            return await fetch()
+        
+        key = (action, normalize_url(url), session, tenant)
+        
+        if bypass:
+            self.stats["bypassed"] += 1
+        else:
+            entry = self._lookup(key)
+            if entry and time.time() - entry["stored_at"] <= ttl:
+                self.stats["hits"] += 1
+                self.stats["bytes_saved"] += entry["size"]
+                return json.loads(entry["data"])
+            
+            # Recently expired: answer now and refresh in the background
+            stale = self._stale(key, ttl)
+            if stale is not None:
+                if key not in self.inflight:
+                    self._refresh(key, fetch, ttl)
+                return stale
+            
+            # Share an extension request that is already in flight
+            shared = self.inflight.get(key)
+            if shared:
+                self.stats["shared"] += 1
+                try:
+                    return await asyncio.shield(shared)
+                except asyncio.CancelledError:
+                    # The owning task was cancelled; fetch ourselves
+                    if not shared.cancelled():
+                        raise
+        
+        self.stats["misses"] += 1
+        return await self._fetch(key, fetch, ttl)
+    
+    async def _fetch(
+        self,
+        key: Tuple[str, str, str, str],
+        fetch: Callable[[], Awaitable[Any]],
+        ttl: int
+    ) -> Any:
+        """
+        Run an extension request that concurrent lookups of the key share
+        
+        Args:
+            key: Cache key
+            fetch: Coroutine factory that performs the extension request
+            ttl: Freshness of the action in seconds
+        
+        Returns:
+            Extension result (or a stale one if the request failed)
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        
+        try:
+            result = await fetch()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            result = self._stale(key, ttl)
+            if result is None:
+                future.set_exception(e)
+                # Followers may not exist; mark the exception as retrieved
+                future.exception()
+                raise
+        else:
+            if _is_cacheable(result):
+                self._store(key, result)
+            else:
+                result = self._stale(key, ttl) or result
+        finally:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+        
+        future.set_result(result)
+        return result
+    
+    def _refresh(self, key: Tuple[str, str, str, str], fetch: Callable[[], Awaitable[Any]], ttl: int):
+        """Fetch a fresh copy of a stale entry without anyone waiting on it"""
+        self.stats["refreshes"] += 1
+        
+        async def refresh():
+            try:
+                await self._fetch(key, fetch, ttl)
+            except Exception as e:
+                logger.warning(f"Refreshing cached {key[0]} {key[1]} failed: {e}")
+        
+        task = asyncio.create_task(refresh())
+        self.refreshing.add(task)
+        task.add_done_callback(self.refreshing.discard)
+    
+    def _stale(self, key: Tuple[str, str, str, str], ttl: int) -> Optional[Any]:
+        """Get an expired entry that is still within the stale grace period"""
+        entry = self._lookup(key)
+        if not entry or time.time() - entry["stored_at"] > ttl + self.stale_grace:
+            return None
+        
+        self.stats["stale_served"] += 1
+        return json.loads(entry["data"])
+    
+    def _lookup(self, key: Tuple[str, str, str, str]) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry:
+            self.entries.move_to_end(key)
+            return entry
+        
+        if not self.conn:
+            return None
+        
+        row = self.conn.execute(
+            "SELECT stored_at, data FROM results WHERE action = ? AND url = ? AND session = ? AND tenant = ?",
+            key
+        ).fetchone()
+        if not row:
+            return None
+        
+        self.stats["disk_hits"] += 1
+        entry = {"stored_at": row[0], "data": row[1], "size": len(row[1])}
+        self._remember(key, entry)
+        return entry
+    
+    def _store(self, key: Tuple[str, str, str, str], result: Any):
+        data = json.dumps(result, default=str)
+        entry = {"stored_at": time.time(), "data": data, "size": len(data)}
+        self._remember(key, entry)
+        self.stats["stores"] += 1
+        
+        if self.conn:
+            try:
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO results (action, url, session, tenant, stored_at, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (*key, entry["stored_at"], data)
+                )
+                self.conn.commit()
+            except sqlite3.Error as e:
+                logger.error(f"Error writing result cache: {e}")
+    
+    def _remember(self, key: Tuple[str, str, str, str], entry: Dict[str, Any]):
+        """Keep an entry in memory, evicting least recently used ones"""
+        if entry["size"] > self.max_bytes:
+            return
+        
+        previous = self.entries.pop(key, None)
+        if previous:
+            self.size -= previous["size"]
+        
+        self.entries[key] = entry
+        self.size += entry["size"]
+        
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted["size"]
+            self.stats["evictions"] += 1
+    
+    def purge_expired(self):
+        """Delete disk entries older than the longest TTL"""
+        if not self.conn:
+            return
+        
+        longest = max(self.ttls.values(), default=0) + self.stale_grace
+        self.conn.execute("DELETE FROM results WHERE stored_at < ?", (time.time() - longest,))
+        self.conn.commit()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache size and hit/miss counters"""
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["shared"]
+        return {
+            "entries": len(self.entries),
+            "memory_bytes": self.size,
+            "hit_rate": (self.stats["hits"] + self.stats["shared"]) / lookups if lookups else None,
+            **self.stats
+        }
+
+
+def _is_cacheable(result: Any) -> bool:
+    """Only successful results are worth reusing"""
+    if isinstance(result, dict):
+        return not result.get("error") and result.get("success", True) is not False
+    return result is not None
+
+
+# Global result cache instance
+result_cache = ResultCache(
+    ttls=settings.result_cache_ttls if settings.result_cache_enabled else {},
+    max_bytes=settings.result_cache_max_bytes,
+    storage_path=settings.result_cache_path,
+    stale_grace=settings.result_cache_stale_grace
+)
@@ -30,3 +30,4 @@ class AgentState(TypedDict):
     
     # Metadata
     metadata: Dict[str, Any]
+    deadline: Optional[float]  # epoch seconds
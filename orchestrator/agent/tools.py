@@ -3,91 +3,152 @@ Agent Tools
 Tools that the agent can use to interact with the browser extension
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import httpx
 import asyncio
+from .result_cache import ResultCache, result_cache as default_result_cache
 
 
 class ExtensionTools:
     """Tools for interacting with browser extension"""
     
-    def __init__(self, extension_bridge):
+    def __init__(self, extension_bridge, cache: Optional[ResultCache] = None):
         self.bridge = extension_bridge
+        self.cache = cache or default_result_cache
     
-    async def load_page(self, url: str) -> Dict[str, Any]:
+    async def _send(
+        self,
+        action: str,
+        url: str,
+        timeout: float,
+        session: str,
+        bypass_cache: bool,
+        tenant: str
+    ) -> Dict[str, Any]:
+        """Send a URL action to the extension through the result cache"""
+        return await self.cache.get_or_fetch(
+            action,
+            url,
+            lambda: self.bridge.send_action({"action": action, "url": url}, timeout=timeout),
+            session=session,
+            bypass=bypass_cache,
+            tenant=tenant
+        )
+    
+    async def load_page(
+        self,
+        url: str,
+        timeout: float = 30,
+        session: str = "default",
+        bypass_cache: bool = False,
+        tenant: str = "default"
+    ) -> Dict[str, Any]:
         """
         Load a page in the offscreen browser
         
         Args:
             url: URL to load
+            timeout: Seconds to wait for the extension
+            session: Browser session identity the result is cached under
+            bypass_cache: Skip cached results and refresh them
+            tenant: Tenant the result is cached for
             
         Returns:
             HTML content of the page
         """
-        return await self.bridge.send_action({
-            "action": "LOAD_PAGE",
-            "url": url
-        })
+        return await self._send("LOAD_PAGE", url, timeout, session, bypass_cache, tenant)
     
-    async def fetch_with_session(self, url: str) -> Dict[str, Any]:
+    async def fetch_with_session(
+        self,
+        url: str,
+        timeout: float = 30,
+        session: str = "default",
+        bypass_cache: bool = False,
+        tenant: str = "default"
+    ) -> Dict[str, Any]:
         """
         Fetch URL with user session cookies
         
         Args:
             url: URL to fetch
+            timeout: Seconds to wait for the extension
+            session: Browser session identity the result is cached under
+            bypass_cache: Skip cached results and refresh them
+            tenant: Tenant the result is cached for
             
         Returns:
             Response data
         """
-        return await self.bridge.send_action({
-            "action": "FETCH",
-            "url": url
-        })
+        return await self._send("FETCH", url, timeout, session, bypass_cache, tenant)
     
-    async def extract_linkedin(self, url: str) -> Dict[str, Any]:
+    async def extract_linkedin(
+        self,
+        url: str,
+        timeout: float = 30,
+        session: str = "default",
+        bypass_cache: bool = False,
+        tenant: str = "default"
+    ) -> Dict[str, Any]:
         """
         Extract LinkedIn profile data
         
         Args:
             url: LinkedIn profile URL
+            timeout: Seconds to wait for the extension
+            session: Browser session identity the result is cached under
+            bypass_cache: Skip cached results and refresh them
+            tenant: Tenant the result is cached for
             
         Returns:
             Structured profile data
         """
-        return await self.bridge.send_action({
-            "action": "EXTRACT_LINKEDIN",
-            "url": url
-        })
+        return await self._send("EXTRACT_LINKEDIN", url, timeout, session, bypass_cache, tenant)
     
-    async def extract_instagram(self, url: str) -> Dict[str, Any]:
+    async def extract_instagram(
+        self,
+        url: str,
+        timeout: float = 30,
+        session: str = "default",
+        bypass_cache: bool = False,
+        tenant: str = "default"
+    ) -> Dict[str, Any]:
         """
         Extract Instagram profile data
         
         Args:
             url: Instagram profile URL
+            timeout: Seconds to wait for the extension
+            session: Browser session identity the result is cached under
+            bypass_cache: Skip cached results and refresh them
+            tenant: Tenant the result is cached for
             
         Returns:
             Structured profile data
         """
-        return await self.bridge.send_action({
-            "action": "EXTRACT_INSTAGRAM",
-            "url": url
-        })
+        return await self._send("EXTRACT_INSTAGRAM", url, timeout, session, bypass_cache, tenant)
     
-    async def extract_maps(self, url: str) -> Dict[str, Any]:
+    async def extract_maps(
+        self,
+        url: str,
+        timeout: float = 30,
+        session: str = "default",
+        bypass_cache: bool = False,
+        tenant: str = "default"
+    ) -> Dict[str, Any]:
         """
         Extract Google Maps place data
         
         Args:
             url: Google Maps place URL
+            timeout: Seconds to wait for the extension
+            session: Browser session identity the result is cached under
+            bypass_cache: Skip cached results and refresh them
+            tenant: Tenant the result is cached for
             
         Returns:
             Structured place data
         """
-        return await self.bridge.send_action({
-            "action": "EXTRACT_MAPS",
-            "url": url
-        })
+        return await self._send("EXTRACT_MAPS", url, timeout, session, bypass_cache, tenant)
     
     async def wait(self, duration: int = 1000) -> Dict[str, Any]:
         """
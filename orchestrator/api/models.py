@@ -13,6 +13,14 @@ class TaskStatus(str, Enum):
     RUNNING = "running"
     COMPLETED = "completed"
     FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class TaskPriority(str, Enum):
+    """Task priority lane, in scheduling order"""
+    INTERACTIVE = "interactive"
+    NORMAL = "normal"
+    BULK = "bulk"
 
 
 class ActionType(str, Enum):
@@ -43,6 +51,8 @@ class TaskRequest(BaseModel):
     url: Optional[str] = None
     needsPlanning: bool = False
     metadata: Optional[Dict[str, Any]] = None
+    timeout: Optional[float] = Field(None, gt=0, description="Seconds to wait for completion")
+    deadline: Optional[float] = Field(None, gt=0, description="Seconds the task may take before it is cancelled")
 
 
 class TaskResponse(BaseModel):
@@ -55,11 +65,19 @@ class TaskResponse(BaseModel):
     metadata: Optional[Dict[str, Any]] = None
 
 
+class BatchTaskResponse(BaseModel):
+    """Batch submission response model"""
+    batch_id: str
+    task_ids: List[str]
+
+
 class HealthResponse(BaseModel):
     """Health check response"""
     status: str
     version: str = "1.0.0"
     agent_ready: bool
+    queue_depth: int = 0
+    estimated_wait: Optional[float] = None
 
 
 class StreamEvent(BaseModel):
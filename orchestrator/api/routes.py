@@ -4,16 +4,21 @@ API Routes
 
 from fastapi import APIRouter, HTTPException, Depends, Header
 from fastapi.responses import StreamingResponse
-from typing import Optional
+from typing import List, Optional
+import hashlib
 import json
 from datetime import datetime
 
 from .models import (
     TaskRequest, TaskResponse, HealthResponse, 
-    TaskStatus, StreamEvent
+    TaskStatus, StreamEvent, BatchTaskResponse
 )
-from services.task_queue import task_queue
+from services.task_queue import task_queue, QueueFullError
 from services.extension_bridge import extension_bridge
+from agent.plan_cache import plan_cache
+from agent.result_cache import result_cache
+from services.blob_store import blob_store
+from services.llm_gateway import llm_gateway
 from config import settings
 
 
@@ -34,51 +39,72 @@ def verify_api_key(authorization: Optional[str] = Header(None)):
             raise HTTPException(status_code=401, detail="Invalid API key")
 
 
+def caller_identity(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Derive a stable tenant identifier from the caller's API key"""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    
+    token = authorization.replace("Bearer ", "")
+    return "key-" + hashlib.sha256(token.encode()).hexdigest()[:12]
+
+
+def admit(count: int = 1):
+    """Reject with 429 and Retry-After when the task queue is saturated"""
+    try:
+        task_queue.check_admission(count)
+    except QueueFullError as e:
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+
 @router.get("/health", response_model=HealthResponse)
 async def health_check():
     """Health check endpoint"""
     return HealthResponse(
         status="healthy",
         version="1.0.0",
-        agent_ready=extension_bridge.is_connected()
+        agent_ready=extension_bridge.is_connected(),
+        queue_depth=task_queue.queue_depth(),
+        estimated_wait=task_queue.estimated_wait()
     )
 
 
 @router.post("/api/tasks", response_model=TaskResponse, dependencies=[Depends(verify_api_key)])
-async def create_task(request: TaskRequest):
+async def create_task(request: TaskRequest, tenant: Optional[str] = Depends(caller_identity)):
     """
     Create and execute a task
     
     Args:
         request: Task request
+        tenant: Caller identity used for fair scheduling and coalescing
         
     Returns:
         Task response
     """
+    admit()
+    
     # Create task
-    task_id = task_queue.create_task(request.dict())
+    task_id = task_queue.create_task(request.dict(), tenant=tenant)
     
     # Enqueue task
-    await task_queue.enqueue_task(task_id)
+    await task_queue.enqueue_task(task_id, tenant=tenant)
     
     # Wait for task completion (with timeout)
-    max_wait = 60  # seconds
-    waited = 0
-    
-    while waited < max_wait:
-        task = task_queue.get_task(task_id)
-        if task and task.status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
-            return TaskResponse(
-                task_id=task_id,
-                status=task.status,
-                result=task.result,
-                error=task.error,
-                plan=task.result.get("plan") if task.result else None,
-                metadata=request.metadata
-            )
-        
-        await asyncio.sleep(0.5)
-        waited += 0.5
+    max_wait = request.timeout or settings.task_wait_timeout
+    task = await task_queue.wait_for_task(task_id, timeout=max_wait)
+    
+    if task and task.is_done():
+        return TaskResponse(
+            task_id=task_id,
+            status=task.status,
+            result=await asyncio.to_thread(blob_store.materialize, task.result),
+            error=task.error,
+            plan=task.result.get("plan") if task.result else None,
+            metadata=request.metadata
+        )
     
     # Timeout
     return TaskResponse(
@@ -89,6 +115,83 @@ async def create_task(request: TaskRequest):
     )
 
 
+@router.post("/api/tasks/batch", response_model=BatchTaskResponse, dependencies=[Depends(verify_api_key)])
+async def create_task_batch(requests: List[TaskRequest], tenant: Optional[str] = Depends(caller_identity)):
+    """
+    Create and enqueue many tasks in one call
+    
+    Args:
+        requests: Task requests
+        tenant: Caller identity used for fair scheduling and coalescing
+        
+    Returns:
+        Batch ID and task IDs in request order
+    """
+    if not requests:
+        raise HTTPException(status_code=400, detail="Empty batch")
+    
+    # Waiting cannot make room for more tasks than the queue ever holds
+    if task_queue.max_queue_depth is not None and len(requests) > task_queue.max_queue_depth:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch of {len(requests)} tasks exceeds the queue limit of {task_queue.max_queue_depth}; split it"
+        )
+    
+    admit(len(requests))
+    
+    task_ids = []
+    for request in requests:
+        task_id = task_queue.create_task(request.dict(), tenant=tenant)
+        await task_queue.enqueue_task(task_id, tenant=tenant)
+        task_ids.append(task_id)
+    
+    batch_id = task_queue.create_batch(task_ids)
+    
+    return BatchTaskResponse(batch_id=batch_id, task_ids=task_ids)
+
+
+@router.get("/api/tasks/batch/{batch_id}/results", dependencies=[Depends(verify_api_key)])
+async def stream_batch_results(batch_id: str, timeout: Optional[float] = None):
+    """
+    Stream batch results as NDJSON in completion order
+    
+    Args:
+        batch_id: Batch ID
+        timeout: Maximum seconds to wait; unfinished tasks are reported as they are
+        
+    Returns:
+        Newline-delimited JSON stream of task responses
+    """
+    task_ids = task_queue.get_batch(batch_id)
+    
+    if task_ids is None:
+        raise HTTPException(status_code=404, detail="Batch not found")
+    
+    async def result_generator():
+        async for task_id, task in task_queue.as_completed(task_ids, timeout=timeout):
+            if not task:
+                response = TaskResponse(
+                    task_id=task_id,
+                    status=TaskStatus.FAILED,
+                    error="Task not found"
+                )
+            else:
+                response = TaskResponse(
+                    task_id=task_id,
+                    status=task.status,
+                    result=await asyncio.to_thread(blob_store.materialize, task.result),
+                    error=task.error,
+                    plan=task.result.get("plan") if task.result else None
+                )
+            
+            yield response.json() + "\n"
+    
+    return StreamingResponse(
+        result_generator(),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/api/tasks/{task_id}", response_model=TaskResponse, dependencies=[Depends(verify_api_key)])
 async def get_task(task_id: str):
     """
@@ -108,52 +211,90 @@ async def get_task(task_id: str):
     return TaskResponse(
         task_id=task_id,
         status=task.status,
-        result=task.result,
+        result=await asyncio.to_thread(blob_store.materialize, task.result),
         error=task.error,
         plan=task.result.get("plan") if task.result else None
     )
 
 
+@router.delete("/api/tasks/{task_id}", response_model=TaskResponse, dependencies=[Depends(verify_api_key)])
+async def cancel_task(task_id: str):
+    """
+    Cancel a pending or running task
+    
+    Args:
+        task_id: Task ID
+        
+    Returns:
+        Task response
+    """
+    task = task_queue.get_task(task_id)
+    
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    if not task_queue.cancel_task(task_id):
+        raise HTTPException(status_code=409, detail=f"Task already {task.status.value}")
+    
+    return TaskResponse(
+        task_id=task_id,
+        status=task.status,
+        error=task.error
+    )
+
+
 @router.post("/api/tasks/stream", dependencies=[Depends(verify_api_key)])
-async def stream_task(request: TaskRequest):
+async def stream_task(request: TaskRequest, tenant: Optional[str] = Depends(caller_identity)):
     """
     Stream task execution
     
     Args:
         request: Task request
+        tenant: Caller identity used for fair scheduling and coalescing
         
     Returns:
         Server-sent events stream
     """
+    admit()
+    
     async def event_generator():
-        # Create task
-        task_id = task_queue.create_task(request.dict())
+        # Create task and subscribe before it is queued so no update is missed
+        task_id = task_queue.create_task(request.dict(), tenant=tenant)
+        updates = task_queue.subscribe(task_id)
         
         # Send initial event
         yield f"data: {json.dumps({'type': 'start', 'task_id': task_id, 'timestamp': datetime.now().isoformat()})}\n\n"
         
         # Enqueue task
-        await task_queue.enqueue_task(task_id)
+        await task_queue.enqueue_task(task_id, tenant=tenant)
         
-        # Stream updates
-        max_wait = 60
-        waited = 0
+        # Stream updates as the worker publishes them
+        max_wait = request.timeout or settings.task_wait_timeout
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + max_wait
         
-        while waited < max_wait:
-            task = task_queue.get_task(task_id)
-            
-            if task:
-                if task.status == TaskStatus.COMPLETED:
-                    yield f"data: {json.dumps({'type': 'result', 'data': task.result, 'timestamp': datetime.now().isoformat()})}\n\n"
+        try:
+            while True:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
                     break
-                elif task.status == TaskStatus.FAILED:
-                    yield f"data: {json.dumps({'type': 'error', 'data': task.error, 'timestamp': datetime.now().isoformat()})}\n\n"
+                
+                try:
+                    event = await asyncio.wait_for(updates.get(), timeout=remaining)
+                except asyncio.TimeoutError:
                     break
-                else:
-                    yield f"data: {json.dumps({'type': 'status', 'data': task.status, 'timestamp': datetime.now().isoformat()})}\n\n"
-            
-            await asyncio.sleep(1)
-            waited += 1
+                
+                event["timestamp"] = datetime.now().isoformat()
+                yield f"data: {json.dumps(event, default=str)}\n\n"
+                
+                if event["type"] in ("result", "error", "cancelled"):
+                    break
+        except (GeneratorExit, asyncio.CancelledError):
+            # Client disconnected; stop the work it was waiting for
+            task_queue.cancel_task(task_id, "Client disconnected")
+            raise
+        finally:
+            task_queue.unsubscribe(task_id, updates)
         
         # Send end event
         yield f"data: {json.dumps({'type': 'end', 'timestamp': datetime.now().isoformat()})}\n\n"
@@ -164,6 +305,28 @@ async def stream_task(request: TaskRequest):
     )
 
 
+@router.get("/api/queue/stats", dependencies=[Depends(verify_api_key)])
+async def queue_stats():
+    """Get task queue statistics"""
+    return task_queue.get_stats()
+
+
+@router.get("/api/llm/stats", dependencies=[Depends(verify_api_key)])
+async def llm_stats():
+    """Get LLM gateway statistics (rate-limit queueing vs. model latency)"""
+    return llm_gateway.get_stats()
+
+
+@router.get("/api/cache/stats", dependencies=[Depends(verify_api_key)])
+async def cache_stats():
+    """Get cache statistics"""
+    return {
+        "plan_cache": plan_cache.get_stats(),
+        "result_cache": result_cache.get_stats(),
+        "blob_store": blob_store.get_stats()
+    }
+
+
 @router.post("/api/extension/register")
 async def register_extension(extension_id: str):
     """
@@ -191,9 +354,13 @@ async def extension_response(request_id: str, response: dict):
     Args:
         request_id: Request ID
         response: Response data
+        
+    Returns:
+        "aborted" is true if the orchestrator stopped waiting for the request,
+        so the extension can drop any follow-up work for it
     """
     extension_bridge.receive_response(request_id, response)
-    return {"ok": True}
+    return {"ok": True, "aborted": extension_bridge.is_aborted(request_id)}
 
 
 import asyncio
@@ -0,0 +1,152 @@
+"""
+Result compaction benchmark
+
+Builds results the way the agent sees them (raw HTML from LOAD_PAGE and
+FETCH, shared menus and banners across pages) and reports the synthesis
+prompt size in tokens before and after compact_results, and how long the
+compaction takes. Synthesis latency is then measured end to end through
+AgentNodes.synthesize, with COMPACT_RESULTS off and on, against a local
+fake chat model whose response time grows with the prompt size (like
+the prefill time of a real model). Saved pages can be used instead of
+the generated ones.
+
+    cd orchestrator
+    python benchmarks/bench_compaction.py --pages 10
+    python benchmarks/bench_compaction.py --html saved/*.html
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(tempfile.mkdtemp(prefix="bench-compaction-"), "blobs"))
+
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from agent.compaction import CHARS_PER_TOKEN, compact_results, estimate_tokens
+from agent.nodes import AgentNodes
+from agent.plan_cache import PlanCache
+from config import settings
+from services.llm_gateway import LLMGateway
+
+
+MENU = "".join(f'<li><a href="/section/{index}">Section {index}</a></li>' for index in range(40))
+SCRIPT = "window.analytics = {" + ", ".join(f'"k{index}": {index}' for index in range(400)) + "};"
+
+
+def fixture_page(index: int) -> str:
+    """A listing page: a short description and price table wrapped in typical boilerplate"""
+    rows = "".join(
+        f"<tr><td>Item {index}-{row}</td><td>{row * 3} reviews</td><td>${row}.99</td></tr>"
+        for row in range(30)
+    )
+    return f"""<!DOCTYPE html>
+<html>
+<head>
+  <title>Listing {index} - Example Directory</title>
+  <meta name="description" content="Business listing number {index}">
+  <meta property="og:title" content="Listing {index}">
+  <script type="application/ld+json">{{"@type": "LocalBusiness", "name": "Listing {index}", "telephone": "555-01{index:02d}"}}</script>
+  <script>{SCRIPT}</script>
+  <style>{"." * 2000}</style>
+</head>
+<body>
+  <header><div class="logo">Example Directory</div><nav><ul>{MENU}</ul></nav></header>
+  <div class="cookie-banner">We use cookies to improve your experience. Accept all cookies?</div>
+  <main>
+    <h1>Listing {index}</h1>
+    <p>Listing {index} has been serving the neighbourhood since {1990 + index}.</p>
+    <h2>Prices</h2>
+    <table>{rows}</table>
+    <div class="promo">Sign up for the newsletter and get 10% off your first order</div>
+  </main>
+  <aside>Related listings: {"".join(f"<a>Listing {other}</a>" for other in range(20))}</aside>
+  <footer>Copyright Example Directory. All rights reserved. Terms | Privacy | Contact</footer>
+</body>
+</html>"""
+
+
+class PrefillChatModel(FakeListChatModel):
+    """Fake chat model that takes longer the longer the prompt is"""
+    
+    base_latency: float = 0.3
+    prompt_tokens_per_second: float = 20000
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        tokens = sum(len(str(message.content)) for message in messages) / CHARS_PER_TOKEN
+        await asyncio.sleep(self.base_latency + tokens / self.prompt_tokens_per_second)
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+
+async def synthesize(results, compact: bool, args) -> tuple:
+    """Run the synthesis node and return (seconds, input tokens, LLM calls)"""
+    settings.compact_results = compact
+    llm = PrefillChatModel(
+        responses=["Summary."],
+        prompt_tokens_per_second=args.prefill_rate
+    )
+    nodes = AgentNodes(llm, tools=None, plan_cache=PlanCache(), gateway=LLMGateway(0, 0))
+    state = {"task": "Compare the listings", "results": results, "metadata": {}}
+    
+    started = time.perf_counter()
+    await nodes.synthesize(state)
+    elapsed = time.perf_counter() - started
+    
+    metadata = state["metadata"]
+    return elapsed, metadata["synthesis_input_tokens"], metadata.get("synthesis_chunks", 0) + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--html", nargs="*", help="Saved HTML pages to use instead")
+    parser.add_argument("--result-tokens", type=int, default=settings.synthesis_result_tokens)
+    parser.add_argument("--total-tokens", type=int, default=settings.synthesis_total_tokens)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--prefill-rate", type=float, default=20000, help="Prompt tokens per second of the fake model")
+    args = parser.parse_args()
+    
+    if args.html:
+        pages = []
+        for path in args.html:
+            with open(path, encoding="utf-8", errors="replace") as html:
+                pages.append(html.read())
+    else:
+        pages = [fixture_page(index) for index in range(args.pages)]
+    
+    results = [
+        {"success": True, "url": f"https://example.com/{index}", "html": html}
+        for index, html in enumerate(pages)
+    ]
+    
+    timings = []
+    for _ in range(args.repeat):
+        started = time.perf_counter()
+        compacted = compact_results(results, args.result_tokens, args.total_tokens)
+        timings.append(time.perf_counter() - started)
+    
+    unbounded = compact_results(results, args.result_tokens, None)
+    before = sum(estimate_tokens(result) for result in results)
+    extracted = sum(estimate_tokens(result) for result in unbounded)
+    after = sum(estimate_tokens(result) for result in compacted)
+    
+    print(f"{len(results)} results, budget {args.result_tokens} per result / {args.total_tokens} total")
+    print(f"  raw                 {before:>8} tokens")
+    print(f"  extracted + deduped {extracted:>8} tokens ({before / extracted:.1f}x smaller)")
+    print(f"  within budget       {after:>8} tokens ({before / after:.1f}x smaller)")
+    print(f"  compaction time     {min(timings) * 1000:>8.1f} ms (best of {args.repeat})")
+    
+    print(f"synthesis with a fake model reading {args.prefill_rate:g} prompt tokens/s")
+    for compact in (False, True):
+        elapsed, tokens, calls = asyncio.run(synthesize(results, compact, args))
+        label = "compacted" if compact else "raw"
+        print(f"  {label:<19} {elapsed:>8.2f} s ({tokens} input tokens, {calls} LLM calls)")
+
+
+if __name__ == "__main__":
+    main()
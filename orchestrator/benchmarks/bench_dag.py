@@ -0,0 +1,88 @@
+"""
+Plan execution benchmark: sequential vs dependency graph
+
+Runs a plan of LOAD_PAGE + EXTRACT pairs on different URLs through
+StepRunner with a fake extension latency, once with one action at a time
+(the old sequential executor) and once with max_parallel_actions.
+
+    cd orchestrator
+    python benchmarks/bench_dag.py --pages 8 --latency 0.2 --parallel 4
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from agent.nodes import StepRunner
+from config import settings
+
+
+class FakeNodes:
+    """AgentNodes stand-in with a fixed extension round trip"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+    
+    async def _run_action(self, action, state):
+        await asyncio.sleep(self.latency)
+        return {"url": action["url"], "content": "ok"}
+
+
+def make_plan(pages: int):
+    plan = []
+    for index in range(pages):
+        url = f"https://example.com/page/{index}"
+        plan.append({"action": "LOAD_PAGE", "url": url})
+        plan.append({"action": "EXTRACT_MAPS", "url": url})
+    return plan
+
+
+async def run(plan, latency: float) -> float:
+    state = {
+        "plan": plan,
+        "current_step": 0,
+        "actions_executed": [],
+        "results": [],
+        "context": {},
+        "error": None,
+        "metadata": {},
+        "deadline": None
+    }
+    runner = StepRunner(FakeNodes(latency), state)
+    
+    started = time.perf_counter()
+    for action in plan:
+        runner.add(action)
+    await runner.finish()
+    elapsed = time.perf_counter() - started
+    
+    assert not state["error"] and len(state["results"]) == len(plan)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds per extension action")
+    parser.add_argument("--parallel", type=int, default=settings.max_parallel_actions)
+    args = parser.parse_args()
+    
+    plan = make_plan(args.pages)
+    print(f"{len(plan)} steps ({args.pages} pages), {args.latency * 1000:.0f} ms per action")
+    
+    settings.max_parallel_actions = 1
+    sequential = asyncio.run(run(plan, args.latency))
+    print(f"  sequential        {sequential:.2f} s")
+    
+    settings.max_parallel_actions = args.parallel
+    parallel = asyncio.run(run(plan, args.latency))
+    print(f"  dag (parallel {args.parallel})  {parallel:.2f} s  ({sequential / parallel:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+Extension connection load balancing benchmark
+
+Sends a burst of commands through the v2 bridge to simulated extension
+connections, one of them several times slower than the rest, and reports
+the wall clock time and how many commands each connection received.
+Each simulated extension works on --capacity commands at a time.
+
+    cd orchestrator
+    python benchmarks/bench_load_balancing.py --commands 80 --connections 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from services.extension_bridge_v2 import ExtensionBridge
+
+
+class SimulatedExtension:
+    """WebSocket stand-in that answers commands after a fixed latency"""
+    
+    def __init__(self, bridge: ExtensionBridge, latency: float, capacity: int):
+        self.bridge = bridge
+        self.latency = latency
+        self.busy = asyncio.Semaphore(capacity)
+        self.received = 0
+    
+    async def send_text(self, frame: str):
+        message = json.loads(frame)
+        if "command_id" not in message or message.get("type") == "abort":
+            return
+        self.received += 1
+        asyncio.create_task(self._reply(message["command_id"]))
+    
+    async def _reply(self, command_id: str):
+        async with self.busy:
+            await asyncio.sleep(self.latency)
+        await self.bridge.handle_response({"type": "response", "command_id": command_id, "success": True})
+
+
+async def run(connections: int, commands: int, max_inflight: int, args) -> tuple:
+    bridge = ExtensionBridge(max_inflight_per_connection=max_inflight)
+    extensions = []
+    for index in range(connections):
+        # The first connection is the slow one
+        latency = args.slow_latency if index == 0 else args.latency
+        extension = SimulatedExtension(bridge, latency, args.capacity)
+        await bridge.register_connection(extension, f"conn-{index}")
+        extensions.append(extension)
+    
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        bridge.send_command({"action": "INVISIBLE_BROWSE"}, timeout=60)
+        for _ in range(commands)
+    ])
+    return time.perf_counter() - started, [extension.received for extension in extensions]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--commands", type=int, default=80)
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--slow-latency", type=float, default=0.2)
+    parser.add_argument("--capacity", type=int, default=2, help="Commands each extension works on at once")
+    args = parser.parse_args()
+    
+    print(
+        f"{args.commands} commands, {args.latency * 1000:.0f} ms per command "
+        f"({args.slow_latency * 1000:.0f} ms on conn-0), capacity {args.capacity}"
+    )
+    print(f"{'connections':>12} {'in-flight cap':>14} {'seconds':>9}  commands per connection")
+    
+    for connections in args.connections:
+        for max_inflight in (0, args.capacity):
+            elapsed, received = asyncio.run(run(connections, args.commands, max_inflight, args))
+            cap = max_inflight or "none"
+            print(f"{connections:>12} {cap:>14} {elapsed:>9.2f}  {received}")
+
+
+if __name__ == "__main__":
+    main()
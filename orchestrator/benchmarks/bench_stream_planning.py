@@ -0,0 +1,118 @@
+"""
+Streamed planning benchmark
+
+Runs a task through BrowsingAgent with a fake chat model that streams
+the plan a few characters at a time, once with STREAM_PLANNING off and
+once on, and reports when the first browser action was sent and when
+the task finished.
+
+    cd orchestrator
+    python benchmarks/bench_stream_planning.py --steps 6 --chunk-delay 0.02 --action-latency 0.3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+_data_dir = tempfile.mkdtemp(prefix="bench-stream-")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_data_dir, "blobs"))
+os.environ.setdefault("CHECKPOINT_PATH", os.path.join(_data_dir, "checkpoints.db"))
+
+from langchain_community.chat_models.fake import FakeListChatModel
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+
+from agent.graph import BrowsingAgent
+from agent.plan_cache import PlanCache
+from config import settings
+
+
+class SlowChatModel(FakeListChatModel):
+    """Fake chat model that generates its response at a fixed pace"""
+    
+    chunk_size: int = 8
+    chunk_delay: float = 0.02
+    
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        result = await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        text = result.generations[0].message.content
+        await asyncio.sleep(self.chunk_delay * -(-len(text) // self.chunk_size))
+        return result
+    
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        text = self.responses[self.i]
+        self.i = (self.i + 1) % len(self.responses)
+        for start in range(0, len(text), self.chunk_size):
+            await asyncio.sleep(self.chunk_delay)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=text[start:start + self.chunk_size]))
+
+
+class FakeBridge:
+    """Extension bridge stand-in that records when actions are sent"""
+    
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.sent = []
+    
+    async def send_action(self, action, timeout=30, **kwargs):
+        self.sent.append(time.perf_counter())
+        await asyncio.sleep(self.latency)
+        return {"success": True, "url": action.get("url"), "content": "ok"}
+    
+    def is_connected(self):
+        return True
+
+
+def make_plan(steps: int):
+    plan = []
+    for index in range(steps // 2):
+        url = f"https://example{index}.com/page"
+        plan.append({"action": "LOAD_PAGE", "url": url})
+        plan.append({"action": "EXTRACT_MAPS", "url": url, "depends_on": [len(plan) - 1]})
+    return json.dumps(plan, indent=2)
+
+
+async def run(plan: str, args) -> tuple:
+    bridge = FakeBridge(args.action_latency)
+    agent = BrowsingAgent(bridge)
+    agent.llm = SlowChatModel(
+        responses=[plan, "Summary of the results."],
+        chunk_delay=args.chunk_delay
+    )
+    agent.nodes.llm = agent.llm
+    # A fresh cache so the plan is generated every run
+    agent.nodes.plan_cache = PlanCache()
+    
+    started = time.perf_counter()
+    result = await agent.execute_task("benchmark task", metadata={"bypass_cache": True})
+    elapsed = time.perf_counter() - started
+    
+    assert not result.get("error"), result.get("error")
+    return bridge.sent[0] - started, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--steps", type=int, default=6)
+    parser.add_argument("--chunk-delay", type=float, default=0.02, help="Seconds per 8 characters of output")
+    parser.add_argument("--action-latency", type=float, default=0.3)
+    args = parser.parse_args()
+    
+    plan = make_plan(args.steps)
+    print(f"{args.steps} step plan ({len(plan)} chars), {args.action_latency * 1000:.0f} ms per action")
+    print(f"{'stream_planning':>16} {'first action':>14} {'total':>10}")
+    
+    for stream in (False, True):
+        settings.stream_planning = stream
+        first, total = asyncio.run(run(plan, args))
+        print(f"{str(stream):>16} {first:>13.2f}s {total:>9.2f}s")
+
+
+if __name__ == "__main__":
+    main()
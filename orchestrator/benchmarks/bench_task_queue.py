@@ -0,0 +1,81 @@
+"""
+Task queue dispatch benchmark
+
+Queues N tasks on the in-process worker pool with a fake agent and
+reports throughput and dispatch latency (time from a slot being freed to
+the next task starting in it).
+
+    cd orchestrator
+    python benchmarks/bench_task_queue.py --tasks 1000 --workers 5 --duration 0.001
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from services.task_queue import TaskQueue
+from utils.stats import percentile
+
+
+class FakeAgent:
+    """Agent stand-in that records when each run starts and ends"""
+    
+    def __init__(self, duration: float):
+        self.duration = duration
+        self.starts = []
+        self.ends = []
+    
+    async def execute_task(self, task, **kwargs):
+        self.starts.append(time.perf_counter())
+        await asyncio.sleep(self.duration)
+        self.ends.append(time.perf_counter())
+        return {"success": True}
+
+
+async def run(tasks: int, workers: int, duration: float):
+    queue = TaskQueue(max_concurrent=workers, coalesce=False)
+    agent = FakeAgent(duration)
+    task_ids = [queue.create_task({"prompt": f"task {index}"}) for index in range(tasks)]
+    for task_id in task_ids:
+        await queue.enqueue_task(task_id)
+    
+    started = time.perf_counter()
+    runner = asyncio.create_task(queue.process_queue(agent))
+    await queue.queue.join()
+    elapsed = time.perf_counter() - started
+    await queue.shutdown()
+    await runner
+    
+    # Each start after the first round fills the slot of the latest finished task
+    ends = sorted(agent.ends)
+    gaps = []
+    for start in sorted(agent.starts)[workers:]:
+        finished = [end for end in ends if end <= start]
+        if finished:
+            gaps.append(start - finished[-1])
+    gaps.sort()
+    
+    print(f"{tasks} tasks, {workers} workers, {duration * 1000:.1f} ms each")
+    print(f"  wall clock     {elapsed:.3f} s")
+    print(f"  throughput     {tasks / elapsed:.0f} tasks/s")
+    print(f"  ideal          {tasks / workers * duration:.3f} s")
+    print(f"  dispatch p50   {percentile(gaps, 0.50) * 1000:.3f} ms")
+    print(f"  dispatch p99   {percentile(gaps, 0.99) * 1000:.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=0.001, help="Seconds per fake task")
+    args = parser.parse_args()
+    asyncio.run(run(args.tasks, args.workers, args.duration))
+
+
+if __name__ == "__main__":
+    main()
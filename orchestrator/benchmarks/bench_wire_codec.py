@@ -0,0 +1,97 @@
+"""
+Wire codec benchmark
+
+Encodes and decodes typical extension bridge messages (a large HTML
+response, a structured extraction result and a small command) with
+JSON, MessagePack and MessagePack + zstd, and reports frame size and
+encode/decode time. Needs the packages in requirements-wire.txt.
+
+    cd orchestrator
+    python benchmarks/bench_wire_codec.py
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.wire_codec import WireCodec, supported_compression, supported_encodings
+
+
+def make_payloads(cards: int, employees: int):
+    random.seed(1)
+    words = [
+        "".join(random.choice("abcdefghijklmnop") for _ in range(random.randint(3, 9)))
+        for _ in range(3000)
+    ]
+    html = "<html><head><title>Acme</title></head><body>" + "".join(
+        f'<div class="card"><a href="/in/{random.choice(words)}">{" ".join(random.choices(words, k=12))}</a>'
+        f"<span>{random.choice(words)}</span></div>"
+        for _ in range(cards)
+    ) + "</body></html>"
+    
+    return {
+        "html page": {
+            "type": "response", "command_id": "c", "success": True,
+            "data": {"html": html, "url": "https://example.com"}
+        },
+        f"{employees} employees": {
+            "type": "response", "command_id": "c", "success": True,
+            "data": {"employees": [
+                {
+                    "name": " ".join(random.choices(words, k=2)),
+                    "title": " ".join(random.choices(words, k=6)),
+                    "profile_url": "https://www.linkedin.com/in/" + random.choice(words),
+                    "location": random.choice(words),
+                    "connections": random.randint(1, 500)
+                }
+                for _ in range(employees)
+            ]}
+        },
+        "command": {
+            "command_id": "c", "action": "INVISIBLE_BROWSE",
+            "url": "https://linkedin.com/company/example/people/", "params": {"max_pages": 6}
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cards", type=int, default=20000, help="Elements in the HTML page")
+    parser.add_argument("--employees", type=int, default=500)
+    args = parser.parse_args()
+    
+    if "msgpack" not in supported_encodings() or "zstd" not in supported_compression():
+        sys.exit("Install requirements-wire.txt (msgpack, zstandard) to compare binary framing")
+    
+    codecs = {
+        "json": WireCodec(),
+        "msgpack": WireCodec("msgpack"),
+        "msgpack+zstd": WireCodec("msgpack", "zstd")
+    }
+    
+    print(f"{'message':<16} {'codec':<13} {'bytes':>10} {'encode ms':>10} {'decode ms':>10}")
+    for name, message in make_payloads(args.cards, args.employees).items():
+        # Fewer rounds for the large messages
+        rounds = 20 if len(json.dumps(message)) > 100000 else 2000
+        
+        for codec_name, codec in codecs.items():
+            started = time.perf_counter()
+            for _ in range(rounds):
+                frame = codec.encode(message)
+            encode = (time.perf_counter() - started) / rounds
+            
+            started = time.perf_counter()
+            for _ in range(rounds):
+                codec.decode(frame)
+            decode = (time.perf_counter() - started) / rounds
+            
+            print(f"{name:<16} {codec_name:<13} {len(frame):>10} {encode * 1000:>10.3f} {decode * 1000:>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Worker process scaling benchmark
+
+Submits tasks to a temporary broker and drains them with 1..N worker
+processes running TaskQueue.consume_broker, like worker.py does. The fake
+agent burns CPU for --cpu-ms (page parsing, prompt building) and then
+waits --io-ms (LLM and browser round trips), so the numbers show how far
+extra processes get past the single event loop.
+
+    cd orchestrator
+    python benchmarks/bench_workers.py --tasks 400 --processes 1 2 4
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from api.models import TaskStatus
+from services.task_broker import SQLiteTaskBroker
+from services.task_store import Task
+
+
+class FakeAgent:
+    """Agent stand-in with a CPU-bound and an I/O-bound part"""
+    
+    def __init__(self, cpu_ms: float, io_ms: float):
+        self.cpu = cpu_ms / 1000
+        self.io = io_ms / 1000
+    
+    async def execute_task(self, task, **kwargs):
+        deadline = time.perf_counter() + self.cpu
+        while time.perf_counter() < deadline:
+            pass
+        await asyncio.sleep(self.io)
+        return {"success": True}
+
+
+async def run_worker(db_path: str, worker_id: str, concurrency: int, cpu_ms: float, io_ms: float, ready):
+    from services.task_queue import TaskQueue
+    
+    # Imports take seconds; keep them out of the measurement
+    ready.wait()
+    broker = SQLiteTaskBroker(db_path, ttl=None)
+    queue = TaskQueue(max_concurrent=concurrency, coalesce=False, broker=broker, poll_interval=0.01)
+    consumer = asyncio.create_task(queue.consume_broker(FakeAgent(cpu_ms, io_ms), worker_id))
+    
+    # Stop once the queue is drained and nothing is left running here
+    while broker.qsize() or queue.running_tasks or queue.claimed:
+        await asyncio.sleep(0.05)
+    
+    consumer.cancel()
+    await asyncio.gather(consumer, return_exceptions=True)
+    await queue.shutdown()
+    broker.close()
+
+
+def worker_main(*args):
+    asyncio.run(run_worker(*args))
+
+
+def measure(processes: int, tasks: int, concurrency: int, cpu_ms: float, io_ms: float) -> float:
+    """Drain a fresh broker and return the wall clock time"""
+    db_path = os.path.join(tempfile.mkdtemp(prefix="bench-workers-"), "broker.db")
+    broker = SQLiteTaskBroker(db_path, ttl=None)
+    for index in range(tasks):
+        broker.submit(Task(f"task-{index}", {"prompt": f"task {index}"}))
+    
+    ready = multiprocessing.Barrier(processes + 1)
+    workers = [
+        multiprocessing.Process(
+            target=worker_main,
+            args=(db_path, f"bench-{index}", concurrency, cpu_ms, io_ms, ready)
+        )
+        for index in range(processes)
+    ]
+    for worker in workers:
+        worker.start()
+    
+    ready.wait()
+    started = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+    
+    completed = broker.conn.execute(
+        "SELECT COUNT(*) FROM broker_tasks WHERE status = ?",
+        (TaskStatus.COMPLETED.value,)
+    ).fetchone()[0]
+    broker.close()
+    
+    if completed != tasks:
+        print(f"  warning: only {completed}/{tasks} tasks completed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--tasks", type=int, default=400)
+    parser.add_argument("--processes", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--concurrency", type=int, default=5, help="Concurrent tasks per process")
+    parser.add_argument("--cpu-ms", type=float, default=10)
+    parser.add_argument("--io-ms", type=float, default=50)
+    args = parser.parse_args()
+    
+    print(
+        f"{args.tasks} tasks, {args.concurrency} per process, "
+        f"{args.cpu_ms:g} ms CPU + {args.io_ms:g} ms I/O each"
+    )
+    print(f"{'processes':>10} {'seconds':>10} {'tasks/s':>10} {'speedup':>10}")
+    
+    baseline = None
+    for processes in args.processes:
+        elapsed = measure(processes, args.tasks, args.concurrency, args.cpu_ms, args.io_ms)
+        baseline = baseline or elapsed
+        print(f"{processes:>10} {elapsed:>10.2f} {args.tasks / elapsed:>10.0f} {baseline / elapsed:>10.2f}x")
+
+
+if __name__ == "__main__":
+    main()
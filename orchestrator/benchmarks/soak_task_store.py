@@ -0,0 +1,70 @@
+"""
+Task store soak test
+
+Pushes finished tasks with sizeable results through a task store and
+prints resident memory as it goes. With bounded eviction (memory) or
+on-disk storage (sqlite) RSS should level off instead of growing with
+the number of tasks.
+
+    cd orchestrator
+    python benchmarks/soak_task_store.py --backend memory --tasks 100000
+    python benchmarks/soak_task_store.py --backend sqlite --tasks 100000
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPENAI_API_KEY", "benchmark")
+
+from api.models import TaskStatus
+from services.task_store import Task, create_task_store
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB (falls back to peak RSS off Linux)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--tasks", type=int, default=100000)
+    parser.add_argument("--max-tasks", type=int, default=1000)
+    parser.add_argument("--result-kb", type=int, default=20, help="Size of each task result")
+    parser.add_argument("--report-every", type=int, default=10000)
+    args = parser.parse_args()
+    
+    db_path = os.path.join(tempfile.mkdtemp(prefix="soak-"), "tasks.db")
+    store = create_task_store(args.backend, db_path=db_path, max_tasks=args.max_tasks, ttl=3600)
+    payload = "x" * (args.result_kb * 1024)
+    
+    print(f"backend={args.backend} tasks={args.tasks} result={args.result_kb} KB")
+    print(f"{'tasks':>10} {'rss MB':>10} {'stored':>10} {'tasks/s':>10}")
+    
+    started = time.perf_counter()
+    for index in range(1, args.tasks + 1):
+        task = Task(f"task-{index}", {"prompt": f"task {index}"})
+        store.add(task)
+        task.status = TaskStatus.COMPLETED
+        task.result = {"content": payload}
+        task.completed_at = datetime.now()
+        store.save(task)
+        
+        if index % args.report_every == 0:
+            elapsed = time.perf_counter() - started
+            print(f"{index:>10} {rss_mb():>10.1f} {len(store):>10} {index / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
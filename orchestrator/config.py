@@ -3,7 +3,7 @@ Configuration Management
 """
 
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 
 
 class Settings(BaseSettings):
@@ -22,9 +22,88 @@ class Settings(BaseSettings):
     # Optional API Authentication
     api_key: Optional[str] = None
     
+    # LLM Rate Limits (shared by all tasks in a process)
+    llm_requests_per_minute: int = 500  # 0 for unlimited
+    llm_tokens_per_minute: int = 200000  # 0 for unlimited
+    llm_max_retries: int = 3  # retries after a 429, connection error, timeout or 5xx
+    llm_output_tokens: int = 500  # completion tokens reserved per call
+    
     # Extension Configuration
     extension_timeout: int = 30
     max_concurrent_tasks: int = 5
+    max_parallel_actions: int = 4  # independent plan steps run at once per task
+    stream_planning: bool = True  # start executing actions while the plan is generated
+    extension_max_inflight: int = 0  # commands in flight per extension connection (0 for unlimited)
+    extension_event_concurrency: int = 8  # extension event handlers running at once
+    extension_event_backlog: int = 100  # handlers queued before the socket read waits
+    extension_binary_frames: bool = True  # offer msgpack framing to extensions (needs msgpack)
+    extension_compression_threshold: int = 16384  # bytes; larger binary frames are zstd-compressed
+    extension_batch_size: int = 50  # commands per batch frame for extensions that support batching
+    action_retry_policies: Dict[str, Dict[str, float]] = {  # per action type, "default" for the rest
+        "default": {"retries": 1, "backoff": 1.0},
+        "EXTRACT_LINKEDIN": {"retries": 2, "backoff": 2.0},
+        "EXTRACT_INSTAGRAM": {"retries": 2, "backoff": 2.0},
+        "EXTRACT_MAPS": {"retries": 2, "backoff": 2.0},
+        "WAIT": {"retries": 0}
+    }
+    task_max_attempts: int = 1  # runs per task (>1 retries failed runs from the checkpoint)
+    
+    # Synthesis Configuration
+    compact_results: bool = True  # send extracted page text instead of raw HTML
+    synthesis_result_tokens: int = 2000  # prompt token budget per action result
+    synthesis_total_tokens: int = 12000  # prompt token budget for all results
+    synthesis_map_reduce: bool = True  # summarize in parallel chunks above the total budget
+    synthesis_chunk_tokens: int = 4000  # prompt token budget per chunk summary
+    synthesis_max_chunks: int = 16
+    synthesis_concurrency: int = 4  # chunk summaries in flight across all tasks
+    task_wait_timeout: int = 60  # default seconds POST /api/tasks waits for a result
+    max_queue_depth: int = 1000  # reject new tasks beyond this many queued
+    max_estimated_wait: int = 300  # reject new tasks if queue wait would exceed this (seconds)
+    coalesce_tasks: bool = True  # share one execution between identical requests
+    coalesce_window: int = 10  # seconds a finished result is reused for duplicates
+    
+    # Scheduling Configuration
+    default_priority: str = "normal"  # interactive, normal or bulk
+    tenant_priorities: Dict[str, str] = {}  # tenant -> default priority lane
+    tenant_weights: Dict[str, float] = {}  # tenant -> fair-share weight
+    
+    # Plan Cache Configuration
+    plan_cache_size: int = 256
+    plan_cache_ttl: int = 3600
+    plan_cache_path: Optional[str] = None  # e.g. ./data/plan_cache.json to persist
+    
+    # Tool Result Cache Configuration
+    result_cache_enabled: bool = True
+    result_cache_ttls: Dict[str, int] = {  # seconds per action; 0 disables
+        "LOAD_PAGE": 300,
+        "FETCH": 60,
+        "EXTRACT_LINKEDIN": 3600,
+        "EXTRACT_INSTAGRAM": 1800,
+        "EXTRACT_MAPS": 3600
+    }
+    result_cache_max_bytes: int = 64 * 1024 * 1024
+    result_cache_path: Optional[str] = None  # e.g. ./data/results.db for a disk tier
+    result_cache_stale_grace: int = 600  # seconds an expired result is still served while it is refreshed
+    
+    # Blob Store Configuration
+    blob_store_path: str = "./data/blobs"
+    blob_threshold: int = 16384  # bytes; larger payloads are kept on disk (0 disables)
+    blob_ttl: int = 86400  # seconds to keep blobs
+    
+    # Checkpoint Configuration
+    checkpoint_enabled: Optional[bool] = None  # save agent state after every step; unset: on with a broker or task_max_attempts > 1
+    checkpoint_path: str = "./data/checkpoints.db"
+    checkpoint_ttl: int = 86400  # seconds to keep checkpoints of unfinished runs
+    
+    # Task Store Configuration
+    task_store_backend: str = "memory"  # "memory" or "sqlite"
+    task_store_path: str = "./data/tasks.db"
+    task_store_max_tasks: int = 1000
+    task_store_ttl: int = 3600  # seconds to keep finished tasks
+    
+    # Shared broker: set to run tasks in worker.py processes instead of in-process
+    task_broker_path: Optional[str] = None  # e.g. ./data/broker.db
+    task_lease_seconds: int = 60  # running tasks without a worker heartbeat this long are requeued
     
     # SearXNG Configuration
     SEARXNG_URL: str = "https://searx.be"  # Public instance, or http://localhost:8080 for self-hosted
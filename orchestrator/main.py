@@ -51,7 +51,7 @@ async def startup_event():
     print("Agent initialized")
     
     # Start task queue processor
-    asyncio.create_task(task_queue.process_queue(agent))
+    asyncio.create_task(task_queue.process_queue(agent, extension_bridge))
     print("Task queue processor started")
     
     print("Orchestrator ready!")
@@ -61,6 +61,10 @@ async def startup_event():
 async def shutdown_event():
     """Cleanup on shutdown"""
     print("Shutting down orchestrator...")
+    
+    # Stop task queue workers
+    await task_queue.shutdown()
+    print("Task queue stopped")
 
 
 @app.get("/")
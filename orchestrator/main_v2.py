@@ -25,7 +25,14 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # Global instances
-extension_bridge = ExtensionBridge()
+extension_bridge = ExtensionBridge(
+    max_inflight_per_connection=settings.extension_max_inflight,
+    event_concurrency=settings.extension_event_concurrency,
+    event_backlog=settings.extension_event_backlog,
+    binary_frames=settings.extension_binary_frames,
+    compression_threshold=settings.extension_compression_threshold,
+    batch_size=settings.extension_batch_size
+)
 session_manager = SessionManager()
 session_bridge = BrowserSessionBridge(session_manager)
 searxng_client = None
@@ -123,6 +130,9 @@ async def get_status():
         "extension_connected": extension_bridge.is_connected(),
         "connection_count": extension_bridge.get_connection_count(),
         "connection_ids": extension_bridge.get_connection_ids(),
+        "connection_load": extension_bridge.get_connection_stats(),
+        "redispatched_commands": extension_bridge.redispatched,
+        "event_handlers": extension_bridge.get_handler_stats(),
         "sessions": session_manager.get_session_status(),
         "active_tasks": invisible_browser.get_active_tasks() if invisible_browser else [],
         "searxng_url": settings.SEARXNG_URL
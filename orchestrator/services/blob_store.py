@@ -0,0 +1,211 @@
+"""
+Blob Store Service
+Keeps large result payloads on local disk so task state only holds references
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+BLOB_KEY = "$blob"
+
+
+class BlobStore:
+    """
+    Content-addressed, zlib-compressed blob files
+    
+    spill() replaces large strings inside a result (and the result itself
+    if it is still large afterwards) by references such as
+    {"$blob": "<sha256>", "size": 183204, "type": "str"}; materialize()
+    resolves them again when the payload is actually needed. Identical
+    payloads are stored once. Files are read back through mmap so the
+    compressed bytes are never copied into Python memory.
+    """
+    
+    def __init__(
+        self,
+        root: str = "./data/blobs",
+        threshold: int = 16384,
+        ttl: Optional[int] = 86400,
+        compression_level: int = 6
+    ):
+        """
+        Initialize blob store
+        
+        Args:
+            root: Directory for blob files
+            threshold: Payloads of at least this many bytes are spilled
+                (0 disables spilling)
+            ttl: Seconds to keep blobs after their last write (None to
+                keep forever)
+            compression_level: zlib compression level
+        """
+        self.root = Path(root)
+        self.threshold = threshold
+        self.ttl = ttl
+        self.compression_level = compression_level
+        self.put_count = 0
+        self.stats = {"spilled": 0, "spilled_bytes": 0, "stored_bytes": 0, "reads": 0}
+        
+        if self.threshold:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self.purge_expired()
+    
+    def spill(self, value: Any) -> Any:
+        """
+        Move large payloads inside a value to disk
+        
+        Args:
+            value: JSON-serializable value (e.g. an action result)
+        
+        Returns:
+            Value with large payloads replaced by blob references
+        """
+        if not self.threshold:
+            return value
+        
+        value = self._spill_strings(value)
+        
+        encoded = json.dumps(value, default=str)
+        if len(encoded) >= self.threshold:
+            return self.put(encoded.encode(), "json")
+        
+        return value
+    
+    def materialize(self, value: Any) -> Any:
+        """
+        Resolve blob references inside a value
+        
+        Args:
+            value: Value that may contain blob references
+        
+        Returns:
+            Value with all references replaced by their payloads
+        """
+        if isinstance(value, dict):
+            if _is_reference(value):
+                try:
+                    payload = self.get(value[BLOB_KEY]).decode()
+                except FileNotFoundError:
+                    logger.warning(f"Blob {value[BLOB_KEY]} has expired")
+                    return value
+                if value.get("type") == "json":
+                    return self.materialize(json.loads(payload))
+                return payload
+            return {key: self.materialize(item) for key, item in value.items()}
+        
+        if isinstance(value, list):
+            return [self.materialize(item) for item in value]
+        
+        return value
+    
+    def put(self, data: bytes, payload_type: str = "str") -> Dict[str, Any]:
+        """
+        Store a payload
+        
+        Args:
+            data: Payload bytes
+            payload_type: "str" for text, "json" for an encoded value
+        
+        Returns:
+            Blob reference
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._path(digest)
+        
+        if path.exists():
+            # Refresh the expiry of a payload that is still in use
+            os.utime(path)
+        else:
+            compressed = zlib.compress(data, self.compression_level)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with open(temp_path, "wb") as f:
+                f.write(compressed)
+            os.replace(temp_path, path)
+            self.stats["stored_bytes"] += len(compressed)
+        
+        self.stats["spilled"] += 1
+        self.stats["spilled_bytes"] += len(data)
+        
+        self.put_count += 1
+        if self.put_count % 1000 == 0:
+            self.purge_expired()
+        
+        return {BLOB_KEY: digest, "size": len(data), "type": payload_type}
+    
+    def get(self, digest: str) -> bytes:
+        """
+        Read a payload
+        
+        Args:
+            digest: SHA-256 of the payload
+        
+        Returns:
+            Payload bytes
+        
+        Raises:
+            FileNotFoundError: If the blob expired or never existed
+        """
+        self.stats["reads"] += 1
+        with open(self._path(digest), "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                return zlib.decompress(mapped)
+    
+    def purge_expired(self):
+        """Delete blobs not written for longer than the TTL"""
+        if not self.ttl or not self.root.exists():
+            return
+        
+        cutoff = time.time() - self.ttl
+        for path in self.root.glob("*/*"):
+            try:
+                if path.stat().st_mtime < cutoff:
+                    path.unlink()
+            except OSError as e:
+                logger.warning(f"Error purging blob {path.name}: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get spill counters"""
+        return dict(self.stats)
+    
+    def _spill_strings(self, value: Any) -> Any:
+        if isinstance(value, str):
+            if len(value) >= self.threshold:
+                return self.put(value.encode(), "str")
+            return value
+        
+        if isinstance(value, dict):
+            if _is_reference(value):
+                return value
+            return {key: self._spill_strings(item) for key, item in value.items()}
+        
+        if isinstance(value, list):
+            return [self._spill_strings(item) for item in value]
+        
+        return value
+    
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:]
+
+
+def _is_reference(value: Dict[str, Any]) -> bool:
+    return BLOB_KEY in value and isinstance(value[BLOB_KEY], str)
+
+
+# Global blob store instance
+blob_store = BlobStore(
+    root=settings.blob_store_path,
+    threshold=settings.blob_threshold,
+    ttl=settings.blob_ttl
+)
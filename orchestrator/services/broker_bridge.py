@@ -0,0 +1,75 @@
+"""
+Broker Extension Bridge
+Sends browser actions from worker processes through the shared broker
+"""
+
+import asyncio
+import time
+from typing import Dict, Any
+import uuid
+
+from services.task_broker import SQLiteTaskBroker
+
+
+class BrokerExtensionBridge:
+    """
+    Extension bridge for worker.py processes
+    
+    The extension registers with and answers the API process, so a worker
+    cannot reach it directly. Actions are queued in the broker instead; the
+    API process relays them to its own extension bridge and writes the
+    answer back (TaskQueue._relay_actions).
+    """
+    
+    def __init__(self, broker: SQLiteTaskBroker, worker_id: str, poll_interval: float = 0.05):
+        """
+        Initialize bridge
+        
+        Args:
+            broker: Shared task broker
+            worker_id: Identifier of this worker process
+            poll_interval: Seconds between checks for the answer
+        """
+        self.broker = broker
+        self.worker_id = worker_id
+        self.poll_interval = poll_interval
+    
+    async def send_action(self, action: Dict[str, Any], timeout: int = 30) -> Dict[str, Any]:
+        """
+        Send an action to the extension through the API process and wait for response
+        
+        Args:
+            action: Action to send
+            timeout: Timeout in seconds
+        
+        Returns:
+            Action result
+        """
+        action_id = str(uuid.uuid4())
+        self.broker.submit_action(action_id, self.worker_id, action, timeout)
+        
+        # Allow for the relay's own polling on top of the extension timeout
+        deadline = time.monotonic() + timeout + 1
+        
+        try:
+            while True:
+                answer = await asyncio.to_thread(self.broker.take_action_result, action_id)
+                if answer:
+                    result, error = answer
+                    if error is not None:
+                        raise Exception(error)
+                    return result
+                
+                if time.monotonic() >= deadline:
+                    await asyncio.to_thread(self.broker.abort_action, action_id)
+                    raise Exception(f"Action timeout after {timeout}s")
+                
+                await asyncio.sleep(self.poll_interval)
+        except asyncio.CancelledError:
+            # Caller gave up (task cancelled or deadline hit)
+            self.broker.abort_action(action_id)
+            raise
+    
+    def is_connected(self) -> bool:
+        """Actions are always accepted; the API process reports a missing extension"""
+        return True
@@ -0,0 +1,131 @@
+"""
+Checkpoint Store Service
+Persists agent state between graph steps so failed or interrupted runs can resume
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+from config import settings
+
+
+class CheckpointStore:
+    """
+    SQLite store of the latest agent state per run
+    
+    The agent saves its state after every graph node and every finished
+    plan step. Action results are already spilled to the blob store, so
+    checkpoints stay small. The database is shared by the API and worker
+    processes on the same machine.
+    """
+    
+    def __init__(self, db_path: str = "./data/checkpoints.db", ttl: Optional[int] = 86400):
+        """
+        Initialize checkpoint store
+        
+        Args:
+            db_path: Path to the SQLite database file
+            ttl: Seconds to keep checkpoints of unfinished runs (None to keep forever)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.save_count = 0
+        
+        self.conn = sqlite3.connect(str(self.db_path), timeout=10, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS checkpoints (
+                run_id TEXT PRIMARY KEY,
+                saved_at REAL NOT NULL,
+                state TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+        self.purge_expired()
+    
+    def save(self, run_id: str, state: Dict[str, Any]):
+        """
+        Save the state of a run, replacing the previous checkpoint
+        
+        Args:
+            run_id: Run identifier (the task ID)
+            state: Agent state
+        """
+        data = json.dumps(state, default=str)
+        
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (run_id, saved_at, state) VALUES (?, ?, ?)",
+                (run_id, time.time(), data)
+            )
+            self.conn.commit()
+            
+            self.save_count += 1
+            if self.save_count % 1000 == 0:
+                self.purge_expired()
+    
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Load the latest state of a run
+        
+        Args:
+            run_id: Run identifier
+        
+        Returns:
+            Agent state or None
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT state FROM checkpoints WHERE run_id = ?",
+                (run_id,)
+            ).fetchone()
+        
+        return json.loads(row[0]) if row else None
+    
+    def delete(self, run_id: str):
+        """
+        Delete the checkpoint of a finished run
+        
+        Args:
+            run_id: Run identifier
+        """
+        with self.lock:
+            self.conn.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            self.conn.commit()
+    
+    def purge_expired(self):
+        """Delete checkpoints older than the TTL"""
+        if not self.ttl:
+            return
+        
+        self.conn.execute(
+            "DELETE FROM checkpoints WHERE saved_at < ?",
+            (time.time() - self.ttl,)
+        )
+        self.conn.commit()
+
+
+def checkpointing_enabled() -> bool:
+    """
+    Decide whether runs are checkpointed
+    
+    Unless configured explicitly, checkpoints are only written when
+    something can resume from them: broker workers picking up the tasks
+    of a lost worker, or retried runs (task_max_attempts > 1).
+    """
+    if settings.checkpoint_enabled is not None:
+        return settings.checkpoint_enabled
+    return bool(settings.task_broker_path) or settings.task_max_attempts > 1
+
+
+# Global checkpoint store instance
+checkpoint_store = (
+    CheckpointStore(db_path=settings.checkpoint_path, ttl=settings.checkpoint_ttl)
+    if checkpointing_enabled() else None
+)
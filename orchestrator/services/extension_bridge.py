@@ -4,7 +4,8 @@ Handles communication with the browser extension
 """
 
 import asyncio
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Deque, Dict, Any, Optional
 import uuid
 
 
@@ -15,6 +16,7 @@ class ExtensionBridge:
         self.pending_requests: Dict[str, asyncio.Future] = {}
         self.extension_connected = False
         self.extension_id: Optional[str] = None
+        self.aborted_requests: Deque[str] = deque(maxlen=1000)
     
     def register_extension(self, extension_id: str):
         """Register a connected extension"""
@@ -58,20 +60,51 @@ class ExtensionBridge:
             result = await asyncio.wait_for(future, timeout=timeout)
             return result
         except asyncio.TimeoutError:
+            self.abort_action(request_id)
             raise Exception(f"Action timeout after {timeout}s")
+        except asyncio.CancelledError:
+            # Caller gave up (task cancelled or deadline hit)
+            self.abort_action(request_id)
+            raise
         finally:
             # Clean up
             if request_id in self.pending_requests:
                 del self.pending_requests[request_id]
     
+    def abort_action(self, request_id: str):
+        """
+        Abort a pending action
+        
+        Cancels the waiting future and records the abort, so a late
+        response is dropped and its sender is told the request was aborted.
+        
+        Args:
+            request_id: Request ID
+        """
+        future = self.pending_requests.pop(request_id, None)
+        if future and not future.done():
+            future.cancel()
+        
+        self.aborted_requests.append(request_id)
+    
+    def is_aborted(self, request_id: str) -> bool:
+        """Check if a request was aborted (recently enough to be remembered)"""
+        return request_id in self.aborted_requests
+    
     def receive_response(self, request_id: str, response: Dict[str, Any]):
         """
         Receive a response from the extension
         
+        Late responses to aborted requests are dropped.
+        
         Args:
             request_id: Request ID
             response: Response data
         """
+        if self.is_aborted(request_id):
+            print(f"Dropping late response for aborted request {request_id}")
+            return
+        
         if request_id in self.pending_requests:
             future = self.pending_requests[request_id]
             if not future.done():
@@ -85,6 +118,9 @@ class ExtensionBridge:
             request_id: Request ID
             error: Error message
         """
+        if self.is_aborted(request_id):
+            return
+        
         if request_id in self.pending_requests:
             future = self.pending_requests[request_id]
             if not future.done():
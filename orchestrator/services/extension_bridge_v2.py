@@ -6,21 +6,139 @@ Supports orchestrator-driven invisible browsing
 import asyncio
 import json
 import logging
-from typing import Dict, Optional, Callable, List
+import time
+from typing import Any, AsyncIterator, Dict, Optional, Callable, List, Set
 from datetime import datetime
 import uuid
+from services.wire_codec import WireCodec
 
 logger = logging.getLogger(__name__)
 
 
+# Weight of the newest sample in the per-connection latency average
+LATENCY_SMOOTHING = 0.2
+
+# Event handlers running longer than this are logged
+SLOW_HANDLER_SECONDS = 1.0
+
+# Optional protocol features an extension can announce in its hello
+SUPPORTED_FEATURES = {"batch"}
+
+# Commands that only read, so running them twice does no harm (every
+# EXTRACT_* action is treated the same way)
+IDEMPOTENT_ACTIONS = {
+    "LOAD_PAGE",
+    "FETCH",
+    "NAVIGATE",
+    "WAIT",
+    "INVISIBLE_BROWSE",
+    "EXTRACT",
+    "CHECK_PAGE_TYPE",
+    "GET_CONFIG",
+    "TEST_CONNECTION"
+}
+
+
+def is_idempotent(command: Dict) -> bool:
+    """
+    Decide whether a command is safe to send again after its connection dropped
+    
+    A command's own "idempotent" flag wins; otherwise read-only actions
+    (IDEMPOTENT_ACTIONS and every EXTRACT_* action) are safe.
+    
+    Args:
+        command: Command dictionary
+    
+    Returns:
+        True if running the command twice does no harm
+    """
+    if command.get("idempotent") is not None:
+        return bool(command["idempotent"])
+    
+    action = command.get("action") or ""
+    return action in IDEMPOTENT_ACTIONS or action.startswith("EXTRACT_")
+
+
+class ConnectionLost(Exception):
+    """The connection a command was sent on closed before it answered"""
+
+
+class FeatureUnsupported(Exception):
+    """No connected extension announced a protocol feature a command needs"""
+
+
 class ExtensionBridge:
-    """Bridge for communication between orchestrator and browser extension"""
+    """
+    Bridge for communication between orchestrator and browser extension
+    
+    Commands without a target connection go to the connection with the
+    fewest commands in flight, preferring the faster one on a tie. With
+    max_inflight_per_connection set, commands wait for a free slot
+    instead of piling onto a busy connection.
+    
+    Large results may arrive as response_chunk messages ({"seq": n,
+    "data": ..., "final": bool}). send_command assembles them into one
+    response; stream_command yields them in order as they arrive.
     
-    def __init__(self):
+    send_batch packs many commands into one frame for extensions that
+    announce the "batch" feature; their responses still arrive and
+    resolve one by one.
+    
+    Messages are JSON text frames until the extension sends a hello
+    offering binary framing; the connection then switches to
+    MessagePack frames, zstd-compressed above compression_threshold
+    bytes (see WireCodec).
+    
+    Event handlers run as background tasks, at most event_concurrency at
+    a time, so a slow handler never holds up command responses arriving
+    on the same socket. Up to event_backlog more handlers wait for a
+    slot; beyond that, emitting an event waits (backpressure on the
+    socket).
+    """
+    
+    def __init__(
+        self,
+        max_inflight_per_connection: int = 0,
+        event_concurrency: int = 8,
+        event_backlog: int = 100,
+        binary_frames: bool = True,
+        compression_threshold: int = 16384,
+        batch_size: int = 50
+    ):
+        """
+        Initialize bridge
+        
+        Args:
+            max_inflight_per_connection: Commands in flight per connection
+                (0 for unlimited)
+            event_concurrency: Event handlers running at once
+            event_backlog: Event handlers waiting to run before emitting blocks
+            binary_frames: Offer MessagePack framing to extensions that
+                support it
+            compression_threshold: Binary frames of at least this many
+                bytes are zstd-compressed
+            batch_size: Commands per batch frame
+        """
         self.connections: Dict[str, 'WebSocket'] = {}
         self.pending_commands: Dict[str, asyncio.Future] = {}
+        self.command_connections: Dict[str, str] = {}  # command ID -> owning connection
+        self.partial_responses: Dict[str, Dict[str, Any]] = {}  # chunks being assembled
+        self.chunk_queues: Dict[str, asyncio.Queue] = {}  # commands consumed as streams
+        self.redispatched = 0
         self.command_timeout = 120  # 2 minutes for long-running tasks
         self.event_handlers: Dict[str, List[Callable]] = {}
+        self.max_inflight = max_inflight_per_connection
+        self.load: Dict[str, Dict[str, Any]] = {}
+        self.slot_freed = asyncio.Event()
+        self.event_slots = asyncio.Semaphore(max(1, event_concurrency))
+        self.event_capacity = asyncio.Semaphore(max(1, event_concurrency) + max(0, event_backlog))
+        self.event_tasks: Set[asyncio.Task] = set()
+        self.handler_stats: Dict[str, Dict[str, Any]] = {}
+        self.binary_frames = binary_frames
+        self.compression_threshold = compression_threshold
+        self.codecs: Dict[str, WireCodec] = {}
+        self.features: Dict[str, Set[str]] = {}
+        self.batch_size = max(1, batch_size)
         logger.info("Extension bridge initialized")
     
     async def register_connection(self, websocket, connection_id: str):
@@ -32,6 +150,9 @@ class ExtensionBridge:
             connection_id: Unique connection identifier
         """
         self.connections[connection_id] = websocket
+        self.codecs[connection_id] = WireCodec(compression_threshold=self.compression_threshold)
+        self.load[connection_id] = {"inflight": 0, "latency": None, "completed": 0, "errors": 0}
+        self._notify_slot_freed()
         logger.info(f"Extension connected: {connection_id}")
         
         # Emit connection event
@@ -44,8 +165,20 @@ class ExtensionBridge:
         """Unregister extension connection"""
         if connection_id in self.connections:
             del self.connections[connection_id]
+            self.codecs.pop(connection_id, None)
+            self.features.pop(connection_id, None)
+            self.load.pop(connection_id, None)
             logger.info(f"Extension disconnected: {connection_id}")
             
+            # Wake the commands this connection owned instead of letting
+            # them wait out their timeout
+            for command_id, owner in list(self.command_connections.items()):
+                future = self.pending_commands.get(command_id)
+                if owner == connection_id and future and not future.done():
+                    future.set_exception(ConnectionLost(connection_id))
+            
+            self._notify_slot_freed()
+            
             await self.emit_event("extension_disconnected", {
                 "connection_id": connection_id,
                 "disconnected_at": datetime.now().isoformat()
@@ -55,15 +188,22 @@ class ExtensionBridge:
         self,
         command: Dict,
         connection_id: Optional[str] = None,
-        timeout: Optional[int] = None
+        timeout: Optional[int] = None,
+        idempotent: Optional[bool] = None
     ) -> Dict:
         """
         Send command to extension and wait for response
         
+        If the connection drops while the command is in flight, an
+        idempotent command is sent again on another connection right away;
+        any other command fails without waiting for the timeout.
+        
         Args:
             command: Command dictionary
-            connection_id: Specific connection to send to (or first available)
+            connection_id: Specific connection to send to (or least loaded)
             timeout: Command timeout in seconds
+            idempotent: Whether the command is safe to run twice (default:
+                decided by the command, see is_idempotent)
         
         Returns:
             Command response
@@ -71,45 +211,486 @@ class ExtensionBridge:
         if not self.connections:
             raise Exception("No extension connected")
         
-        # Get target connection
-        if connection_id and connection_id in self.connections:
-            websocket = self.connections[connection_id]
-        else:
-            # Use first available connection
-            websocket = next(iter(self.connections.values()))
+        if idempotent is None:
+            idempotent = is_idempotent(command)
+        
+        timeout_val = timeout or self.command_timeout
+        deadline = time.monotonic() + timeout_val
         
         # Generate command ID
         command_id = command.get("command_id") or str(uuid.uuid4())
         command["command_id"] = command_id
         
-        # Create future for response
-        future = asyncio.Future()
-        self.pending_commands[command_id] = future
+        while True:
+            # Get target connection, waiting for a free slot if all are busy
+            try:
+                connection_id = await asyncio.wait_for(
+                    self._acquire_connection(connection_id),
+                    timeout=max(0, deadline - time.monotonic())
+                )
+            except asyncio.TimeoutError:
+                return {"success": False, "error": "No extension connection available"}
+            
+            started = time.monotonic()
+            
+            # Create future for response, owned by the connection it is sent on
+            future = asyncio.Future()
+            self.pending_commands[command_id] = future
+            self.command_connections[command_id] = connection_id
+            
+            try:
+                # Send command
+                logger.info(f"Sending command {command_id} to {connection_id}: {command.get('action')}")
+                await self._send(connection_id, command)
+                
+                # Wait for response with timeout
+                response = await asyncio.wait_for(future, timeout=max(0, deadline - time.monotonic()))
+                
+                logger.info(f"Command {command_id} completed")
+                return response
+            
+            except ConnectionLost:
+                partial = self.partial_responses.pop(command_id, None)
+                streamed = partial and partial["delivered"]
+                
+                # Chunks already handed to a stream consumer cannot be replayed
+                if not idempotent or streamed or not self.connections:
+                    logger.error(f"Command {command_id} lost with connection {connection_id}")
+                    return {"success": False, "error": "Extension disconnected"}
+                
+                logger.warning(f"Re-dispatching command {command_id} lost with connection {connection_id}")
+                self.redispatched += 1
+            
+            except asyncio.TimeoutError:
+                logger.error(f"Command {command_id} timed out")
+                await self.abort_command(command_id, connection_id)
+                return {"success": False, "error": "Command timeout"}
+            
+            except asyncio.CancelledError:
+                logger.info(f"Command {command_id} cancelled")
+                await self.abort_command(command_id, connection_id)
+                raise
+            
+            except Exception as e:
+                logger.error(f"Command {command_id} error: {e}")
+                return {"success": False, "error": str(e)}
+            
+            finally:
+                # Clean up
+                if self.pending_commands.get(command_id) is future:
+                    del self.pending_commands[command_id]
+                    del self.command_connections[command_id]
+                    self.partial_responses.pop(command_id, None)
+                self._release_connection(connection_id, time.monotonic() - started, future)
+    
+    async def send_batch(
+        self,
+        commands: List[Dict],
+        timeout: Optional[int] = None,
+        idempotent: Optional[bool] = None,
+        max_inflight: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Send many commands and wait for all of their responses
+        
+        Commands are packed into {"type": "batch", "commands": [...]} frames
+        of at most batch_size commands, each frame going to the least loaded
+        connection that supports batching. A frame takes one in-flight slot
+        per command and never more than the connection has free; the rest
+        of the batch waits for slots and goes out in later frames. The
+        extension answers every command with its own response (or chunks),
+        so each command resolves, times out or is re-dispatched
+        independently. Without a batch-capable connection the commands are
+        sent one by one.
+        
+        Args:
+            commands: Command dictionaries
+            timeout: Timeout in seconds for each command
+            idempotent: Whether the commands are safe to run twice (see
+                send_command)
+            max_inflight: Commands of this batch in flight at once (None for
+                no limit beyond the connections' own)
+        
+        Returns:
+            Responses in command order
+        """
+        if not self.connections:
+            raise Exception("No extension connected")
+        
+        timeout_val = timeout or self.command_timeout
+        budget = {
+            "limit": max_inflight,
+            "inflight": 0,
+            "unbatched": asyncio.Semaphore(max_inflight) if max_inflight else None
+        }
+        groups = [
+            commands[start:start + self.batch_size]
+            for start in range(0, len(commands), self.batch_size)
+        ]
+        
+        sends = [
+            asyncio.create_task(self._send_batch_group(group, timeout_val, idempotent, budget))
+            for group in groups
+        ]
+        
+        try:
+            results = await asyncio.gather(*sends)
+        except BaseException:
+            # One group failed hard (or we were cancelled); stop the others
+            for send in sends:
+                send.cancel()
+            await asyncio.gather(*sends, return_exceptions=True)
+            raise
+        
+        return [response for group in results for response in group]
+    
+    async def _send_batch_group(
+        self,
+        commands: List[Dict],
+        timeout: float,
+        idempotent: Optional[bool],
+        budget: Dict[str, Any]
+    ) -> List[Dict]:
+        """
+        Send up to batch_size commands in as few frames as free slots allow
+        
+        Args:
+            commands: Commands of the group
+            timeout: Timeout in seconds for each command
+            idempotent: Whether the commands are safe to run twice
+            budget: In-flight limit and count shared by the whole batch
+        
+        Returns:
+            Responses in command order
+        """
+        deadline = time.monotonic() + timeout
+        results: List[Optional[Dict]] = [None] * len(commands)
+        waits: List[asyncio.Task] = []
+        sent = 0
+        
+        try:
+            while sent < len(commands):
+                try:
+                    connection_id, taken = await asyncio.wait_for(
+                        self._acquire_batch_slots(len(commands) - sent, budget),
+                        timeout=max(0, deadline - time.monotonic())
+                    )
+                except asyncio.TimeoutError:
+                    for index in range(sent, len(commands)):
+                        results[index] = {"success": False, "error": "No extension connection available"}
+                    break
+                except FeatureUnsupported:
+                    # No connection speaks the batch protocol
+                    results[sent:] = await asyncio.gather(*[
+                        self._send_unbatched(command, deadline, idempotent, budget)
+                        for command in commands[sent:]
+                    ])
+                    break
+                
+                frame = commands[sent:sent + taken]
+                waits.append(asyncio.create_task(
+                    self._send_batch_frame(frame, connection_id, deadline, idempotent, budget)
+                ))
+                sent += taken
+            
+            index = 0
+            for responses in await asyncio.gather(*waits):
+                for response in responses:
+                    results[index] = response
+                    index += 1
+        
+        finally:
+            # Frames already sent must not outlive a failed or cancelled batch
+            pending = [wait for wait in waits if not wait.done()]
+            for wait in pending:
+                wait.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        return results
+    
+    async def _send_unbatched(
+        self,
+        command: Dict,
+        deadline: float,
+        idempotent: Optional[bool],
+        budget: Dict[str, Any]
+    ) -> Dict:
+        """Send a batch command on its own, within the batch's in-flight limit"""
+        if not budget["unbatched"]:
+            return await self.send_command(command, timeout=max(0, deadline - time.monotonic()), idempotent=idempotent)
+        
+        async with budget["unbatched"]:
+            return await self.send_command(command, timeout=max(0, deadline - time.monotonic()), idempotent=idempotent)
+    
+    async def _acquire_batch_slots(self, wanted: int, budget: Dict[str, Any]):
+        """
+        Take as many slots as are free (up to wanted) on a batch-capable connection
+        
+        Args:
+            wanted: Commands still to send
+            budget: In-flight limit and count shared by the whole batch
+        
+        Returns:
+            (connection ID, number of slots taken)
+        """
+        while budget["limit"] and budget["inflight"] >= budget["limit"]:
+            slot_freed = self.slot_freed
+            await slot_freed.wait()
+        
+        if budget["limit"]:
+            wanted = min(wanted, budget["limit"] - budget["inflight"])
+        
+        connection_id, taken = await self._acquire_slots(feature="batch", count=wanted)
+        budget["inflight"] += taken
+        return connection_id, taken
+    
+    async def _send_batch_frame(
+        self,
+        commands: List[Dict],
+        connection_id: str,
+        deadline: float,
+        idempotent: Optional[bool],
+        budget: Dict[str, Any]
+    ) -> List[Dict]:
+        """Send one batch frame on slots already taken and wait for the response of each command"""
+        started = time.monotonic()
+        futures = []
+        
+        for command in commands:
+            command_id = command.get("command_id") or str(uuid.uuid4())
+            command["command_id"] = command_id
+            future = asyncio.Future()
+            self.pending_commands[command_id] = future
+            self.command_connections[command_id] = connection_id
+            futures.append(future)
         
         try:
-            # Send command
-            logger.info(f"Sending command {command_id}: {command.get('action')}")
-            await websocket.send_json(command)
+            logger.info(f"Sending batch of {len(commands)} commands to {connection_id}")
+            await self._send(connection_id, {"type": "batch", "commands": commands})
+        except Exception as e:
+            logger.error(f"Batch send error: {e}")
+            for future in futures:
+                if not future.done():
+                    future.set_exception(ConnectionLost(connection_id))
+        
+        async def wait(command: Dict, future: asyncio.Future) -> Dict:
+            command_id = command["command_id"]
+            lost = False
+            
+            try:
+                return await asyncio.wait_for(future, timeout=max(0, deadline - time.monotonic()))
+            
+            except ConnectionLost:
+                self.partial_responses.pop(command_id, None)
+                lost = True
+            
+            except asyncio.TimeoutError:
+                logger.error(f"Command {command_id} timed out")
+                await self.abort_command(command_id, connection_id)
+                return {"success": False, "error": "Command timeout"}
+            
+            except asyncio.CancelledError:
+                await self.abort_command(command_id, connection_id)
+                raise
+            
+            finally:
+                if self.pending_commands.get(command_id) is future:
+                    del self.pending_commands[command_id]
+                    del self.command_connections[command_id]
+                    self.partial_responses.pop(command_id, None)
+                budget["inflight"] -= 1
+                self._release_connection(connection_id, time.monotonic() - started, future)
+            
+            # Sent on a connection that went away: retry on another one if safe
+            safe = idempotent if idempotent is not None else is_idempotent(command)
+            remaining = deadline - time.monotonic()
+            if lost and safe and self.connections and remaining > 0:
+                logger.warning(f"Re-dispatching command {command_id} lost with connection {connection_id}")
+                self.redispatched += 1
+                return await self.send_command(command, timeout=remaining, idempotent=True)
+            
+            return {"success": False, "error": "Extension disconnected"}
+        
+        return await asyncio.gather(*[
+            wait(command, future) for command, future in zip(commands, futures)
+        ])
+    
+    async def _acquire_connection(
+        self,
+        connection_id: Optional[str] = None,
+        feature: Optional[str] = None
+    ) -> str:
+        """
+        Take a command slot on a connection
+        
+        Args:
+            connection_id: Preferred connection (used if still connected)
+            feature: Only use connections that announced this feature
+        
+        Returns:
+            ID of the connection to send on
+        
+        Raises:
+            Exception: If no (suitable) extension is connected
+        """
+        connection_id, _ = await self._acquire_slots(connection_id, feature)
+        return connection_id
+    
+    async def _acquire_slots(
+        self,
+        connection_id: Optional[str] = None,
+        feature: Optional[str] = None,
+        count: int = 1
+    ):
+        """
+        Take up to count command slots on one connection, waiting until at
+        least one is free
+        
+        Args:
+            connection_id: Preferred connection (used if still connected)
+            feature: Only use connections that announced this feature
+            count: Slots wanted
+        
+        Returns:
+            (connection ID, number of slots taken)
+        
+        Raises:
+            Exception: If no extension is connected
+            FeatureUnsupported: If no connected extension has the feature
+        """
+        while True:
+            if not self.connections:
+                raise Exception("No extension connected")
+            
+            if connection_id in self.connections:
+                candidates = [connection_id]
+            else:
+                candidates = list(self.connections)
             
-            # Wait for response with timeout
-            timeout_val = timeout or self.command_timeout
-            response = await asyncio.wait_for(future, timeout=timeout_val)
+            if feature:
+                candidates = [
+                    candidate for candidate in candidates
+                    if feature in self.features.get(candidate, ())
+                ]
+                if not candidates:
+                    raise FeatureUnsupported(f"No extension connection supports {feature}")
             
-            logger.info(f"Command {command_id} completed")
-            return response
+            available = [
+                candidate for candidate in candidates
+                if not self.max_inflight or self.load[candidate]["inflight"] < self.max_inflight
+            ]
+            
+            if available:
+                chosen = min(available, key=self._load_key)
+                taken = count
+                if self.max_inflight:
+                    taken = min(count, self.max_inflight - self.load[chosen]["inflight"])
+                self.load[chosen]["inflight"] += taken
+                return chosen, taken
+            
+            slot_freed = self.slot_freed
+            await slot_freed.wait()
+    
+    def _load_key(self, connection_id: str):
+        """Sort key: fewest commands in flight, then lowest average latency"""
+        load = self.load[connection_id]
+        return (load["inflight"], load["latency"] or 0.0)
+    
+    def _release_connection(self, connection_id: str, elapsed: float, future: asyncio.Future):
+        """Free a command slot and record how the command went"""
+        load = self.load.get(connection_id)
+        if load:
+            load["inflight"] -= 1
+            
+            if future.done() and not future.cancelled():
+                load["completed"] += 1
+                if load["latency"] is None:
+                    load["latency"] = elapsed
+                else:
+                    load["latency"] += LATENCY_SMOOTHING * (elapsed - load["latency"])
+            else:
+                # Timeouts count as slow so the connection gets less work
+                load["errors"] += 1
+                if load["latency"] is not None:
+                    load["latency"] += LATENCY_SMOOTHING * (elapsed - load["latency"])
         
-        except asyncio.TimeoutError:
-            logger.error(f"Command {command_id} timed out")
-            return {"success": False, "error": "Command timeout"}
+        self._notify_slot_freed()
+    
+    def _notify_slot_freed(self):
+        """Wake commands waiting for a connection slot"""
+        self.slot_freed.set()
+        self.slot_freed = asyncio.Event()
+    
+    async def abort_command(self, command_id: str, connection_id: str):
+        """
+        Tell the extension to stop working on a command
         
+        Args:
+            command_id: Command ID
+            connection_id: Connection the command was sent on
+        """
+        if connection_id not in self.connections:
+            return
+        
+        try:
+            await asyncio.shield(self._send(connection_id, {
+                "type": "abort",
+                "command_id": command_id
+            }))
         except Exception as e:
-            logger.error(f"Command {command_id} error: {e}")
-            return {"success": False, "error": str(e)}
+            logger.error(f"Error sending abort for {command_id}: {e}")
+    
+    async def _send(self, connection_id: str, message: Dict):
+        """Encode a message with the connection's codec and send it"""
+        websocket = self.connections[connection_id]
+        frame = self.codecs[connection_id].encode(message)
         
-        finally:
-            # Clean up
-            if command_id in self.pending_commands:
-                del self.pending_commands[command_id]
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
+    
+    def decode_frame(self, connection_id: str, frame: Any) -> Dict:
+        """
+        Decode a frame received on a connection
+        
+        Args:
+            connection_id: Connection identifier
+            frame: Text or binary frame (or an already decoded message)
+        
+        Returns:
+            Message dictionary
+        """
+        if isinstance(frame, dict):
+            return frame
+        return self.codecs[connection_id].decode(frame)
+    
+    async def handle_hello(self, connection_id: str, hello: Dict):
+        """
+        Negotiate framing and protocol features with an extension
+        
+        The acknowledgement is still sent as JSON; later messages use the
+        negotiated encoding. Both sides keep accepting JSON text frames.
+        
+        Args:
+            connection_id: Connection identifier
+            hello: Hello message listing the extension's encodings and
+                features (e.g. "features": ["batch"])
+        """
+        codec = WireCodec.negotiate(hello, self.binary_frames, self.compression_threshold)
+        features = SUPPORTED_FEATURES & set(hello.get("features") or [])
+        
+        await self._send(connection_id, {
+            "type": "hello_ack",
+            **codec.describe(),
+            "features": sorted(features)
+        })
+        
+        self.features[connection_id] = features
+        codec.stats = self.codecs[connection_id].stats
+        self.codecs[connection_id] = codec
+        logger.info(f"Extension {connection_id} uses {codec.encoding} frames (compression: {codec.compression})")
     
     async def handle_response(self, response: Dict):
         """
@@ -123,10 +704,147 @@ class ExtensionBridge:
         if command_id and command_id in self.pending_commands:
             future = self.pending_commands[command_id]
             if not future.done():
+                # A stream consumer gets an unchunked response as its only chunk
+                queue = self.chunk_queues.get(command_id)
+                if queue:
+                    queue.put_nowait({**response, "type": "response_chunk", "seq": 0, "final": True})
                 future.set_result(response)
         else:
             logger.warning(f"Received response for unknown command: {command_id}")
     
+    async def handle_chunk(self, chunk: Dict):
+        """
+        Handle one chunk of a chunked response
+        
+        Chunks are put back in sequence order and repeated chunks are
+        dropped. For a streamed command each
+        chunk goes to its consumer as soon as it is next in line; otherwise
+        the chunk data is kept and assembled into one response when the
+        last chunk arrives (see assemble_chunks). The final chunk
+        resolves the command with its remaining fields (e.g. success).
+        
+        Args:
+            chunk: Chunk dictionary
+        """
+        command_id = chunk.get("command_id")
+        future = self.pending_commands.get(command_id)
+        
+        if not future or future.done():
+            logger.warning(f"Received chunk for unknown command: {command_id}")
+            return
+        
+        partial = self.partial_responses.setdefault(
+            command_id, {"next_seq": 0, "buffer": {}, "parts": [], "delivered": 0}
+        )
+        seq = chunk.get("seq", partial["next_seq"])
+        if seq < partial["next_seq"] or seq in partial["buffer"]:
+            logger.debug(f"Dropping duplicate chunk {seq} of command {command_id}")
+            return
+        partial["buffer"][seq] = chunk
+        queue = self.chunk_queues.get(command_id)
+        
+        while partial["next_seq"] in partial["buffer"]:
+            chunk = partial["buffer"].pop(partial["next_seq"])
+            partial["next_seq"] += 1
+            
+            if queue:
+                queue.put_nowait(chunk)
+                partial["delivered"] += 1
+            else:
+                partial["parts"].append(chunk.get("data"))
+            
+            if chunk.get("final"):
+                response = {
+                    key: value for key, value in chunk.items()
+                    if key not in ("seq", "final", "data")
+                }
+                response["type"] = "response"
+                response.setdefault("success", True)
+                response["chunks"] = partial["next_seq"]
+                if not queue:
+                    response["data"] = assemble_chunks(partial["parts"])
+                future.set_result(response)
+                return
+    
+    async def stream_command(
+        self,
+        command: Dict,
+        connection_id: Optional[str] = None,
+        timeout: Optional[int] = None,
+        idempotent: Optional[bool] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Send command to extension and yield its response chunks as they arrive
+        
+        The command is sent with "stream": true so the extension knows it
+        may answer in chunks. Every yielded chunk has "seq" and "data";
+        the last one has "final": true plus the response status. A failed
+        or timed out command ends with a final chunk carrying the error;
+        one that could not be sent at all (e.g. no extension connected)
+        ends with a final chunk of type "error" instead of raising.
+        Leaving the loop early aborts the command.
+        
+        Args:
+            command: Command dictionary
+            connection_id: Specific connection to send to (or least loaded)
+            timeout: Command timeout in seconds
+            idempotent: Whether the command is safe to run twice (see
+                send_command); it is only re-dispatched before any chunk
+                was yielded
+        
+        Yields:
+            Response chunks in sequence order
+        """
+        command_id = command.get("command_id") or str(uuid.uuid4())
+        command["command_id"] = command_id
+        command["stream"] = True
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        self.chunk_queues[command_id] = queue
+        sender = asyncio.create_task(
+            self.send_command(command, connection_id, timeout, idempotent)
+        )
+        
+        try:
+            while True:
+                if queue.empty() and sender.done():
+                    # Ended without a final chunk: timeout, disconnect or error
+                    try:
+                        response = sender.result()
+                    except Exception as e:
+                        yield {
+                            "type": "error",
+                            "command_id": command_id,
+                            "success": False,
+                            "error": str(e),
+                            "final": True
+                        }
+                        return
+                    yield {
+                        **response,
+                        "type": "response_chunk",
+                        "command_id": command_id,
+                        "final": True
+                    }
+                    return
+                
+                getter = asyncio.ensure_future(queue.get())
+                await asyncio.wait({getter, sender}, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                
+                chunk = getter.result()
+                yield chunk
+                if chunk.get("final"):
+                    return
+        finally:
+            if not sender.done():
+                sender.cancel()
+                await asyncio.gather(sender, return_exceptions=True)
+            del self.chunk_queues[command_id]
+    
     async def handle_event(self, event: Dict):
         """
         Handle event from extension
@@ -160,6 +878,9 @@ class ExtensionBridge:
         """
         Emit event to registered handlers
         
+        Each handler runs as its own task in the event pool. Returns once
+        every handler has been started, not when they finish.
+        
         Args:
             event_type: Event type
             data: Event data
@@ -167,10 +888,49 @@ class ExtensionBridge:
         handlers = self.event_handlers.get(event_type, [])
         
         for handler in handlers:
-            try:
-                await handler(data)
-            except Exception as e:
-                logger.error(f"Error in event handler for {event_type}: {e}")
+            # Backpressure: wait when the pool and its backlog are full
+            await self.event_capacity.acquire()
+            task = asyncio.create_task(self._run_handler(event_type, handler, data))
+            self.event_tasks.add(task)
+            task.add_done_callback(self.event_tasks.discard)
+    
+    async def _run_handler(self, event_type: str, handler: Callable, data: Dict):
+        """Run one event handler, recording how long it took"""
+        name = f"{event_type}:{getattr(handler, '__qualname__', repr(handler))}"
+        stats = self.handler_stats.setdefault(
+            name, {"calls": 0, "errors": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        )
+        
+        try:
+            async with self.event_slots:
+                started = time.monotonic()
+                try:
+                    await handler(data)
+                except Exception as e:
+                    stats["errors"] += 1
+                    logger.error(f"Error in event handler for {event_type}: {e}")
+                finally:
+                    elapsed = time.monotonic() - started
+                    stats["calls"] += 1
+                    stats["total_seconds"] += elapsed
+                    stats["max_seconds"] = max(stats["max_seconds"], elapsed)
+        finally:
+            self.event_capacity.release()
+        
+        if elapsed >= SLOW_HANDLER_SECONDS:
+            logger.warning(f"Slow event handler {name}: {elapsed:.2f}s")
+    
+    def get_handler_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get call counts and timings (seconds) per event handler"""
+        return {
+            name: {
+                "calls": stats["calls"],
+                "errors": stats["errors"],
+                "avg_seconds": round(stats["total_seconds"] / stats["calls"], 4) if stats["calls"] else None,
+                "max_seconds": round(stats["max_seconds"], 4)
+            }
+            for name, stats in self.handler_stats.items()
+        }
     
     async def broadcast(self, message: Dict):
         """
@@ -179,9 +939,9 @@ class ExtensionBridge:
         Args:
             message: Message to broadcast
         """
-        for connection_id, websocket in self.connections.items():
+        for connection_id in list(self.connections):
             try:
-                await websocket.send_json(message)
+                await self._send(connection_id, message)
             except Exception as e:
                 logger.error(f"Error broadcasting to {connection_id}: {e}")
     
@@ -196,6 +956,63 @@ class ExtensionBridge:
     def get_connection_ids(self) -> List[str]:
         """Get list of connected extension IDs"""
         return list(self.connections.keys())
+    
+    def get_connection_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Get commands in flight, average latency and counters per connection"""
+        return {
+            connection_id: {
+                **load,
+                "latency": round(load["latency"], 4) if load["latency"] is not None else None,
+                "wire": {**self.codecs[connection_id].describe(), **self.codecs[connection_id].stats}
+            }
+            for connection_id, load in self.load.items()
+        }
+
+
+def assemble_chunks(parts: List[Any]) -> Any:
+    """
+    Combine the data of all chunks of a response
+    
+    Lists are concatenated, strings joined and dicts merged per key (the
+    values of each key assembled the same way); anything else keeps the
+    last value.
+    """
+    parts = [part for part in parts if part is not None]
+    if not parts:
+        return None
+    
+    if all(isinstance(part, list) for part in parts):
+        return [item for part in parts for item in part]
+    if all(isinstance(part, str) for part in parts):
+        return "".join(parts)
+    if all(isinstance(part, dict) for part in parts):
+        keys: Dict[str, List[Any]] = {}
+        for part in parts:
+            for key, value in part.items():
+                keys.setdefault(key, []).append(value)
+        return {key: assemble_chunks(values) for key, values in keys.items()}
+    
+    return parts[-1]
+
+
+async def _receive_frames(websocket) -> AsyncIterator[Any]:
+    """Yield text and binary frames until the socket closes"""
+    if hasattr(websocket, "__aiter__"):
+        async for frame in websocket:
+            yield frame
+        return
+    
+    # Starlette WebSocket: read raw messages to get both frame kinds
+    while True:
+        message = await websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            return
+        
+        frame = message.get("bytes")
+        if frame is None:
+            frame = message.get("text")
+        if frame is not None:
+            yield frame
 
 
 # WebSocket endpoint handler
@@ -213,17 +1030,19 @@ async def websocket_endpoint(websocket, extension_bridge: ExtensionBridge):
         await extension_bridge.register_connection(websocket, connection_id)
         
         # Handle messages
-        async for message in websocket:
+        async for frame in _receive_frames(websocket):
             try:
-                if isinstance(message, str):
-                    data = json.loads(message)
-                else:
-                    data = message
-                
+                data = extension_bridge.decode_frame(connection_id, frame)
                 message_type = data.get("type")
                 
-                if message_type == "response":
+                # Responses are resolved right here; event handlers run in
+                # the bridge's event pool so they cannot stall this loop
+                if message_type == "hello":
+                    await extension_bridge.handle_hello(connection_id, data)
+                elif message_type == "response":
                     await extension_bridge.handle_response(data)
+                elif message_type == "response_chunk":
+                    await extension_bridge.handle_chunk(data)
                 elif message_type == "event":
                     await extension_bridge.handle_event(data)
                 else:
@@ -0,0 +1,182 @@
+"""
+Fair Queue Service
+Priority lanes with weighted fair queuing between tenants
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from api.models import TaskPriority
+from utils.stats import percentile
+
+
+class FairQueue:
+    """
+    Async queue with strict priority lanes and per-tenant fairness
+    
+    Lanes are served in priority order (interactive, normal, bulk). Inside a
+    lane, tenants are scheduled by weighted fair queuing: every item gets a
+    virtual finish tag of max(lane clock, tenant's last tag) + 1 / weight, and
+    the smallest tag is served first, so a tenant that dumps hundreds of
+    items only gets its weighted share of the lane.
+    """
+    
+    def __init__(self, tenant_weights: Optional[Dict[str, float]] = None, sample_size: int = 1000):
+        """
+        Initialize fair queue
+        
+        Args:
+            tenant_weights: Scheduling weight per tenant (default 1.0)
+            sample_size: Number of recent queue-wait samples kept per lane
+        """
+        self.tenant_weights = tenant_weights or {}
+        self.lanes: Dict[TaskPriority, List[Tuple[float, int, str, Any, float]]] = {
+            lane: [] for lane in TaskPriority
+        }
+        self.virtual_time: Dict[TaskPriority, float] = {lane: 0.0 for lane in TaskPriority}
+        self.last_tag: Dict[Tuple[TaskPriority, str], float] = {}
+        self.wait_samples: Dict[TaskPriority, Deque[float]] = {
+            lane: deque(maxlen=sample_size) for lane in TaskPriority
+        }
+        self.counter = itertools.count()
+        self.items = asyncio.Semaphore(0)
+        self.removed = 0
+        self.unfinished = 0
+        self.finished = asyncio.Event()
+        self.finished.set()
+    
+    def put_nowait(
+        self,
+        item: Any,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        tenant: str = "default"
+    ):
+        """
+        Add an item to its lane
+        
+        Args:
+            item: Item to queue
+            priority: Priority lane
+            tenant: Tenant the item belongs to
+        """
+        weight = self.tenant_weights.get(tenant, 1.0)
+        start = max(self.virtual_time[priority], self.last_tag.get((priority, tenant), 0.0))
+        tag = start + 1.0 / weight
+        self.last_tag[(priority, tenant)] = tag
+        
+        heapq.heappush(
+            self.lanes[priority],
+            (tag, next(self.counter), tenant, item, time.monotonic())
+        )
+        
+        self.unfinished += 1
+        self.finished.clear()
+        self.items.release()
+    
+    async def put(
+        self,
+        item: Any,
+        priority: TaskPriority = TaskPriority.NORMAL,
+        tenant: str = "default"
+    ):
+        """Add an item to its lane (never blocks)"""
+        self.put_nowait(item, priority, tenant)
+    
+    async def get(self) -> Any:
+        """
+        Remove and return the next item, waiting until one is available
+        
+        Returns:
+            Item from the highest-priority non-empty lane
+        """
+        while True:
+            await self.items.acquire()
+            
+            for lane in TaskPriority:
+                heap = self.lanes[lane]
+                if heap:
+                    tag, _, tenant, item, enqueued_at = heapq.heappop(heap)
+                    self.virtual_time[lane] = tag
+                    self.wait_samples[lane].append(time.monotonic() - enqueued_at)
+                    
+                    # Forget idle tenants so the tag table stays bounded
+                    if not heap:
+                        self.last_tag = {
+                            key: value for key, value in self.last_tag.items()
+                            if key[0] != lane
+                        }
+                    
+                    return item
+            
+            if not self.removed:
+                raise RuntimeError("FairQueue semaphore out of sync with lanes")
+            
+            # The permit of an item that was removed
+            self.removed -= 1
+    
+    def remove(self, item: Any) -> bool:
+        """
+        Remove a queued item that will not be needed (e.g. a cancelled task)
+        
+        Args:
+            item: Item to remove
+        
+        Returns:
+            True if the item was queued
+        """
+        for heap in self.lanes.values():
+            for index, entry in enumerate(heap):
+                if entry[3] == item:
+                    heap[index] = heap[-1]
+                    heap.pop()
+                    heapq.heapify(heap)
+                    
+                    # get() skips the semaphore permit the item was given
+                    self.removed += 1
+                    self.task_done()
+                    return True
+        
+        return False
+    
+    def task_done(self):
+        """Mark a previously fetched item as processed"""
+        if self.unfinished <= 0:
+            raise ValueError("task_done() called too many times")
+        self.unfinished -= 1
+        if self.unfinished == 0:
+            self.finished.set()
+    
+    async def join(self):
+        """Wait until every queued item has been processed"""
+        await self.finished.wait()
+    
+    def qsize(self) -> int:
+        """Number of queued items across all lanes"""
+        return sum(len(heap) for heap in self.lanes.values())
+    
+    def lane_sizes(self) -> Dict[str, int]:
+        """Number of queued items per lane"""
+        return {lane.value: len(heap) for lane, heap in self.lanes.items()}
+    
+    def wait_percentiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Queue-wait percentiles per lane over recent samples
+        
+        Returns:
+            Dictionary of lane -> {p50, p90, p99, samples} in seconds
+        """
+        stats = {}
+        
+        for lane, samples in self.wait_samples.items():
+            ordered = sorted(samples)
+            stats[lane.value] = {
+                "p50": percentile(ordered, 0.50),
+                "p90": percentile(ordered, 0.90),
+                "p99": percentile(ordered, 0.99),
+                "samples": len(ordered)
+            }
+        
+        return stats
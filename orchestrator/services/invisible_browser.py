@@ -3,11 +3,11 @@ Invisible Browser Service - Orchestrator-driven invisible browsing
 Controls extension to perform invisible background browsing tasks
 """
 
-import asyncio
 import logging
-from typing import Dict, List, Optional, Callable
+from typing import Any, AsyncIterator, Dict, List, Optional, Callable
 from datetime import datetime
 import uuid
+from services.extension_bridge_v2 import assemble_chunks
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +29,7 @@ class BrowsingTask:
         self.status = "pending"
         self.result = None
         self.error = None
+        self.chunks_received = 0
         self.created_at = datetime.now()
         self.started_at = None
         self.completed_at = None
@@ -42,12 +43,20 @@ class BrowsingTask:
             "status": self.status,
             "result": self.result,
             "error": self.error,
+            "chunks_received": self.chunks_received,
             "created_at": self.created_at.isoformat() if self.created_at else None,
             "started_at": self.started_at.isoformat() if self.started_at else None,
             "completed_at": self.completed_at.isoformat() if self.completed_at else None
         }
 
 
+def _people_url(company_url: str) -> str:
+    """Get the people page URL of a LinkedIn company"""
+    if company_url.endswith("/people/"):
+        return company_url
+    return company_url.rstrip("/") + "/people/"
+
+
 class InvisibleBrowser:
     """Manages invisible browsing tasks through extension"""
     
@@ -56,7 +65,7 @@ class InvisibleBrowser:
         self.session_manager = session_manager
         self.tasks: Dict[str, BrowsingTask] = {}
         self.active_tasks: List[str] = []
-        self.max_concurrent = 5
+        self.max_concurrent = 5  # browsing tasks of one browse_many call in flight at once
         logger.info("Invisible browser initialized")
     
     async def browse_and_extract(
@@ -78,62 +87,172 @@ class InvisibleBrowser:
         Returns:
             Extraction result
         """
+        task = self._create_task(url, extraction_type, params)
+        
+        async for _ in self._run_task(task, use_session):
+            pass
+        
+        return task.to_dict()
+    
+    async def stream_extract(
+        self,
+        url: str,
+        extraction_type: str,
+        params: Optional[Dict] = None,
+        use_session: bool = True
+    ) -> AsyncIterator[Any]:
+        """
+        Browse to URL invisibly and yield extracted data as it arrives
+        
+        The extension may send a large result in chunks (e.g. one page of
+        employee cards per chunk); each chunk's data is yielded as soon
+        as it is received. The task's status and final result are
+        tracked as in browse_and_extract.
+        
+        Args:
+            url: URL to browse
+            extraction_type: Type of extraction
+            params: Additional parameters
+            use_session: Whether to use saved session cookies
+        
+        Yields:
+            Data of each response chunk
+        """
+        task = self._create_task(url, extraction_type, params)
+        
+        async for data in self._run_task(task, use_session):
+            yield data
+    
+    def _create_task(self, url: str, extraction_type: str, params: Optional[Dict]) -> BrowsingTask:
         task_id = str(uuid.uuid4())
         task = BrowsingTask(task_id, url, extraction_type, params)
         self.tasks[task_id] = task
         
         logger.info(f"Starting invisible browsing task: {task_id} - {url}")
+        return task
+    
+    async def _run_task(self, task: BrowsingTask, use_session: bool) -> AsyncIterator[Any]:
+        """
+        Send a browsing task to the extension and yield its result chunks
+        
+        Args:
+            task: Browsing task
+            use_session: Whether to use saved session cookies
+        
+        Yields:
+            Data of each response chunk
+        """
+        task_id = task.task_id
         
         try:
-            # Prepare command for extension
-            command = {
-                "task_id": task_id,
-                "action": "INVISIBLE_BROWSE",
-                "url": url,
-                "extraction_type": extraction_type,
-                "params": params or {},
-                "use_session": use_session
-            }
-            
-            # Add session cookies if available
-            if use_session and "linkedin.com" in url:
-                cookies = self.session_manager.get_session_cookies("linkedin")
-                if cookies:
-                    command["cookies"] = cookies
-                    logger.info(f"Using LinkedIn session for task {task_id}")
-            
-            # Send to extension
-            task.status = "running"
-            task.started_at = datetime.now()
-            self.active_tasks.append(task_id)
-            
-            result = await self.extension_bridge.send_command(command)
-            
-            # Process result
-            if result.get("success"):
-                task.status = "completed"
-                task.result = result.get("data")
-                logger.info(f"Task {task_id} completed successfully")
-            else:
-                task.status = "failed"
-                task.error = result.get("error", "Unknown error")
-                logger.error(f"Task {task_id} failed: {task.error}")
+            command = self._build_command(task, use_session)
+            self._start_task(task)
             
-            task.completed_at = datetime.now()
-            self.active_tasks.remove(task_id)
-            
-            return task.to_dict()
+            parts = []
+            async for chunk in self.extension_bridge.stream_command(command):
+                if chunk.get("data") is not None:
+                    parts.append(chunk["data"])
+                    task.chunks_received += 1
+                    yield chunk["data"]
+                
+                if chunk.get("final"):
+                    self._finish_task(task, {**chunk, "data": assemble_chunks(parts)})
         
         except Exception as e:
             logger.error(f"Error in browsing task {task_id}: {e}")
             task.status = "failed"
             task.error = str(e)
             task.completed_at = datetime.now()
+        
+        finally:
+            # The consumer stopped reading before the result was complete
+            if task.status == "running":
+                task.status = "cancelled"
+                task.completed_at = datetime.now()
             
             if task_id in self.active_tasks:
                 self.active_tasks.remove(task_id)
-            
-            return task.to_dict()
+    
+    async def browse_many(
+        self,
+        requests: List[Dict],
+        use_session: bool = True
+    ) -> List[Dict]:
+        """
+        Run many browsing tasks through one batched send
+        
+        At most max_concurrent of them are in flight at once; the others
+        go out as responses come back.
+        
+        Args:
+            requests: Dictionaries with url, extraction_type and optional params
+            use_session: Whether to use saved session cookies
+        
+        Returns:
+            Task results in request order
+        """
+        tasks = [
+            self._create_task(request["url"], request["extraction_type"], request.get("params"))
+            for request in requests
+        ]
+        commands = [self._build_command(task, use_session) for task in tasks]
+        
+        for task in tasks:
+            self._start_task(task)
+        
+        try:
+            responses = await self.extension_bridge.send_batch(
+                commands,
+                max_inflight=self.max_concurrent
+            )
+        except Exception as e:
+            logger.error(f"Error in batch of {len(tasks)} browsing tasks: {e}")
+            responses = [{"success": False, "error": str(e)} for _ in tasks]
+        
+        for task, response in zip(tasks, responses):
+            self._finish_task(task, response)
+        
+        return [task.to_dict() for task in tasks]
+    
+    def _build_command(self, task: BrowsingTask, use_session: bool) -> Dict:
+        """Build the extension command for a browsing task"""
+        command = {
+            "task_id": task.task_id,
+            "action": "INVISIBLE_BROWSE",
+            "url": task.url,
+            "extraction_type": task.action,
+            "params": task.params,
+            "use_session": use_session
+        }
+        
+        # Add session cookies if available
+        if use_session and "linkedin.com" in task.url:
+            cookies = self.session_manager.get_session_cookies("linkedin")
+            if cookies:
+                command["cookies"] = cookies
+                logger.info(f"Using LinkedIn session for task {task.task_id}")
+        
+        return command
+    
+    def _start_task(self, task: BrowsingTask):
+        task.status = "running"
+        task.started_at = datetime.now()
+        self.active_tasks.append(task.task_id)
+    
+    def _finish_task(self, task: BrowsingTask, response: Dict):
+        """Record the extension's response on a task"""
+        if response.get("success"):
+            task.status = "completed"
+            task.result = response.get("data")
+            logger.info(f"Task {task.task_id} completed successfully")
+        else:
+            task.status = "failed"
+            task.error = response.get("error", "Unknown error")
+            logger.error(f"Task {task.task_id} failed: {task.error}")
+        
+        task.completed_at = datetime.now()
+        if task.task_id in self.active_tasks:
+            self.active_tasks.remove(task.task_id)
     
     async def extract_company_employees(
         self,
@@ -151,8 +270,7 @@ class InvisibleBrowser:
             Employee data
         """
         # Ensure we have people page URL
-        if not company_url.endswith("/people/"):
-            company_url = company_url.rstrip("/") + "/people/"
+        company_url = _people_url(company_url)
         
         logger.info(f"Extracting employees from: {company_url}")
         
@@ -165,6 +283,33 @@ class InvisibleBrowser:
         
         return result
     
+    async def stream_company_employees(
+        self,
+        company_url: str,
+        max_pages: int = 6
+    ) -> AsyncIterator[Any]:
+        """
+        Extract employees from LinkedIn company page, page by page
+        
+        Args:
+            company_url: LinkedIn company URL
+            max_pages: Maximum pages to scrape
+        
+        Yields:
+            Employee data of each page as the extension sends it
+        """
+        company_url = _people_url(company_url)
+        
+        logger.info(f"Streaming employees from: {company_url}")
+        
+        async for page in self.stream_extract(
+            url=company_url,
+            extraction_type="company_employees",
+            params={"max_pages": max_pages},
+            use_session=True
+        ):
+            yield page
+    
     async def extract_multiple_companies(
         self,
         company_urls: List[str],
@@ -182,18 +327,15 @@ class InvisibleBrowser:
         """
         logger.info(f"Extracting from {len(company_urls)} companies in parallel")
         
-        # Create tasks
-        tasks = [
-            self.extract_company_employees(url, max_pages)
+        # One batched send instead of a frame and round of waiting per company
+        results = await self.browse_many([
+            {
+                "url": _people_url(url),
+                "extraction_type": "company_employees",
+                "params": {"max_pages": max_pages}
+            }
             for url in company_urls
-        ]
-        
-        # Execute in parallel with concurrency limit
-        results = []
-        for i in range(0, len(tasks), self.max_concurrent):
-            batch = tasks[i:i + self.max_concurrent]
-            batch_results = await asyncio.gather(*batch, return_exceptions=True)
-            results.extend(batch_results)
+        ])
         
         logger.info(f"Completed extraction from {len(company_urls)} companies")
         
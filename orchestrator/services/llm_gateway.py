@@ -0,0 +1,344 @@
+"""
+LLM Gateway Service
+Process-wide rate limiting and client sharing for LLM calls
+"""
+
+import asyncio
+import json
+import logging
+import re
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+import openai
+from langchain_openai import ChatOpenAI
+from config import settings
+from utils.stats import percentile
+
+logger = logging.getLogger(__name__)
+
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+# Failures worth another try that say nothing about the rate limit
+TRANSIENT_ERRORS = (openai.APIConnectionError, openai.InternalServerError)
+
+
+class LLMGateway:
+    """
+    Shared gate in front of the LLM provider
+    
+    Every call takes one request and its estimated tokens from two token
+    buckets (requests/min and tokens/min) before it is sent. Callers wait
+    in arrival order, so a burst from one task cannot starve the others.
+    A 429 pauses all callers for the Retry-After / x-ratelimit-reset time
+    the provider reports and the call is retried. Connection errors,
+    timeouts and 5xx responses are retried with backoff for that call
+    only. Time spent waiting for the gate is recorded separately from
+    model latency.
+    """
+    
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200000,
+        max_retries: int = 3,
+        output_tokens: int = 500,
+        sample_size: int = 1000
+    ):
+        """
+        Initialize gateway
+        
+        Args:
+            requests_per_minute: Request budget (0 for unlimited)
+            tokens_per_minute: Token budget (0 for unlimited)
+            max_retries: Retries after a rate-limit, connection, timeout or
+                5xx error
+            output_tokens: Completion tokens assumed per call until the
+                response shows the real size
+            sample_size: Number of recent timing samples kept
+        """
+        self.request_rate = requests_per_minute / 60
+        self.token_rate = tokens_per_minute / 60
+        self.request_capacity = float(requests_per_minute)
+        self.token_capacity = float(tokens_per_minute)
+        self.request_bucket = self.request_capacity
+        self.token_bucket = self.token_capacity
+        self.refilled_at = time.monotonic()
+        self.blocked_until = 0.0
+        self.max_retries = max_retries
+        self.output_tokens = output_tokens
+        
+        self.lock = asyncio.Lock()
+        self.waiting = 0
+        self.clients: Dict[Any, ChatOpenAI] = {}
+        self.queue_delays: Deque[float] = deque(maxlen=sample_size)
+        self.latencies: Deque[float] = deque(maxlen=sample_size)
+        self.stats = {"requests": 0, "rate_limited": 0, "transient_errors": 0, "retries": 0, "tokens": 0}
+    
+    def get_llm(self, temperature: float = 0.7) -> ChatOpenAI:
+        """
+        Get the shared chat model client
+        
+        Clients are created once per process and setting, so every agent
+        shares the same connection pool. Provider retries are disabled:
+        the gateway retries rate-limit and transient errors itself, so
+        every attempt goes through the rate limit.
+        
+        Args:
+            temperature: Sampling temperature
+        
+        Returns:
+            ChatOpenAI instance
+        """
+        key = (settings.openai_model, settings.openai_base_url, temperature)
+        
+        if key not in self.clients:
+            self.clients[key] = ChatOpenAI(
+                model=settings.openai_model,
+                api_key=settings.openai_api_key,
+                base_url=settings.openai_base_url,
+                temperature=temperature,
+                max_retries=0
+            )
+        
+        return self.clients[key]
+    
+    async def ainvoke(self, runnable, inputs: Dict[str, Any], timings: Optional[Dict[str, Any]] = None):
+        """
+        Invoke a chain under the rate limit
+        
+        Args:
+            runnable: Chain ending in a chat model
+            inputs: Chain inputs
+            timings: Optional dict (e.g. task metadata) that accumulates
+                llm_queue_seconds and llm_seconds
+        
+        Returns:
+            Model response
+        """
+        tokens = self._estimate(inputs)
+        
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens, timings)
+            started = time.monotonic()
+            
+            try:
+                response = await runnable.ainvoke(inputs)
+            except openai.RateLimitError as e:
+                self._rate_limited(e, attempt)
+                if attempt == self.max_retries:
+                    raise
+                continue
+            except TRANSIENT_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                await self._back_off(e, attempt)
+                continue
+            
+            self._finish(started, tokens, response.content, timings)
+            return response
+    
+    async def astream(
+        self,
+        runnable,
+        inputs: Dict[str, Any],
+        timings: Optional[Dict[str, Any]] = None
+    ) -> AsyncIterator[Any]:
+        """
+        Stream a chain under the rate limit
+        
+        A rate-limit or transient error is retried only if no chunk was
+        produced yet.
+        
+        Args:
+            runnable: Chain ending in a chat model
+            inputs: Chain inputs
+            timings: Optional dict that accumulates llm timings
+        
+        Yields:
+            Model output chunks
+        """
+        tokens = self._estimate(inputs)
+        
+        for attempt in range(self.max_retries + 1):
+            await self._acquire(tokens, timings)
+            started = time.monotonic()
+            content = ""
+            
+            try:
+                async for chunk in runnable.astream(inputs):
+                    content += chunk.content
+                    yield chunk
+            except openai.RateLimitError as e:
+                self._rate_limited(e, attempt)
+                if content or attempt == self.max_retries:
+                    raise
+                continue
+            except TRANSIENT_ERRORS as e:
+                if content or attempt == self.max_retries:
+                    raise
+                await self._back_off(e, attempt)
+                continue
+            
+            self._finish(started, tokens, content, timings)
+            return
+    
+    async def _acquire(self, tokens: int, timings: Optional[Dict[str, Any]]):
+        """Wait in line until the buckets hold one request and the tokens"""
+        queued_at = time.monotonic()
+        self.waiting += 1
+        
+        try:
+            async with self.lock:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self.blocked_until - now
+                    
+                    if wait <= 0:
+                        wait = max(
+                            self._shortfall(self.request_bucket, 1, self.request_rate),
+                            self._shortfall(self.token_bucket, min(tokens, self.token_capacity), self.token_rate)
+                        )
+                    
+                    if wait <= 0:
+                        break
+                    
+                    await asyncio.sleep(wait)
+                
+                # Requests above the bucket size go into debt and slow later callers
+                self.request_bucket -= 1
+                self.token_bucket -= tokens
+        finally:
+            self.waiting -= 1
+        
+        delay = time.monotonic() - queued_at
+        self.queue_delays.append(delay)
+        if timings is not None:
+            timings["llm_queue_seconds"] = round(timings.get("llm_queue_seconds", 0) + delay, 4)
+    
+    def _shortfall(self, bucket: float, needed: float, rate: float) -> float:
+        """Seconds until a bucket holds the needed amount (0 if unlimited)"""
+        if rate <= 0 or bucket >= needed:
+            return 0
+        return (needed - bucket) / rate
+    
+    def _refill(self, now: float):
+        elapsed = now - self.refilled_at
+        self.refilled_at = now
+        self.request_bucket = min(self.request_capacity, self.request_bucket + elapsed * self.request_rate)
+        self.token_bucket = min(self.token_capacity, self.token_bucket + elapsed * self.token_rate)
+    
+    def _finish(self, started: float, tokens: int, content: str, timings: Optional[Dict[str, Any]]):
+        """Record latency and return the unused part of the token estimate"""
+        latency = time.monotonic() - started
+        self.latencies.append(latency)
+        if timings is not None:
+            timings["llm_seconds"] = round(timings.get("llm_seconds", 0) + latency, 4)
+        
+        used = tokens - self.output_tokens + len(content) // 4
+        self.token_bucket = min(self.token_capacity, self.token_bucket + tokens - used)
+        self.stats["requests"] += 1
+        self.stats["tokens"] += used
+    
+    def _rate_limited(self, error: openai.RateLimitError, attempt: int):
+        """Pause every caller for as long as the provider asks"""
+        self.stats["rate_limited"] += 1
+        if attempt < self.max_retries:
+            self.stats["retries"] += 1
+        
+        headers = getattr(getattr(error, "response", None), "headers", None) or {}
+        delay = _retry_delay(headers)
+        if delay is None:
+            delay = min(60, 2 ** attempt)
+        
+        # The provider's view of the remaining quota wins over ours
+        remaining = headers.get("x-ratelimit-remaining-tokens")
+        if remaining is not None and remaining.isdigit():
+            self.token_bucket = min(self.token_bucket, float(remaining))
+        if headers.get("x-ratelimit-remaining-requests") == "0":
+            self.request_bucket = min(self.request_bucket, 0)
+        
+        self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+        logger.warning(f"LLM rate limited, pausing calls for {delay:.1f}s")
+    
+    async def _back_off(self, error: Exception, attempt: int):
+        """Wait before retrying a call that failed for a transient reason"""
+        self.stats["retries"] += 1
+        self.stats["transient_errors"] += 1
+        delay = min(8, 0.5 * 2 ** attempt)
+        logger.warning(f"LLM call failed ({type(error).__name__}), retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+    
+    def _estimate(self, inputs: Dict[str, Any]) -> int:
+        """Estimate prompt plus completion tokens of a call"""
+        return len(json.dumps(inputs, default=str)) // 4 + self.output_tokens
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get gateway statistics
+        
+        Returns:
+            Counters, current queue and percentiles (seconds) of the wait
+            for the rate limit and of model latency
+        """
+        queue_delays = sorted(self.queue_delays)
+        latencies = sorted(self.latencies)
+        
+        return {
+            **self.stats,
+            "waiting": self.waiting,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+            "queue_delay": {
+                "p50": percentile(queue_delays, 0.50),
+                "p90": percentile(queue_delays, 0.90),
+                "p99": percentile(queue_delays, 0.99)
+            },
+            "latency": {
+                "p50": percentile(latencies, 0.50),
+                "p90": percentile(latencies, 0.90),
+                "p99": percentile(latencies, 0.99)
+            }
+        }
+
+
+def _retry_delay(headers) -> Optional[float]:
+    """Read the wait the provider asks for from rate-limit headers"""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    
+    if headers.get("retry-after"):
+        try:
+            return float(headers["retry-after"])
+        except ValueError:
+            pass
+    
+    # e.g. x-ratelimit-reset-tokens: 6m0s, x-ratelimit-reset-requests: 20ms
+    resets = [
+        _parse_duration(headers[name])
+        for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(name)
+    ]
+    resets = [reset for reset in resets if reset is not None]
+    return max(resets) if resets else None
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+# Global LLM gateway instance
+llm_gateway = LLMGateway(
+    requests_per_minute=settings.llm_requests_per_minute,
+    tokens_per_minute=settings.llm_tokens_per_minute,
+    max_retries=settings.llm_max_retries,
+    output_tokens=settings.llm_output_tokens
+)
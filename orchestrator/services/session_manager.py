@@ -3,6 +3,7 @@ Session Manager - Manages browser sessions and authentication
 Handles LinkedIn login persistence and cookie management
 """
 
+import asyncio
 import json
 import logging
 from typing import Dict, List, Optional
@@ -217,7 +218,8 @@ class BrowserSessionBridge:
         logger.info(f"Session captured for {platform}")
         
         if platform == "linkedin":
-            self.session_manager.store_linkedin_session(cookies, user_id)
+            # Writing the session file blocks; keep it off the event loop
+            await asyncio.to_thread(self.session_manager.store_linkedin_session, cookies, user_id)
             
             # Mark login as complete
             if platform in self.pending_logins:
@@ -0,0 +1,599 @@
+"""
+Task Broker Service
+SQLite-backed queue shared between API processes and worker processes
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+from api.models import TaskStatus, TaskPriority
+from services.task_store import Task
+from utils.stats import percentile
+
+
+LANE_ORDER = {lane: index for index, lane in enumerate(TaskPriority)}
+
+
+class SQLiteTaskBroker:
+    """
+    Shared task queue on a local SQLite database (WAL mode)
+    
+    API processes submit tasks and read results; worker processes started
+    with worker.py claim pending tasks, run them and write the outcome back.
+    Every process opens its own connection, so the broker must be created
+    after a worker process has started.
+    
+    Worker processes have no extension connection of their own, so their
+    browser actions are queued here as well (submit_action) and relayed
+    to the extension by an API process (claim_actions / finish_action).
+    
+    Running tasks are leased: their worker renews the lease with
+    heartbeat(), and tasks whose lease expired (the worker died and never
+    came back) are put back in the queue by requeue_expired().
+    
+    Lanes are served in priority order and tenants inside a lane by
+    weighted fair queuing, as in FairQueue: every task gets a virtual
+    finish tag of max(lane clock, tenant's last pending tag) + 1 / weight
+    when it is submitted, and claim() takes the smallest tag. The lane
+    clocks live in the database, so every API process tags alike.
+    
+    The connection may be used from worker threads (asyncio.to_thread);
+    statements of one broker instance are serialized by a lock.
+    """
+    
+    def __init__(
+        self,
+        db_path: str = "./data/broker.db",
+        ttl: Optional[int] = 86400,
+        lease: float = 60,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        sample_size: int = 1000
+    ):
+        """
+        Initialize broker
+        
+        Args:
+            db_path: Path to the shared SQLite database file
+            ttl: Seconds to keep finished tasks (None to keep forever)
+            lease: Seconds a running task stays claimed without a heartbeat
+            tenant_weights: Scheduling weight per tenant (default 1.0)
+            sample_size: Number of recently claimed tasks wait percentiles
+                are computed from
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.lease = lease
+        self.tenant_weights = tenant_weights or {}
+        self.sample_size = sample_size
+        self.lock = threading.RLock()
+        
+        self.conn = sqlite3.connect(
+            str(self.db_path), timeout=10, isolation_level=None, check_same_thread=False
+        )
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS broker_tasks (
+                task_id TEXT PRIMARY KEY,
+                lane INTEGER NOT NULL,
+                tenant TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker_id TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                enqueued_at REAL NOT NULL,
+                completed_at REAL,
+                heartbeat_at REAL,
+                finish_tag REAL NOT NULL DEFAULT 0,
+                started_at REAL,
+                data TEXT NOT NULL
+            )
+        """)
+        # Databases created before leases and fair queuing were added
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(broker_tasks)")}
+        if "heartbeat_at" not in columns:
+            self.conn.execute("ALTER TABLE broker_tasks ADD COLUMN heartbeat_at REAL")
+        if "finish_tag" not in columns:
+            self.conn.execute("ALTER TABLE broker_tasks ADD COLUMN finish_tag REAL NOT NULL DEFAULT 0")
+        if "started_at" not in columns:
+            self.conn.execute("ALTER TABLE broker_tasks ADD COLUMN started_at REAL")
+        self.conn.execute("DROP INDEX IF EXISTS idx_broker_pending")
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_broker_fair ON broker_tasks (status, lane, finish_tag)"
+        )
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_broker_started ON broker_tasks (started_at)"
+        )
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS broker_lanes (
+                lane INTEGER PRIMARY KEY,
+                virtual_time REAL NOT NULL
+            )
+        """)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS broker_actions (
+                action_id TEXT PRIMARY KEY,
+                worker_id TEXT NOT NULL,
+                status TEXT NOT NULL,
+                timeout REAL NOT NULL,
+                created_at REAL NOT NULL,
+                data TEXT NOT NULL,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_broker_actions_status ON broker_actions (status, created_at)"
+        )
+        self.purge_expired()
+    
+    def submit(self, task: Task, priority: TaskPriority = TaskPriority.NORMAL, tenant: str = "default"):
+        """
+        Add a task to the shared queue
+        
+        Args:
+            task: Task object
+            priority: Priority lane
+            tenant: Tenant the task belongs to
+        """
+        lane = LANE_ORDER[priority]
+        weight = self.tenant_weights.get(tenant, 1.0)
+        data = json.dumps(task.to_dict(), default=str)
+        
+        with self.lock:
+            # Tag and insert in one write transaction so concurrent
+            # submitters see each other's tags
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                start = self.conn.execute(
+                    """
+                    SELECT MAX(
+                        COALESCE((SELECT virtual_time FROM broker_lanes WHERE lane = ?), 0),
+                        COALESCE((
+                            SELECT MAX(finish_tag) FROM broker_tasks
+                            WHERE lane = ? AND tenant = ? AND status = ?
+                        ), 0)
+                    )
+                    """,
+                    (lane, lane, tenant, TaskStatus.PENDING.value)
+                ).fetchone()[0]
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO broker_tasks "
+                    "(task_id, lane, tenant, status, enqueued_at, finish_tag, data) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (task.task_id, lane, tenant, TaskStatus.PENDING.value, time.time(), start + 1.0 / weight, data)
+                )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+    
+    def claim(self, worker_id: str) -> Optional[Task]:
+        """
+        Atomically take the next pending task
+        
+        The highest lane with pending tasks is served; inside it, the task
+        with the smallest virtual finish tag, which advances the lane clock.
+        
+        Args:
+            worker_id: Identifier of the claiming worker
+        
+        Returns:
+            Task marked as running, or None if the queue is empty
+        """
+        now = time.time()
+        
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    """
+                    UPDATE broker_tasks SET status = ?, worker_id = ?, heartbeat_at = ?, started_at = ?
+                    WHERE task_id = (
+                        SELECT task_id FROM broker_tasks
+                        WHERE status = ?
+                        ORDER BY lane, finish_tag, enqueued_at
+                        LIMIT 1
+                    )
+                    RETURNING lane, finish_tag, data
+                    """,
+                    (TaskStatus.RUNNING.value, worker_id, now, now, TaskStatus.PENDING.value)
+                ).fetchone()
+                
+                if row:
+                    self.conn.execute(
+                        """
+                        INSERT INTO broker_lanes (lane, virtual_time) VALUES (?, ?)
+                        ON CONFLICT (lane) DO UPDATE SET virtual_time = MAX(virtual_time, excluded.virtual_time)
+                        """,
+                        (row[0], row[1])
+                    )
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            self.conn.execute("COMMIT")
+        
+        if not row:
+            return None
+        
+        return Task.from_dict(json.loads(row[2]))
+    
+    def heartbeat(self, worker_id: str) -> int:
+        """
+        Renew the lease on every running task of a worker
+        
+        Args:
+            worker_id: Worker identifier
+        
+        Returns:
+            Number of renewed tasks
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE broker_tasks SET heartbeat_at = ? WHERE worker_id = ? AND status = ?",
+                (time.time(), worker_id, TaskStatus.RUNNING.value)
+            )
+            return cursor.rowcount
+    
+    def requeue_worker(self, worker_id: str) -> int:
+        """
+        Put the running tasks of a worker that stopped without finishing
+        them back in the queue
+        
+        Called when a worker starts, so tasks left behind by a crashed
+        process with the same ID are claimed again right away and resume
+        from their checkpoints. Tasks asked to cancel are cancelled instead.
+        
+        Args:
+            worker_id: Worker identifier
+        
+        Returns:
+            Number of requeued tasks
+        """
+        return self._requeue("worker_id = ?", (worker_id,))
+    
+    def requeue_expired(self) -> int:
+        """
+        Put running tasks whose lease expired back in the queue
+        
+        Covers workers that crashed and were never restarted under the same
+        ID. Tasks asked to cancel are cancelled instead.
+        
+        Returns:
+            Number of requeued tasks
+        """
+        return self._requeue(
+            "(heartbeat_at IS NULL OR heartbeat_at < ?)",
+            (time.time() - self.lease,)
+        )
+    
+    def _requeue(self, condition: str, params: tuple) -> int:
+        """
+        Release the running tasks matching a condition
+        
+        Args:
+            condition: SQL condition on broker_tasks
+            params: Parameters of the condition
+        
+        Returns:
+            Number of requeued tasks
+        """
+        with self.lock:
+            self.conn.execute(
+                f"""
+                UPDATE broker_tasks SET status = ?, completed_at = ?
+                WHERE {condition} AND status = ? AND cancel_requested = 1
+                """,
+                (TaskStatus.CANCELLED.value, time.time(), *params, TaskStatus.RUNNING.value)
+            )
+            cursor = self.conn.execute(
+                f"""
+                UPDATE broker_tasks SET status = ?, worker_id = NULL, heartbeat_at = NULL
+                WHERE {condition} AND status = ?
+                """,
+                (TaskStatus.PENDING.value, *params, TaskStatus.RUNNING.value)
+            )
+            return cursor.rowcount
+    
+    def finish(self, task: Task):
+        """
+        Write the outcome of a task back
+        
+        Args:
+            task: Finished task
+        """
+        data = json.dumps(task.to_dict(), default=str)
+        
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broker_tasks SET status = ?, completed_at = ?, data = ? WHERE task_id = ?",
+                (task.status.value, time.time(), data, task.task_id)
+            )
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        """
+        Get a task by ID
+        
+        Args:
+            task_id: Task ID
+        
+        Returns:
+            Task object or None
+        """
+        tasks = self.get_many([task_id])
+        return tasks.get(task_id)
+    
+    def get_many(self, task_ids: List[str]) -> Dict[str, Task]:
+        """
+        Get the current state of several tasks
+        
+        Args:
+            task_ids: Task IDs
+        
+        Returns:
+            Dictionary of task ID to Task; the status reflects the broker row
+        """
+        rows = []
+        
+        with self.lock:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(task_ids), 500):
+                chunk = task_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows.extend(self.conn.execute(
+                    f"SELECT status, data FROM broker_tasks WHERE task_id IN ({placeholders})",
+                    chunk
+                ).fetchall())
+        
+        tasks = {}
+        for status, data in rows:
+            task = Task.from_dict(json.loads(data))
+            task.status = TaskStatus(status)
+            tasks[task.task_id] = task
+        
+        return tasks
+    
+    def cancel(self, task_id: str) -> bool:
+        """
+        Cancel a task: pending tasks are dropped, running ones are flagged
+        for their worker to abort
+        
+        Args:
+            task_id: Task ID
+        
+        Returns:
+            True if the task was pending or running
+        """
+        with self.lock:
+            cursor = self.conn.execute(
+                "UPDATE broker_tasks SET status = ?, completed_at = ? WHERE task_id = ? AND status = ?",
+                (TaskStatus.CANCELLED.value, time.time(), task_id, TaskStatus.PENDING.value)
+            )
+            if cursor.rowcount:
+                return True
+            
+            cursor = self.conn.execute(
+                "UPDATE broker_tasks SET cancel_requested = 1 WHERE task_id = ? AND status = ?",
+                (task_id, TaskStatus.RUNNING.value)
+            )
+            return bool(cursor.rowcount)
+    
+    def cancel_requested(self, worker_id: str) -> List[str]:
+        """
+        Get running tasks of a worker that were asked to cancel
+        
+        Args:
+            worker_id: Worker identifier
+        
+        Returns:
+            Task IDs to abort
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT task_id FROM broker_tasks WHERE worker_id = ? AND status = ? AND cancel_requested = 1",
+                (worker_id, TaskStatus.RUNNING.value)
+            ).fetchall()
+            return [row[0] for row in rows]
+    
+    def submit_action(self, action_id: str, worker_id: str, action: Dict, timeout: float):
+        """
+        Queue a browser action for an API process to send to the extension
+        
+        Args:
+            action_id: Unique action ID
+            worker_id: Identifier of the requesting worker
+            action: Action to send
+            timeout: Seconds the extension has to answer
+        """
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO broker_actions (action_id, worker_id, status, timeout, created_at, data) "
+                "VALUES (?, ?, 'pending', ?, ?, ?)",
+                (action_id, worker_id, timeout, time.time(), json.dumps(action, default=str))
+            )
+    
+    def claim_actions(self, limit: int = 100) -> List[tuple]:
+        """
+        Atomically take pending browser actions to relay
+        
+        Args:
+            limit: Maximum actions to take
+        
+        Returns:
+            List of (action_id, action, timeout)
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                UPDATE broker_actions SET status = 'running'
+                WHERE action_id IN (
+                    SELECT action_id FROM broker_actions
+                    WHERE status = 'pending'
+                    ORDER BY created_at
+                    LIMIT ?
+                )
+                RETURNING action_id, data, timeout
+                """,
+                (limit,)
+            ).fetchall()
+            return [(action_id, json.loads(data), timeout) for action_id, data, timeout in rows]
+    
+    def finish_action(self, action_id: str, result: Optional[Dict] = None, error: Optional[str] = None):
+        """
+        Write the extension's answer to a relayed action back
+        
+        Args:
+            action_id: Action ID
+            result: Response from the extension
+            error: Error message if the action failed
+        """
+        with self.lock:
+            self.conn.execute(
+                "UPDATE broker_actions SET status = 'done', result = ?, error = ? "
+                "WHERE action_id = ? AND status = 'running'",
+                (json.dumps(result, default=str) if error is None else None, error, action_id)
+            )
+            # The worker gave up on it; nobody will read the answer
+            self.conn.execute(
+                "DELETE FROM broker_actions WHERE action_id = ? AND status = 'aborted'",
+                (action_id,)
+            )
+    
+    def take_action_result(self, action_id: str) -> Optional[tuple]:
+        """
+        Get and remove the answer to a finished action
+        
+        Args:
+            action_id: Action ID
+        
+        Returns:
+            (result, error), or None while the action is still in flight
+        """
+        with self.lock:
+            row = self.conn.execute(
+                "DELETE FROM broker_actions WHERE action_id = ? AND status = 'done' RETURNING result, error",
+                (action_id,)
+            ).fetchone()
+            if not row:
+                return None
+            
+            result, error = row
+            return (json.loads(result) if result is not None else None), error
+    
+    def abort_action(self, action_id: str):
+        """
+        Withdraw an action the worker no longer waits for
+        
+        Pending actions are dropped; relayed ones are flagged so the API
+        process cancels them.
+        
+        Args:
+            action_id: Action ID
+        """
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM broker_actions WHERE action_id = ? AND status IN ('pending', 'done')",
+                (action_id,)
+            )
+            self.conn.execute(
+                "UPDATE broker_actions SET status = 'aborted' WHERE action_id = ? AND status = 'running'",
+                (action_id,)
+            )
+    
+    def aborted_actions(self, action_ids: List[str]) -> List[str]:
+        """
+        Get which of the given relayed actions were withdrawn by their worker
+        
+        Args:
+            action_ids: Action IDs being relayed
+        
+        Returns:
+            Action IDs to cancel
+        """
+        aborted = []
+        
+        with self.lock:
+            # Stay under SQLite's bound parameter limit
+            for start in range(0, len(action_ids), 500):
+                chunk = action_ids[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT action_id FROM broker_actions WHERE status = 'aborted' AND action_id IN ({placeholders})",
+                    chunk
+                ).fetchall()
+                aborted.extend(row[0] for row in rows)
+        
+        return aborted
+    
+    def qsize(self) -> int:
+        """Number of pending tasks"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM broker_tasks WHERE status = ?",
+                (TaskStatus.PENDING.value,)
+            ).fetchone()[0]
+    
+    def lane_sizes(self) -> Dict[str, int]:
+        """Number of pending tasks per lane"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT lane, COUNT(*) FROM broker_tasks WHERE status = ? GROUP BY lane",
+                (TaskStatus.PENDING.value,)
+            ).fetchall()
+        
+        counts = dict(rows)
+        return {lane.value: counts.get(index, 0) for lane, index in LANE_ORDER.items()}
+    
+    def wait_percentiles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """
+        Queue-wait percentiles per lane over the most recently claimed tasks
+        
+        Returns:
+            Dictionary of lane -> {p50, p90, p99, samples} in seconds
+        """
+        with self.lock:
+            rows = self.conn.execute(
+                """
+                SELECT lane, started_at - enqueued_at FROM broker_tasks
+                WHERE started_at IS NOT NULL
+                ORDER BY started_at DESC
+                LIMIT ?
+                """,
+                (self.sample_size,)
+            ).fetchall()
+        
+        stats = {}
+        
+        for lane, index in LANE_ORDER.items():
+            ordered = sorted(wait for row_lane, wait in rows if row_lane == index)
+            stats[lane.value] = {
+                "p50": percentile(ordered, 0.50),
+                "p90": percentile(ordered, 0.90),
+                "p99": percentile(ordered, 0.99),
+                "samples": len(ordered)
+            }
+        
+        return stats
+    
+    def purge_expired(self):
+        """Delete finished tasks older than the TTL"""
+        if not self.ttl:
+            return
+        
+        with self.lock:
+            self.conn.execute(
+                "DELETE FROM broker_tasks WHERE completed_at < ?",
+                (time.time() - self.ttl,)
+            )
+            self.conn.execute(
+                "DELETE FROM broker_actions WHERE created_at < ?",
+                (time.time() - self.ttl,)
+            )
+    
+    def close(self):
+        """Close the database connection"""
+        with self.lock:
+            self.conn.close()
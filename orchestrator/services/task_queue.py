@@ -4,58 +4,453 @@ Manages task execution queue
 """
 
 import asyncio
-from typing import Dict, Any, Optional
+import hashlib
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from typing import AsyncIterator, Dict, Any, List, Optional, Set
 import uuid
 from datetime import datetime
-from api.models import TaskStatus
+from api.models import TaskStatus, TaskPriority
+from agent.graph import explicit_plan
+from config import settings
+from services.blob_store import blob_store
+from services.fair_queue import FairQueue
+from services.task_broker import SQLiteTaskBroker
+from services.task_store import Task, TaskStore, InMemoryTaskStore, create_task_store
+from utils.urls import normalize_url
 
 
-class Task:
-    """Task object"""
-    
-    def __init__(self, task_id: str, request: Dict[str, Any]):
-        self.task_id = task_id
-        self.request = request
-        self.status = TaskStatus.PENDING
-        self.result: Optional[Any] = None
-        self.error: Optional[str] = None
-        self.created_at = datetime.now()
-        self.started_at: Optional[datetime] = None
-        self.completed_at: Optional[datetime] = None
+class QueueFullError(Exception):
+    """Raised when the queue cannot admit more work"""
+    
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
 
 
 class TaskQueue:
     """Task queue manager"""
     
-    def __init__(self, max_concurrent: int = 5):
+    def __init__(
+        self,
+        max_concurrent: int = 5,
+        store: Optional[TaskStore] = None,
+        coalesce: bool = True,
+        coalesce_window: float = 10,
+        default_priority: TaskPriority = TaskPriority.NORMAL,
+        tenant_priorities: Optional[Dict[str, str]] = None,
+        tenant_weights: Optional[Dict[str, float]] = None,
+        max_queue_depth: Optional[int] = None,
+        max_estimated_wait: Optional[float] = None,
+        broker: Optional[SQLiteTaskBroker] = None,
+        poll_interval: float = 0.05
+    ):
         self.max_concurrent = max_concurrent
-        self.tasks: Dict[str, Task] = {}
-        self.queue: asyncio.Queue = asyncio.Queue()
+        self.store = store if store is not None else InMemoryTaskStore()
+        self.queue = FairQueue(tenant_weights=tenant_weights)
+        self.default_priority = TaskPriority(default_priority)
+        self.tenant_priorities = tenant_priorities or {}
         self.running_tasks: Dict[str, asyncio.Task] = {}
+        self.workers: List[asyncio.Task] = []
+        
+        # Request coalescing
+        self.coalesce = coalesce
+        self.coalesce_window = coalesce_window
+        self.leaders: "OrderedDict[str, str]" = OrderedDict()
+        self.stats = {
+            "coalesced_inflight": 0,
+            "coalesced_recent": 0
+        }
+        
+        # Admission control
+        self.max_queue_depth = max_queue_depth
+        self.max_estimated_wait = max_estimated_wait
+        self.completion_times = deque(maxlen=100)  # busy-clock readings
+        self.active = 0
+        self.busy_total = 0.0
+        self.busy_since: Optional[float] = None
+        self.stats["rejected"] = 0
+        
+        # Shared broker mode: tasks run in worker.py processes
+        self.broker = broker
+        self.poll_interval = poll_interval
+        self.submitted: Dict[str, Task] = {}
+        self.relayed: Dict[str, asyncio.Task] = {}
+        self.claimed: Set[asyncio.Task] = set()
+        
+        # Final events being built for subscribers
+        self.finalizing: Set[asyncio.Task] = set()
+        
+        # Batch submissions, oldest evicted first
+        self.batches: "OrderedDict[str, List[str]]" = OrderedDict()
+        self.max_batches = 1000
+    
+    def _busy_clock(self) -> float:
+        """Seconds spent with at least one task running"""
+        if self.busy_since is None:
+            return self.busy_total
+        return self.busy_total + time.monotonic() - self.busy_since
+    
+    def _track_start(self):
+        """Count a task execution starting"""
+        if self.active == 0:
+            self.busy_since = time.monotonic()
+        self.active += 1
+    
+    def _track_finish(self):
+        """Count a task execution finishing and record its completion"""
+        self.completion_times.append(self._busy_clock())
+        self.active = max(0, self.active - 1)
+        if self.active == 0 and self.busy_since is not None:
+            self.busy_total += time.monotonic() - self.busy_since
+            self.busy_since = None
+    
+    def service_rate(self) -> Optional[float]:
+        """
+        Observed completion rate over the recent completions
+        
+        Measured on the busy clock, so idle periods between bursts do not
+        drag the rate down.
+        
+        Returns:
+            Tasks per second, or None until enough completions were seen
+        """
+        if len(self.completion_times) < 2:
+            return None
+        
+        span = self.completion_times[-1] - self.completion_times[0]
+        if span <= 0:
+            return None
+        
+        return (len(self.completion_times) - 1) / span
+    
+    def estimated_wait(self) -> Optional[float]:
+        """
+        Estimated seconds a newly queued task waits before it starts
+        
+        Returns:
+            Estimated wait, or None if the service rate is unknown
+        """
+        rate = self.service_rate()
+        if not rate:
+            return None
+        return self.queue_depth() / rate
     
-    def create_task(self, request: Dict[str, Any]) -> str:
+    def queue_depth(self) -> int:
+        """Number of tasks waiting to start (in the shared broker if one is used)"""
+        if self.broker:
+            return self.broker.qsize()
+        return self.queue.qsize()
+    
+    def check_admission(self, count: int = 1):
+        """
+        Check that the queue can take more tasks
+        
+        Args:
+            count: Number of tasks about to be submitted
+        
+        Raises:
+            QueueFullError: If the queue depth or estimated wait limit would be exceeded
+        """
+        queued = self.queue_depth()
+        rate = self.service_rate()
+        
+        # Queue depth allowed by each configured limit
+        allowed = []
+        if self.max_queue_depth is not None:
+            allowed.append(self.max_queue_depth)
+        if self.max_estimated_wait is not None and rate:
+            # Tasks that can start right away never wait
+            allowed.append(max(int(self.max_estimated_wait * rate), self.max_concurrent))
+        
+        if not allowed or queued + count <= min(allowed):
+            return
+        
+        self.stats["rejected"] += count
+        
+        # Time for the observed service rate to drain the excess
+        excess = queued + count - min(allowed)
+        retry_after = math.ceil(excess / rate) if rate else 5
+        
+        raise QueueFullError(
+            f"Task queue is full ({queued} queued)",
+            retry_after=max(1, retry_after)
+        )
+    
+    def create_task(self, request: Dict[str, Any], tenant: Optional[str] = None) -> str:
         """
         Create a new task
         
+        Identical requests of the same tenant and priority lane that are in
+        flight (or finished within the coalescing window) attach to the
+        existing task and share its result.
+        
         Args:
             request: Task request
-            
+            tenant: Caller identity (e.g. derived from the API key)
+        
         Returns:
             Task ID
         """
         task_id = str(uuid.uuid4())
         task = Task(task_id, request)
-        self.tasks[task_id] = task
+        if request.get("deadline"):
+            task.deadline = time.time() + request["deadline"]
+        self.store.add(task)
+        
+        # Callers bypassing the result cache want a fresh execution
+        metadata = request.get("metadata") or {}
+        if not self.coalesce or metadata.get("bypass_cache"):
+            return task_id
+        
+        tenant = self._resolve_tenant(metadata, tenant)
+        priority = self._resolve_priority(metadata.get("priority"), tenant)
+        task.coalesce_key = self._coalesce_key(request, tenant, priority)
+        leader = self._find_leader(task.coalesce_key)
+        
+        if not leader:
+            self.leaders[task.coalesce_key] = task_id
+        elif leader.is_done():
+            self.stats["coalesced_recent"] += 1
+            task.leader_id = leader.task_id
+            self._copy_outcome(leader, task)
+        else:
+            self.stats["coalesced_inflight"] += 1
+            task.leader_id = leader.task_id
+            leader.followers.append(task)
+            if leader.status != TaskStatus.PENDING:
+                self.update_task_status(task_id, leader.status)
+            
+            # The follower's own deadline applies while it waits on the leader
+            if task.deadline:
+                asyncio.get_running_loop().call_later(
+                    max(0, task.deadline - time.time()),
+                    self._expire_follower,
+                    task_id
+                )
+        
         return task_id
     
-    async def enqueue_task(self, task_id: str):
+    def _coalesce_key(self, request: Dict[str, Any], tenant: str, priority: TaskPriority) -> str:
+        """
+        Hash the parts of a request that determine its result
+        
+        The tenant keeps results from crossing tenants, and the lane keeps a
+        high-priority request from waiting behind a low-priority leader.
+        
+        Args:
+            request: Task request
+            tenant: Tenant the task belongs to
+            priority: Priority lane of the task
+        
+        Returns:
+            Hex digest identifying equivalent requests
+        """
+        prompt = request.get("prompt") or request.get("description") or ""
+        normalized = {
+            "prompt": " ".join(prompt.lower().split()),
+            "action": request.get("action"),
+            "actions": request.get("actions"),
+            "url": normalize_url(request.get("url") or ""),
+            "needsPlanning": request.get("needsPlanning"),
+            "session": (request.get("metadata") or {}).get("session_id"),
+            "tenant": tenant,
+            "lane": priority.value
+        }
+        encoded = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()
+    
+    def _find_leader(self, key: str) -> Optional[Task]:
+        """
+        Find a task whose result can be shared for the given key
+        
+        Args:
+            key: Coalescing key
+        
+        Returns:
+            Leader task or None
+        """
+        self._prune_leaders()
+        
+        leader_id = self.leaders.get(key)
+        if not leader_id:
+            return None
+        
+        leader = self.get_task(leader_id)
+        if not leader or not self._is_reusable(leader):
+            del self.leaders[key]
+            return None
+        
+        return leader
+    
+    def _is_reusable(self, task: Task) -> bool:
+        """Check if a task is in flight or completed within the coalescing window"""
+        if not task.is_done():
+            return True
+        if task.status != TaskStatus.COMPLETED or not task.completed_at:
+            return False
+        age = (datetime.now() - task.completed_at).total_seconds()
+        return age <= self.coalesce_window
+    
+    def _prune_leaders(self):
+        """Drop stale leaders from the front of the (creation-ordered) index"""
+        while self.leaders:
+            key, leader_id = next(iter(self.leaders.items()))
+            leader = self.get_task(leader_id)
+            if leader and self._is_reusable(leader):
+                break
+            del self.leaders[key]
+    
+    def _copy_outcome(self, source: Task, target: Task):
+        """Give a follower task the result or error of its leader"""
+        if source.status == TaskStatus.COMPLETED:
+            self.set_task_result(target.task_id, source.result)
+        else:
+            self.set_task_error(target.task_id, source.error)
+    
+    async def enqueue_task(self, task_id: str, tenant: Optional[str] = None):
         """
         Add task to queue
         
+        The lane comes from metadata["priority"], else the tenant's configured
+        lane, else the default. The tenant comes from metadata["tenant"], else
+        the caller identity passed in. Coalesced followers are not queued;
+        they finish with their leader.
+        
         Args:
             task_id: Task ID
+            tenant: Caller identity (e.g. derived from the API key)
         """
-        await self.queue.put(task_id)
+        task = self.get_task(task_id)
+        if not task or task.leader_id or task.is_done():
+            return
+        
+        metadata = task.request.get("metadata") or {}
+        tenant = self._resolve_tenant(metadata, tenant)
+        priority = self._resolve_priority(metadata.get("priority"), tenant)
+        # The agent keys cached tool results by tenant
+        task.request["metadata"] = {**metadata, "tenant": tenant}
+        
+        if self.broker:
+            self.broker.submit(task, priority=priority, tenant=tenant)
+            self.submitted[task_id] = task
+        else:
+            await self.queue.put(task_id, priority=priority, tenant=tenant)
+    
+    def _resolve_tenant(self, metadata: Dict[str, Any], tenant: Optional[str]) -> str:
+        """
+        Pick the tenant of a task: metadata["tenant"], else the caller identity
+        
+        Args:
+            metadata: Request metadata
+            tenant: Caller identity
+        
+        Returns:
+            Tenant identifier
+        """
+        return str(metadata.get("tenant") or tenant or "default")
+    
+    def _resolve_priority(self, requested: Optional[str], tenant: str) -> TaskPriority:
+        """
+        Pick the priority lane for a task
+        
+        Args:
+            requested: Priority from request metadata
+            tenant: Tenant identifier
+        
+        Returns:
+            Priority lane
+        """
+        for candidate in (requested, self.tenant_priorities.get(tenant)):
+            if candidate:
+                try:
+                    return TaskPriority(candidate)
+                except ValueError:
+                    pass
+        return self.default_priority
+    
+    def create_batch(self, task_ids: List[str]) -> str:
+        """
+        Record a batch of tasks submitted together
+        
+        Args:
+            task_ids: Task IDs in submission order
+        
+        Returns:
+            Batch ID
+        """
+        batch_id = str(uuid.uuid4())
+        self.batches[batch_id] = task_ids
+        
+        while len(self.batches) > self.max_batches:
+            self.batches.popitem(last=False)
+        
+        return batch_id
+    
+    def get_batch(self, batch_id: str) -> Optional[List[str]]:
+        """
+        Get task IDs of a batch
+        
+        Args:
+            batch_id: Batch ID
+        
+        Returns:
+            Task IDs or None
+        """
+        return self.batches.get(batch_id)
+    
+    async def as_completed(
+        self,
+        task_ids: List[str],
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[tuple]:
+        """
+        Yield tasks in completion order
+        
+        Args:
+            task_ids: Task IDs to wait for
+            timeout: Maximum total seconds to wait (None to wait for all)
+        
+        Yields:
+            (task_id, Task or None) as each task finishes; tasks still running
+            at the timeout are yielded last, unknown IDs first with None
+        """
+        waiters = {}
+        for task_id in task_ids:
+            task = self.get_task(task_id)
+            if not task:
+                yield task_id, None
+                continue
+            waiters[asyncio.ensure_future(task.done_event.wait())] = (task_id, task)
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout if timeout else None
+        
+        try:
+            while waiters:
+                remaining = deadline - loop.time() if deadline else None
+                if remaining is not None and remaining <= 0:
+                    break
+                
+                done, _ = await asyncio.wait(
+                    waiters,
+                    timeout=remaining,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                
+                for waiter in done:
+                    yield waiters.pop(waiter)
+            
+            # Timed out: report whatever is left in its current state
+            for task_id, task in list(waiters.values()):
+                yield task_id, task
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
     
     def get_task(self, task_id: str) -> Optional[Task]:
         """
@@ -63,11 +458,118 @@ class TaskQueue:
         
         Args:
             task_id: Task ID
-            
+        
         Returns:
             Task object or None
         """
-        return self.tasks.get(task_id)
+        task = self.store.get(task_id)
+        if not task and self.broker:
+            # Results are visible from any API process sharing the broker
+            task = self.broker.get(task_id)
+        return task
+    
+    async def wait_for_task(self, task_id: str, timeout: Optional[float] = None) -> Optional[Task]:
+        """
+        Wait until a task completes or fails
+        
+        Args:
+            task_id: Task ID
+            timeout: Maximum seconds to wait (None to wait forever)
+        
+        Returns:
+            Task object (possibly still running if the timeout was reached) or None
+        """
+        task = self.get_task(task_id)
+        if not task:
+            return None
+        
+        try:
+            await asyncio.wait_for(task.done_event.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        
+        return task
+    
+    def subscribe(self, task_id: str) -> Optional[asyncio.Queue]:
+        """
+        Subscribe to live updates of a task
+        
+        Subscribing before the task starts makes it run in streaming mode,
+        so every graph node update is published as it happens.
+        
+        Args:
+            task_id: Task ID
+        
+        Returns:
+            Queue of event dicts, or None if the task does not exist
+        """
+        task = self.get_task(task_id)
+        if not task:
+            return None
+        
+        updates: asyncio.Queue = asyncio.Queue()
+        task.listeners.append(updates)
+        
+        # Late subscribers still get the final event
+        if task.is_done():
+            self._send_final_event(task, [updates])
+        
+        return updates
+    
+    def unsubscribe(self, task_id: str, updates: asyncio.Queue):
+        """
+        Stop receiving updates of a task
+        
+        Args:
+            task_id: Task ID
+            updates: Queue returned by subscribe
+        """
+        task = self.get_task(task_id)
+        if task and updates in task.listeners:
+            task.listeners.remove(updates)
+    
+    def _publish(self, task: Task, event: Dict[str, Any]):
+        """Push an event to every subscriber of a task"""
+        for updates in task.listeners:
+            updates.put_nowait(event)
+    
+    def _relay(self, task: Task, event: Dict[str, Any]):
+        """Publish a progress event to a task and its coalesced followers"""
+        self._publish(task, event)
+        for follower in task.followers:
+            self._publish(follower, event)
+    
+    def _has_listeners(self, task: Task) -> bool:
+        """Check if a task or any of its followers is being streamed"""
+        return bool(task.listeners) or any(f.listeners for f in task.followers)
+    
+    def _send_final_event(self, task: Task, listeners: List[asyncio.Queue]):
+        """
+        Deliver the terminal event of a finished task to the given subscribers
+        
+        Building a result event reads large results back from the blob
+        store, so it runs in a background task off the event loop.
+        
+        Args:
+            task: Finished task
+            listeners: Subscriber queues to deliver to
+        """
+        sending = asyncio.create_task(self._final_event(task, listeners))
+        self.finalizing.add(sending)
+        sending.add_done_callback(self.finalizing.discard)
+    
+    async def _final_event(self, task: Task, listeners: List[asyncio.Queue]):
+        """Build the terminal event for a finished task and push it to subscribers"""
+        if task.status == TaskStatus.COMPLETED:
+            data = await asyncio.to_thread(blob_store.materialize, task.result)
+            event = {"type": "result", "data": data}
+        elif task.status == TaskStatus.CANCELLED:
+            event = {"type": "cancelled", "data": task.error}
+        else:
+            event = {"type": "error", "data": task.error}
+        
+        for updates in listeners:
+            updates.put_nowait(event)
     
     def update_task_status(self, task_id: str, status: TaskStatus):
         """
@@ -77,26 +579,42 @@ class TaskQueue:
             task_id: Task ID
             status: New status
         """
-        task = self.tasks.get(task_id)
+        task = self.store.get(task_id)
         if task:
             task.status = status
             if status == TaskStatus.RUNNING:
                 task.started_at = datetime.now()
-            elif status in [TaskStatus.COMPLETED, TaskStatus.FAILED]:
+                if not task.leader_id:
+                    self._track_start()
+                self._publish(task, {"type": "status", "data": status})
+                for follower in task.followers:
+                    self.update_task_status(follower.task_id, status)
+            elif task.is_done():
+                if task.started_at and not task.leader_id:
+                    self._track_finish()
                 task.completed_at = datetime.now()
+                self.store.save(task)
+                task.done_event.set()
+                if task.listeners:
+                    self._send_final_event(task, list(task.listeners))
     
     def set_task_result(self, task_id: str, result: Any):
         """
         Set task result
         
+        A task cancelled while its execution continued for coalesced
+        followers keeps its cancelled status; only the followers finish.
+        
         Args:
             task_id: Task ID
             result: Task result
         """
-        task = self.tasks.get(task_id)
+        task = self.store.get(task_id)
         if task:
-            task.result = result
-            self.update_task_status(task_id, TaskStatus.COMPLETED)
+            if not task.is_done():
+                task.result = result
+                self.update_task_status(task_id, TaskStatus.COMPLETED)
+            self._release_followers(task, result=result)
     
     def set_task_error(self, task_id: str, error: str):
         """
@@ -106,14 +624,305 @@ class TaskQueue:
             task_id: Task ID
             error: Error message
         """
-        task = self.tasks.get(task_id)
+        task = self.store.get(task_id)
         if task:
-            task.error = error
-            self.update_task_status(task_id, TaskStatus.FAILED)
+            if not task.is_done():
+                task.error = error
+                self.update_task_status(task_id, TaskStatus.FAILED)
+            self._release_followers(task, error=error)
+    
+    def _release_followers(self, task: Task, result: Any = None, error: Optional[str] = None):
+        """Finish every coalesced follower of a task with the same outcome"""
+        followers, task.followers = task.followers, []
+        for follower in followers:
+            if error is None:
+                self.set_task_result(follower.task_id, result)
+            else:
+                self.set_task_error(follower.task_id, error)
+    
+    def cancel_task(self, task_id: str, reason: str = "Task cancelled") -> bool:
+        """
+        Cancel a pending or running task
+        
+        A running execution is cancelled, which propagates through the agent
+        down to the pending extension request. If other clients are coalesced
+        onto the task, its execution keeps running for them.
+        
+        Args:
+            task_id: Task ID
+            reason: Error message recorded on the task
+        
+        Returns:
+            True if the task was cancelled, False if not found or already finished
+        """
+        task = self.get_task(task_id)
+        if not task or task.is_done():
+            return False
+        
+        task.error = reason
+        self.update_task_status(task_id, TaskStatus.CANCELLED)
+        
+        if task.leader_id:
+            self._detach_follower(task)
+        elif not task.followers:
+            self._abort_execution(task_id)
+        
+        return True
+    
+    def _expire_follower(self, task_id: str):
+        """Fail a coalesced follower whose deadline passed before its leader finished"""
+        task = self.get_task(task_id)
+        if not task or task.is_done():
+            return
+        
+        task.error = "Deadline exceeded"
+        self.update_task_status(task_id, TaskStatus.FAILED)
+        self._detach_follower(task)
+    
+    def _detach_follower(self, task: Task):
+        """Remove a finished follower from its leader, stopping the leader if nobody waits on it"""
+        leader = self.get_task(task.leader_id)
+        if leader and task in leader.followers:
+            leader.followers.remove(task)
+            # The leader's own client may have left already
+            if leader.status == TaskStatus.CANCELLED and not leader.followers:
+                self._abort_execution(leader.task_id)
+    
+    def _abort_execution(self, task_id: str):
+        """Cancel the asyncio task running a task, or drop it from the queue if it has not started"""
+        async_task = self.running_tasks.get(task_id)
+        if async_task:
+            async_task.cancel()
+        elif self.broker:
+            self.broker.cancel(task_id)
+        else:
+            # Cancelled tasks must not count towards the queue depth
+            self.queue.remove(task_id)
+    
+    async def process_queue(self, agent, extension_bridge=None):
+        """
+        Process task queue with a fixed pool of workers
+        
+        Runs max_concurrent worker coroutines that pull from the queue, so
+        a slot is handed to the next task the moment one finishes.
+        
+        In shared broker mode the tasks run in worker.py processes instead,
+        and this watches the broker for their progress and relays their
+        browser actions to the extension connected to this process.
+        
+        Args:
+            agent: BrowsingAgent instance
+            extension_bridge: Extension bridge to relay worker actions to
+                (broker mode only)
+        """
+        if self.broker:
+            self.workers = [asyncio.create_task(self._watch_broker())]
+            if extension_bridge:
+                self.workers.append(asyncio.create_task(self._relay_actions(extension_bridge)))
+        else:
+            self.workers = [
+                asyncio.create_task(self._worker(agent))
+                for _ in range(self.max_concurrent)
+            ]
+        
+        try:
+            await asyncio.gather(*self.workers)
+        except asyncio.CancelledError:
+            pass
+    
+    async def shutdown(self):
+        """
+        Stop all workers and cancel running tasks
+        
+        Returns once tasks claimed from the broker have written their
+        outcome back, so the broker can be closed afterwards.
+        """
+        for async_task in list(self.running_tasks.values()):
+            async_task.cancel()
+        
+        for worker in self.workers:
+            worker.cancel()
+        
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        
+        # Their executions were cancelled above; let them report it
+        await asyncio.gather(*self.claimed, return_exceptions=True)
+    
+    async def _watch_broker(self):
+        """
+        Mirror the status of tasks submitted to the broker onto local tasks
+        
+        Broker queries run in a worker thread so polling never blocks the
+        event loop.
+        """
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            
+            if not self.submitted:
+                continue
+            
+            remote = await asyncio.to_thread(self.broker.get_many, list(self.submitted))
+            
+            for task_id, remote_task in remote.items():
+                task = self.submitted[task_id]
+                
+                if remote_task.status == TaskStatus.RUNNING and task.status == TaskStatus.PENDING:
+                    self.update_task_status(task_id, TaskStatus.RUNNING)
+                elif remote_task.is_done():
+                    del self.submitted[task_id]
+                    if remote_task.status == TaskStatus.COMPLETED:
+                        self.set_task_result(task_id, remote_task.result)
+                    elif remote_task.status == TaskStatus.FAILED:
+                        self.set_task_error(task_id, remote_task.error)
+                    elif not task.is_done():
+                        self.cancel_task(task_id, remote_task.error or "Task cancelled")
+                    else:
+                        self._release_followers(task, error=task.error)
+    
+    async def _relay_actions(self, extension_bridge):
+        """
+        Send browser actions queued by worker processes to the extension
+        
+        Args:
+            extension_bridge: Extension bridge of this process
+        """
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            
+            # Cancel actions whose worker stopped waiting
+            if self.relayed:
+                for action_id in await asyncio.to_thread(self.broker.aborted_actions, list(self.relayed)):
+                    if action_id in self.relayed:
+                        self.relayed[action_id].cancel()
+            
+            for action_id, action, timeout in await asyncio.to_thread(self.broker.claim_actions):
+                self.relayed[action_id] = asyncio.create_task(
+                    self._relay_action(extension_bridge, action_id, action, timeout)
+                )
+    
+    async def _relay_action(self, extension_bridge, action_id: str, action: Dict[str, Any], timeout: float):
+        """
+        Send one worker action to the extension and write the answer back
+        
+        Args:
+            extension_bridge: Extension bridge of this process
+            action_id: Broker action ID
+            action: Action to send
+            timeout: Timeout in seconds
+        """
+        try:
+            result = await extension_bridge.send_action(action, timeout=timeout)
+            await asyncio.to_thread(self.broker.finish_action, action_id, result=result)
+        except asyncio.CancelledError:
+            self.broker.finish_action(action_id, error="Action aborted")
+        except Exception as e:
+            await asyncio.to_thread(self.broker.finish_action, action_id, error=str(e))
+        finally:
+            self.relayed.pop(action_id, None)
+    
+    async def consume_broker(self, agent, worker_id: str):
+        """
+        Worker-process loop: claim tasks from the shared broker and run them
+        
+        Runs up to max_concurrent tasks at a time and writes each outcome
+        back to the broker. Used by worker.py, which calls shutdown() after
+        cancelling this loop.
+        
+        Args:
+            agent: BrowsingAgent instance
+            worker_id: Identifier of this worker process
+        """
+        slots = asyncio.Semaphore(self.max_concurrent)
+        background = [
+            asyncio.create_task(self._heartbeat(worker_id)),
+            asyncio.create_task(self._watch_cancellations(worker_id))
+        ]
+        
+        try:
+            await self._claim_loop(agent, worker_id, slots)
+        finally:
+            for loop_task in background:
+                loop_task.cancel()
     
-    async def process_queue(self, agent):
+    async def _watch_cancellations(self, worker_id: str):
         """
-        Process task queue
+        Abort tasks whose cancellation was requested through the broker
+        
+        Runs on its own so cancellations are seen while every slot is busy.
+        
+        Args:
+            worker_id: Identifier of this worker process
+        """
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            for task_id in await asyncio.to_thread(self.broker.cancel_requested, worker_id):
+                self.cancel_task(task_id)
+    
+    async def _heartbeat(self, worker_id: str):
+        """
+        Renew the leases of this worker's running tasks and requeue tasks
+        whose worker stopped renewing them
+        
+        Args:
+            worker_id: Identifier of this worker process
+        """
+        while True:
+            await asyncio.sleep(self.broker.lease / 3)
+            await asyncio.to_thread(self.broker.heartbeat, worker_id)
+            await asyncio.to_thread(self.broker.requeue_expired)
+    
+    async def _claim_loop(self, agent, worker_id: str, slots: asyncio.Semaphore):
+        """
+        Claim tasks while a concurrency slot is free
+        
+        Args:
+            agent: BrowsingAgent instance
+            worker_id: Identifier of this worker process
+            slots: Concurrency semaphore
+        """
+        while True:
+            await slots.acquire()
+            task = await asyncio.to_thread(self.broker.claim, worker_id)
+            
+            if not task:
+                slots.release()
+                await asyncio.sleep(self.poll_interval)
+                continue
+            
+            self.store.add(task)
+            claimed = asyncio.create_task(self._run_claimed(task, agent, slots))
+            self.claimed.add(claimed)
+            claimed.add_done_callback(self.claimed.discard)
+    
+    async def _run_claimed(self, task: Task, agent, slots: asyncio.Semaphore):
+        """
+        Run a task claimed from the broker and report its outcome
+        
+        Args:
+            task: Claimed task
+            agent: BrowsingAgent instance
+            slots: Concurrency semaphore to release when done
+        """
+        try:
+            if task.deadline and time.time() >= task.deadline:
+                self.set_task_error(task.task_id, "Deadline exceeded before the task started")
+            else:
+                self.update_task_status(task.task_id, TaskStatus.RUNNING)
+                async_task = asyncio.create_task(
+                    self._execute_task(task.task_id, task, agent)
+                )
+                self.running_tasks[task.task_id] = async_task
+                await asyncio.wait([async_task])
+        
+        finally:
+            if task.is_done():
+                self.broker.finish(task)
+            slots.release()
+    
+    async def _worker(self, agent):
+        """
+        Worker loop: take one task at a time from the queue and run it
         
         Args:
             agent: BrowsingAgent instance
@@ -122,20 +931,27 @@ class TaskQueue:
             # Wait for task
             task_id = await self.queue.get()
             
-            # Wait if at max concurrent tasks
-            while len(self.running_tasks) >= self.max_concurrent:
-                await asyncio.sleep(0.1)
-            
-            # Start task
-            task = self.get_task(task_id)
-            if task:
+            try:
+                task = self.get_task(task_id)
+                if not task or task.is_done():
+                    continue
+                
+                if task.deadline and time.time() >= task.deadline:
+                    self.set_task_error(task_id, "Deadline exceeded before the task started")
+                    continue
+                
                 self.update_task_status(task_id, TaskStatus.RUNNING)
                 
-                # Create async task
+                # Run in its own asyncio task so it can be cancelled
+                # without taking the worker down with it
                 async_task = asyncio.create_task(
                     self._execute_task(task_id, task, agent)
                 )
                 self.running_tasks[task_id] = async_task
+                await asyncio.wait([async_task])
+            
+            finally:
+                self.queue.task_done()
     
     async def _execute_task(self, task_id: str, task: Task, agent):
         """
@@ -147,18 +963,31 @@ class TaskQueue:
             agent: BrowsingAgent instance
         """
         try:
-            # Get task prompt
+            # Get task prompt, and the actions if the caller already gave them
             prompt = task.request.get("prompt") or task.request.get("description")
+            plan = explicit_plan(task.request)
             
-            # Execute with agent
-            result = await agent.execute_task(
-                task=prompt,
-                metadata=task.request.get("metadata")
+            # Enforce the deadline over all attempts; expiry cancels the agent run
+            remaining = task.deadline - time.time() if task.deadline else None
+            result = await asyncio.wait_for(
+                self._run_attempts(task, agent, prompt, plan),
+                timeout=remaining
             )
             
             # Set result
             self.set_task_result(task_id, result)
-            
+        
+        except asyncio.TimeoutError:
+            self.set_task_error(task_id, "Deadline exceeded")
+        
+        except asyncio.CancelledError:
+            # Cancelled via cancel_task or shutdown
+            if not task.is_done():
+                task.error = "Task cancelled"
+                self.update_task_status(task_id, TaskStatus.CANCELLED)
+            self._release_followers(task, error="Task cancelled")
+            raise
+        
         except Exception as e:
             # Set error
             self.set_task_error(task_id, str(e))
@@ -167,7 +996,133 @@ class TaskQueue:
             # Remove from running tasks
             if task_id in self.running_tasks:
                 del self.running_tasks[task_id]
+    
+    async def _run_attempts(
+        self,
+        task: Task,
+        agent,
+        prompt: str,
+        plan: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Run the agent, retrying a failed run up to task_max_attempts times
+        
+        Runs are checkpointed under the task ID, so a retry resumes after
+        the steps that already succeeded instead of starting over.
+        
+        Args:
+            task: Task object
+            agent: BrowsingAgent instance
+            prompt: Task prompt
+            plan: Optional explicit actions; skips LLM planning
+        
+        Returns:
+            Task result of the last attempt
+        """
+        attempts = max(1, settings.task_max_attempts)
+        
+        for attempt in range(1, attempts + 1):
+            # Execute with agent, streaming node updates if anyone listens
+            if self._has_listeners(task):
+                result = await self._stream_task(task, agent, prompt, plan)
+            else:
+                result = await agent.execute_task(
+                    task=prompt,
+                    metadata=task.request.get("metadata"),
+                    deadline=task.deadline,
+                    plan=plan,
+                    checkpoint_key=task.task_id
+                )
+            
+            out_of_time = task.deadline and time.time() >= task.deadline
+            if not result.get("error") or attempt == attempts or out_of_time:
+                return result
+            
+            self._relay(task, {"type": "retry", "data": {"attempt": attempt + 1, "error": result["error"]}})
+    
+    async def _stream_task(
+        self,
+        task: Task,
+        agent,
+        prompt: str,
+        plan: Optional[List[Dict[str, Any]]] = None
+    ) -> Dict[str, Any]:
+        """
+        Execute a task through the agent graph stream, publishing each node update
+        
+        Args:
+            task: Task object
+            agent: BrowsingAgent instance
+            prompt: Task prompt
+            plan: Optional explicit actions; skips LLM planning
+        
+        Returns:
+            Task result
+        """
+        final_state = None
+        
+        if plan is not None:
+            self._relay(task, {"type": "plan", "data": plan})
+        
+        async for update in agent.stream_task(
+            task=prompt,
+            metadata=task.request.get("metadata"),
+            deadline=task.deadline,
+            plan=plan,
+            on_event=lambda event: self._relay(task, event),
+            checkpoint_key=task.task_id
+        ):
+            for node, state in update.items():
+                final_state = state
+                
+                # Action events are emitted by the execute node as steps finish
+                if node == "planner":
+                    self._relay(task, {"type": "plan", "data": state.get("plan")})
+        
+        return agent.format_result(final_state)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics
+        
+        Returns:
+            Queue depth, service rate, estimated wait, per-lane wait percentiles,
+            running tasks and coalescing/rejection counters
+        """
+        # Tasks wait in the shared broker instead of the local queue
+        lanes = self.broker or self.queue
+        
+        return {
+            "queued": self.queue_depth(),
+            "queued_by_lane": lanes.lane_sizes(),
+            "service_rate": self.service_rate(),
+            "estimated_wait": self.estimated_wait(),
+            "queue_wait": lanes.wait_percentiles(),
+            "running": len(self.running_tasks),
+            "max_concurrent": self.max_concurrent,
+            **self.stats
+        }
 
 
 # Global task queue instance
-task_queue = TaskQueue()
+task_queue = TaskQueue(
+    max_concurrent=settings.max_concurrent_tasks,
+    coalesce=settings.coalesce_tasks,
+    coalesce_window=settings.coalesce_window,
+    default_priority=settings.default_priority,
+    tenant_priorities=settings.tenant_priorities,
+    tenant_weights=settings.tenant_weights,
+    max_queue_depth=settings.max_queue_depth,
+    max_estimated_wait=settings.max_estimated_wait,
+    broker=SQLiteTaskBroker(
+        settings.task_broker_path,
+        lease=settings.task_lease_seconds,
+        tenant_weights=settings.tenant_weights
+    ) if settings.task_broker_path else None,
+    store=create_task_store(
+        backend=settings.task_store_backend,
+        db_path=settings.task_store_path,
+        max_tasks=settings.task_store_max_tasks,
+        ttl=settings.task_store_ttl
+    )
+)
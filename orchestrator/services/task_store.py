@@ -0,0 +1,289 @@
+"""
+Task Store Service
+Pluggable storage for task state and results
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from api.models import TaskStatus
+
+
+TERMINAL_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED)
+
+
+class Task:
+    """Task object"""
+    
+    def __init__(self, task_id: str, request: Dict[str, Any]):
+        self.task_id = task_id
+        self.request = request
+        self.status = TaskStatus.PENDING
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.created_at = datetime.now()
+        self.started_at: Optional[datetime] = None
+        self.completed_at: Optional[datetime] = None
+        self.deadline: Optional[float] = None  # epoch seconds
+        self.done_event = asyncio.Event()
+        self.listeners: List[asyncio.Queue] = []
+        
+        # Request coalescing: a follower shares the result of its leader
+        self.coalesce_key: Optional[str] = None
+        self.leader_id: Optional[str] = None
+        self.followers: List["Task"] = []
+    
+    def is_done(self) -> bool:
+        """Check if the task reached a terminal status"""
+        return self.status in TERMINAL_STATUSES
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "task_id": self.task_id,
+            "request": self.request,
+            "status": self.status.value,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "completed_at": self.completed_at.isoformat() if self.completed_at else None,
+            "deadline": self.deadline
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Task":
+        task = cls(data["task_id"], data["request"])
+        task.status = TaskStatus(data["status"])
+        task.result = data.get("result")
+        task.error = data.get("error")
+        task.deadline = data.get("deadline")
+        
+        for field in ("created_at", "started_at", "completed_at"):
+            value = data.get(field)
+            setattr(task, field, datetime.fromisoformat(value) if value else None)
+        
+        if task.is_done():
+            task.done_event.set()
+        
+        return task
+
+
+class TaskStore(ABC):
+    """Base task store interface"""
+    
+    @abstractmethod
+    def add(self, task: Task):
+        """Add a new task"""
+    
+    @abstractmethod
+    def get(self, task_id: str) -> Optional[Task]:
+        """Get task by ID"""
+    
+    @abstractmethod
+    def save(self, task: Task):
+        """Persist task changes"""
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored tasks"""
+
+
+class InMemoryTaskStore(TaskStore):
+    """
+    In-memory task store with LRU and TTL eviction
+    
+    Only finished tasks are evicted; pending and running tasks always stay.
+    """
+    
+    def __init__(self, max_tasks: int = 1000, ttl: Optional[int] = 3600):
+        """
+        Initialize in-memory store
+        
+        Args:
+            max_tasks: Maximum number of finished tasks to keep
+            ttl: Seconds to keep finished tasks (None to keep until evicted by size)
+        """
+        self.max_tasks = max_tasks
+        self.ttl = timedelta(seconds=ttl) if ttl else None
+        self.active: Dict[str, Task] = {}
+        self.finished: "OrderedDict[str, Task]" = OrderedDict()
+    
+    def add(self, task: Task):
+        self.active[task.task_id] = task
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        task = self.active.get(task_id)
+        if task:
+            return task
+        
+        task = self.finished.get(task_id)
+        if not task:
+            return None
+        
+        if self._is_expired(task):
+            del self.finished[task_id]
+            return None
+        
+        self.finished.move_to_end(task_id)
+        return task
+    
+    def save(self, task: Task):
+        if not task.is_done():
+            return
+        
+        self.active.pop(task.task_id, None)
+        self.finished[task.task_id] = task
+        self.finished.move_to_end(task.task_id)
+        self._evict()
+    
+    def _is_expired(self, task: Task) -> bool:
+        if not self.ttl or not task.completed_at:
+            return False
+        return datetime.now() - task.completed_at > self.ttl
+    
+    def _evict(self):
+        """Drop expired tasks, then least recently used ones over the size limit"""
+        if self.ttl:
+            expired = [
+                task_id for task_id, task in self.finished.items()
+                if self._is_expired(task)
+            ]
+            for task_id in expired:
+                del self.finished[task_id]
+        
+        while len(self.finished) > self.max_tasks:
+            self.finished.popitem(last=False)
+    
+    def __len__(self) -> int:
+        return len(self.active) + len(self.finished)
+
+
+class SQLiteTaskStore(TaskStore):
+    """
+    SQLite-backed task store
+    
+    Pending and running tasks are kept in memory; finished tasks are written
+    to disk and loaded lazily on lookup, so results survive restarts without
+    staying resident.
+    """
+    
+    def __init__(self, db_path: str = "./data/tasks.db", ttl: Optional[int] = 86400):
+        """
+        Initialize SQLite store
+        
+        Args:
+            db_path: Path to the SQLite database file
+            ttl: Seconds to keep finished tasks on disk (None to keep forever)
+        """
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.active: Dict[str, Task] = {}
+        self.lock = threading.Lock()
+        self.save_count = 0
+        
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                task_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                completed_at REAL,
+                data TEXT NOT NULL
+            )
+        """)
+        self.conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_tasks_completed_at ON tasks (completed_at)"
+        )
+        self.conn.commit()
+        self.purge_expired()
+    
+    def add(self, task: Task):
+        self.active[task.task_id] = task
+    
+    def get(self, task_id: str) -> Optional[Task]:
+        task = self.active.get(task_id)
+        if task:
+            return task
+        
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT data FROM tasks WHERE task_id = ?", (task_id,)
+            ).fetchone()
+        
+        if not row:
+            return None
+        
+        return Task.from_dict(json.loads(row[0]))
+    
+    def save(self, task: Task):
+        if not task.is_done():
+            return
+        
+        data = json.dumps(task.to_dict(), default=str)
+        completed_at = task.completed_at.timestamp() if task.completed_at else None
+        
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, status, completed_at, data) VALUES (?, ?, ?, ?)",
+                (task.task_id, task.status.value, completed_at, data)
+            )
+            self.conn.commit()
+        
+        self.active.pop(task.task_id, None)
+        
+        # Purge expired rows every so often instead of on every write
+        self.save_count += 1
+        if self.save_count % 100 == 0:
+            self.purge_expired()
+    
+    def purge_expired(self):
+        """Delete finished tasks older than the TTL"""
+        if not self.ttl:
+            return
+        
+        cutoff = datetime.now().timestamp() - self.ttl
+        with self.lock:
+            self.conn.execute("DELETE FROM tasks WHERE completed_at < ?", (cutoff,))
+            self.conn.commit()
+    
+    def close(self):
+        """Close the database connection"""
+        self.conn.close()
+    
+    def __len__(self) -> int:
+        with self.lock:
+            count = self.conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0]
+        return len(self.active) + count
+
+
+def create_task_store(
+    backend: str = "memory",
+    db_path: str = "./data/tasks.db",
+    max_tasks: int = 1000,
+    ttl: Optional[int] = 3600
+) -> TaskStore:
+    """
+    Create a task store for the given backend
+    
+    Args:
+        backend: "memory" or "sqlite"
+        db_path: Database path (sqlite only)
+        max_tasks: Maximum finished tasks kept in memory (memory only)
+        ttl: Seconds to keep finished tasks
+    
+    Returns:
+        Task store instance
+    """
+    if backend == "memory":
+        return InMemoryTaskStore(max_tasks=max_tasks, ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteTaskStore(db_path=db_path, ttl=ttl)
+    raise ValueError(f"Unknown task store backend: {backend}")
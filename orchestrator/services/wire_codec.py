@@ -0,0 +1,160 @@
+"""
+Wire Codec
+Encodes extension bridge messages as JSON text or compact binary frames
+"""
+
+import json
+from typing import Any, Dict, List, Optional, Union
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# First byte of a binary frame
+FLAG_COMPRESSED = 0x01
+
+
+def supported_encodings() -> List[str]:
+    """Encodings this process can speak, preferred first"""
+    return (["msgpack"] if msgpack else []) + ["json"]
+
+
+def supported_compression() -> List[str]:
+    """Compression schemes this process can speak"""
+    return ["zstd"] if zstandard else []
+
+
+class WireCodec:
+    """
+    Encoder/decoder for one extension connection
+    
+    Every connection starts with JSON text frames. An extension that
+    sends a hello listing the encodings it supports is switched to
+    MessagePack binary frames: one flag byte, then the MessagePack
+    payload, zstd-compressed when it is at least compression_threshold
+    bytes. Text frames are always accepted as JSON, so extensions that
+    never say hello keep working unchanged.
+    """
+    
+    def __init__(
+        self,
+        encoding: str = "json",
+        compression: Optional[str] = None,
+        compression_threshold: int = 16384
+    ):
+        """
+        Initialize codec
+        
+        Args:
+            encoding: "json" or "msgpack"
+            compression: None or "zstd" (binary frames only)
+            compression_threshold: Payloads of at least this many bytes are
+                compressed
+        """
+        self.encoding = encoding
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.compressor = zstandard.ZstdCompressor(level=3) if compression == "zstd" else None
+        self.decompressor = zstandard.ZstdDecompressor() if zstandard else None
+        self.stats = {"frames_out": 0, "bytes_out": 0, "frames_in": 0, "bytes_in": 0}
+    
+    @classmethod
+    def negotiate(
+        cls,
+        hello: Dict[str, Any],
+        binary_frames: bool = True,
+        compression_threshold: int = 16384
+    ) -> "WireCodec":
+        """
+        Pick the best encoding both sides support
+        
+        Args:
+            hello: Hello message from the extension, e.g.
+                {"type": "hello", "encodings": ["msgpack", "json"],
+                "compression": ["zstd"]}
+            binary_frames: Whether binary framing is enabled on this side
+            compression_threshold: Compression threshold in bytes
+        
+        Returns:
+            Codec for the connection
+        """
+        offered = hello.get("encodings") or ["json"]
+        encoding = "json"
+        compression = None
+        
+        if binary_frames and "msgpack" in offered and msgpack:
+            encoding = "msgpack"
+            if "zstd" in (hello.get("compression") or []) and zstandard:
+                compression = "zstd"
+        
+        return cls(encoding, compression, compression_threshold)
+    
+    def describe(self) -> Dict[str, Any]:
+        """Negotiated settings, as sent back to the extension"""
+        return {
+            "encoding": self.encoding,
+            "compression": self.compression,
+            "compression_threshold": self.compression_threshold if self.compression else None
+        }
+    
+    def encode(self, message: Dict[str, Any]) -> Union[str, bytes]:
+        """
+        Encode a message for sending
+        
+        Args:
+            message: Message dictionary
+        
+        Returns:
+            JSON text, or a binary frame
+        """
+        if self.encoding != "msgpack":
+            frame = json.dumps(message, default=str)
+        else:
+            payload = msgpack.packb(message, use_bin_type=True, default=str)
+            if self.compressor and len(payload) >= self.compression_threshold:
+                frame = bytes([FLAG_COMPRESSED]) + self.compressor.compress(payload)
+            else:
+                frame = b"\x00" + payload
+        
+        self.stats["frames_out"] += 1
+        self.stats["bytes_out"] += len(frame)
+        return frame
+    
+    def decode(self, frame: Union[str, bytes]) -> Dict[str, Any]:
+        """
+        Decode a received frame
+        
+        Args:
+            frame: Text (JSON) or binary frame
+        
+        Returns:
+            Message dictionary
+        
+        Raises:
+            ValueError: If the frame cannot be decoded
+        """
+        self.stats["frames_in"] += 1
+        self.stats["bytes_in"] += len(frame)
+        
+        if isinstance(frame, str):
+            return json.loads(frame)
+        
+        if not frame:
+            raise ValueError("Empty binary frame")
+        if not msgpack:
+            raise ValueError("Binary frame received but msgpack is not installed")
+        
+        payload = frame[1:]
+        if frame[0] & FLAG_COMPRESSED:
+            if not self.decompressor:
+                raise ValueError("Compressed frame received but zstandard is not installed")
+            payload = self.decompressor.decompress(payload)
+        
+        return msgpack.unpackb(payload, raw=False, strict_map_key=False)
@@ -0,0 +1,21 @@
+"""
+Shared test setup
+
+Run from the orchestrator directory:
+
+    pytest tests/
+"""
+
+import os
+import sys
+import tempfile
+
+# Modules import each other as top-level packages (config, services, agent)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings are read at import time; keep state files out of the working tree
+_data_dir = tempfile.mkdtemp(prefix="orchestrator-tests-")
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_data_dir, "blobs"))
+os.environ.setdefault("CHECKPOINT_PATH", os.path.join(_data_dir, "checkpoints.db"))
+os.environ.setdefault("TASK_STORE_PATH", os.path.join(_data_dir, "tasks.db"))
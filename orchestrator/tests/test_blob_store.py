@@ -0,0 +1,87 @@
+"""
+Tests for spilling large results to the blob store
+"""
+
+import os
+import time
+
+from services.blob_store import BLOB_KEY, BlobStore
+
+
+def blob_files(store):
+    return list(store.root.glob("*/*"))
+
+
+def test_spill_and_materialize_round_trip(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000)
+    result = {"success": True, "html": "<p>page</p>" * 200, "links": ["a", "b"], "count": 2}
+    
+    spilled = store.spill(result)
+    
+    assert spilled["html"][BLOB_KEY]
+    assert spilled["html"]["size"] == len(result["html"])
+    assert spilled["links"] == ["a", "b"]
+    assert store.materialize(spilled) == result
+
+
+def test_large_values_are_spilled_whole(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000)
+    result = {"rows": [{"name": f"row {index}"} for index in range(100)]}
+    
+    spilled = store.spill(result)
+    
+    assert spilled["type"] == "json"
+    assert store.materialize(spilled) == result
+
+
+def test_identical_content_is_stored_once(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000)
+    html = "<p>same</p>" * 200
+    
+    first = store.spill({"html": html})
+    second = store.spill({"html": html, "url": "https://example.com/other"})
+    
+    assert first["html"] == second["html"]
+    assert len(blob_files(store)) == 1
+    assert store.stats["spilled"] == 2
+
+
+def test_small_values_are_left_alone(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000)
+    assert store.spill({"text": "short"}) == {"text": "short"}
+    assert blob_files(store) == []
+
+
+def test_missing_blob_leaves_the_reference(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000)
+    spilled = store.spill({"html": "x" * 2000})
+    for path in blob_files(store):
+        path.unlink()
+    
+    assert store.materialize(spilled) == spilled
+
+
+def test_expired_blobs_are_purged(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000, ttl=60)
+    spilled = store.spill({"html": "x" * 2000})
+    old = time.time() - 120
+    for path in blob_files(store):
+        os.utime(path, (old, old))
+    
+    store.purge_expired()
+    
+    assert blob_files(store) == []
+    assert store.materialize(spilled) == spilled
+
+
+def test_writing_again_refreshes_the_expiry(tmp_path):
+    store = BlobStore(str(tmp_path), threshold=1000, ttl=60)
+    store.spill({"html": "x" * 2000})
+    old = time.time() - 120
+    for path in blob_files(store):
+        os.utime(path, (old, old))
+    
+    store.spill({"html": "x" * 2000})
+    store.purge_expired()
+    
+    assert len(blob_files(store)) == 1
@@ -0,0 +1,122 @@
+"""
+Tests for resuming interrupted runs from checkpoints and per-action retries
+"""
+
+import asyncio
+import time
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from agent import graph as graph_module
+from agent.graph import BrowsingAgent
+from config import settings
+from services.checkpoint_store import CheckpointStore
+
+
+class FakeTools:
+    """ExtensionTools stand-in; URLs listed in block never answer"""
+    
+    def __init__(self, block=(), failures=0):
+        self.block = block
+        self.failures = failures
+        self.calls = []
+    
+    async def load_page(self, url, timeout=None, **options):
+        self.calls.append(url)
+        if url in self.block:
+            await asyncio.Event().wait()
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("Extension unavailable")
+        return {"success": True, "url": url}
+    
+    async def wait(self, duration):
+        self.calls.append("wait")
+        raise RuntimeError("Wait failed")
+
+
+PLAN = [
+    {"action": "LOAD_PAGE", "url": "https://a.example"},
+    {"action": "LOAD_PAGE", "url": "https://b.example"},
+    {"action": "LOAD_PAGE", "url": "https://c.example"}
+]
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = CheckpointStore(str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(graph_module, "checkpoint_store", store)
+    monkeypatch.setattr(settings, "max_parallel_actions", 1)
+    return store
+
+
+def make_agent(tools):
+    agent = BrowsingAgent(extension_bridge=None)
+    agent.llm = agent.nodes.llm = FakeListChatModel(responses=["Summary."])
+    agent.nodes.tools = tools
+    return agent
+
+
+def test_killed_run_resumes_after_its_finished_steps(store):
+    async def scenario():
+        # First run: the third page hangs until the run is killed
+        first = FakeTools(block=("https://c.example",))
+        run = asyncio.create_task(
+            make_agent(first).execute_task("Load pages", plan=PLAN, checkpoint_key="task-1")
+        )
+        while len((store.load("task-1") or {}).get("context", {}).get("completed", {})) < 2:
+            await asyncio.sleep(0.01)
+        run.cancel()
+        await asyncio.gather(run, return_exceptions=True)
+        
+        second = FakeTools()
+        result = await make_agent(second).execute_task("Load pages", plan=PLAN, checkpoint_key="task-1")
+        return first, second, result
+    
+    first, second, result = asyncio.run(scenario())
+    
+    assert first.calls == ["https://a.example", "https://b.example", "https://c.example"]
+    assert second.calls == ["https://c.example"]
+    assert result["metadata"]["resumed"] is True
+    assert result["metadata"]["resumed_steps"] == 2
+    # A finished run drops its checkpoint
+    assert store.load("task-1") is None
+
+
+def test_checkpoint_of_another_task_is_not_resumed(store):
+    store.save("task-1", {"task": "Something else", "plan": PLAN, "context": {"completed": {"0": {}}}})
+    agent = make_agent(FakeTools())
+    
+    assert agent._resume_state("task-1", "Load pages", plan=PLAN) is None
+    assert agent._resume_state("task-1", "Something else", plan=PLAN[:1]) is None
+    assert agent._resume_state(None, "Something else") is None
+    assert agent._resume_state("task-1", "Something else")["metadata"]["resumed_steps"] == 1
+
+
+def test_actions_are_retried_per_policy(monkeypatch):
+    monkeypatch.setattr(settings, "action_retry_policies", {
+        "default": {"retries": 2, "backoff": 0.01},
+        "WAIT": {"retries": 0}
+    })
+    tools = FakeTools(failures=2)
+    agent = make_agent(tools)
+    state = {"deadline": None, "metadata": {}}
+    
+    result = asyncio.run(agent.nodes._run_action(PLAN[0], state))
+    assert result["success"] is True
+    assert len(tools.calls) == 3
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(agent.nodes._run_action({"action": "WAIT"}, state))
+    assert tools.calls[3:] == ["wait"]
+
+
+def test_retries_stop_at_the_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "action_retry_policies", {"default": {"retries": 5, "backoff": 1.0}})
+    tools = FakeTools(failures=5)
+    state = {"deadline": time.time() + 0.5, "metadata": {}}
+    
+    with pytest.raises(RuntimeError):
+        asyncio.run(make_agent(tools).nodes._run_action(PLAN[0], state))
+    assert len(tools.calls) == 1
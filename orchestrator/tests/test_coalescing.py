@@ -0,0 +1,102 @@
+"""
+Tests for request coalescing in the task queue
+"""
+
+import asyncio
+
+from api.models import TaskStatus
+from services.task_queue import TaskQueue
+
+
+def request(url, **extra):
+    return {"prompt": "Get the page", "url": url, **extra}
+
+
+def test_identical_requests_share_one_execution():
+    queue = TaskQueue()
+    leader = queue.create_task(request("https://example.com/page"))
+    follower = queue.create_task(request("HTTPS://Example.com/page/"))
+    
+    assert queue.get_task(follower).leader_id == leader
+    assert queue.stats["coalesced_inflight"] == 1
+    
+    queue.set_task_result(leader, {"answer": 1})
+    assert queue.get_task(follower).result == {"answer": 1}
+
+
+def test_tracking_params_fragments_and_default_ports_are_ignored():
+    queue = TaskQueue()
+    leader = queue.create_task(request("https://example.com/page?b=2&a=1"))
+    follower = queue.create_task(request("https://example.com:443/page?a=1&utm_source=mail&b=2#reviews"))
+    
+    assert queue.get_task(follower).leader_id == leader
+
+
+def test_url_paths_keep_their_case():
+    queue = TaskQueue()
+    queue.create_task(request("https://example.com/Profile/ABC"))
+    other = queue.create_task(request("https://example.com/profile/abc"))
+    
+    assert queue.get_task(other).leader_id is None
+
+
+def test_follower_deadline_does_not_stop_the_leader():
+    async def scenario():
+        queue = TaskQueue()
+        leader = queue.create_task(request("https://example.com"))
+        follower = queue.create_task(request("https://example.com", deadline=0.05))
+        await asyncio.sleep(0.1)
+        return queue.get_task(leader), queue.get_task(follower)
+    
+    leader, follower = asyncio.run(scenario())
+    
+    assert follower.status == TaskStatus.FAILED
+    assert follower.error == "Deadline exceeded"
+    assert leader.status == TaskStatus.PENDING
+    assert leader.followers == []
+
+
+def test_follower_deadline_while_the_leader_runs():
+    class SlowAgent:
+        async def execute_task(self, task, **kwargs):
+            await asyncio.sleep(0.2)
+            return {"result": task}
+    
+    async def scenario():
+        queue = TaskQueue()
+        runner = asyncio.create_task(queue.process_queue(SlowAgent()))
+        leader = queue.create_task(request("https://example.com"))
+        await queue.enqueue_task(leader)
+        await asyncio.sleep(0.02)
+        
+        follower = queue.create_task(request("https://example.com", deadline=0.05))
+        expired = await queue.wait_for_task(follower, timeout=1)
+        running = queue.get_task(leader).status
+        finished = await queue.wait_for_task(leader, timeout=1)
+        
+        await queue.shutdown()
+        await runner
+        return expired, running, finished
+    
+    follower, running, leader = asyncio.run(scenario())
+    
+    assert follower.status == TaskStatus.FAILED
+    assert follower.error == "Deadline exceeded"
+    assert running == TaskStatus.RUNNING
+    assert leader.status == TaskStatus.COMPLETED
+    assert leader.result == {"result": "Get the page"}
+
+
+def test_results_are_not_shared_across_tenants_or_lanes():
+    queue = TaskQueue()
+    first = queue.create_task(request("https://example.com"), tenant="alice")
+    other_tenant = queue.create_task(request("https://example.com"), tenant="bob")
+    other_lane = queue.create_task(
+        request("https://example.com", metadata={"priority": "interactive"}),
+        tenant="alice"
+    )
+    same = queue.create_task(request("https://example.com"), tenant="alice")
+    
+    assert queue.get_task(other_tenant).leader_id is None
+    assert queue.get_task(other_lane).leader_id is None
+    assert queue.get_task(same).leader_id == first
@@ -0,0 +1,119 @@
+"""
+Tests for result compaction before synthesis
+"""
+
+import json
+
+from agent.compaction import (
+    CHARS_PER_TOKEN,
+    compact_results,
+    estimate_tokens,
+    extract_page,
+    fit_budget
+)
+
+
+def page(body, title="Example"):
+    return f"""
+    <html>
+      <head>
+        <title>{title}</title>
+        <meta name="description" content="A page about {title}">
+        <meta property="og:site_name" content="Example Site">
+        <script type="application/ld+json">{{"@type": "Organization", "name": "{title}"}}</script>
+        <script>var tracking = "{'x' * 500}";</script>
+        <style>body {{ color: red; }}</style>
+      </head>
+      <body>
+        <nav>Home | Products | About</nav>
+        <main>
+          <h1>{title}</h1>
+          {body}
+        </main>
+        <p>Accept cookies to continue</p>
+        <footer>Copyright Example Site</footer>
+      </body>
+    </html>
+    """
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("x" * 400) == 400 // CHARS_PER_TOKEN + 1
+    assert estimate_tokens({"a": 1}) == len(json.dumps({"a": 1})) // CHARS_PER_TOKEN + 1
+
+
+def test_extract_page_keeps_content_and_structured_fields():
+    extracted = extract_page(page("<p>Opening hours 9 to 5</p>", title="Bakery"))
+    
+    assert extracted["title"] == "Bakery"
+    assert extracted["description"] == "A page about Bakery"
+    assert extracted["site_name"] == "Example Site"
+    assert extracted["structured_data"] == [{"@type": "Organization", "name": "Bakery"}]
+    assert extracted["headings"] == ["Bakery"]
+    assert "Opening hours 9 to 5" in extracted["text"]
+
+
+def test_extract_page_drops_boilerplate():
+    extracted = extract_page(page("<p>Opening hours</p>"))
+    
+    assert "tracking" not in extracted["text"]
+    assert "color: red" not in extracted["text"]
+    assert "Home | Products" not in extracted["text"]
+    assert "Copyright" not in extracted["text"]
+
+
+def test_compact_results_replaces_html_and_keeps_other_fields():
+    results = [{"url": "https://example.com", "html": page("<p>Menu of the day</p>"), "status": 200}]
+    
+    [compacted] = compact_results(results)
+    
+    assert compacted["url"] == "https://example.com"
+    assert compacted["status"] == 200
+    assert "Menu of the day" in compacted["html"]["text"]
+    assert estimate_tokens(compacted) < estimate_tokens(results[0])
+
+
+def test_lines_repeated_across_pages_are_kept_once():
+    banner = "<p>Free shipping on all orders over fifty dollars</p>"
+    results = [
+        page(banner + "<p>First page content</p>", title="One"),
+        page(banner + "<p>Second page content</p>", title="Two")
+    ]
+    
+    first, second = compact_results(results)
+    
+    assert "Free shipping" in first["text"]
+    assert "Free shipping" not in second["text"]
+    assert "Second page content" in second["text"]
+
+
+def test_short_strings_are_not_parsed_as_html():
+    assert compact_results(["<p>short</p>", 42, None]) == ["<p>short</p>", 42, None]
+
+
+def test_fit_budget_truncates_each_result():
+    results = ["x" * 10000, {"items": list(range(2000))}]
+    
+    fitted = fit_budget(results, result_tokens=200)
+    
+    for result in fitted:
+        assert estimate_tokens(result) <= 200 + 1
+    assert fitted[0].endswith("[truncated]")
+    assert fitted[1]["items"][-1].endswith("more items truncated]")
+
+
+def test_fit_budget_gives_unused_share_to_large_results():
+    small = "a" * 100
+    large = "b" * 20000
+    
+    fitted = fit_budget([small, large], result_tokens=5000, total_tokens=2000)
+    
+    # The small result is untouched and the large one gets the rest
+    assert fitted[0] == small
+    assert estimate_tokens(fitted[1]) > 1000
+    assert sum(estimate_tokens(result) for result in fitted) <= 2000 + 2
+
+
+def test_results_within_budget_are_unchanged():
+    results = [{"a": "b"}, "text", [1, 2, 3]]
+    assert fit_budget(results, result_tokens=100, total_tokens=1000) == results
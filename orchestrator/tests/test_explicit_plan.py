@@ -0,0 +1,79 @@
+"""
+Tests for running caller-given actions without LLM planning
+"""
+
+import asyncio
+import types
+
+from agent.graph import BrowsingAgent, explicit_plan
+from api.models import TaskRequest
+
+
+class FakeTools:
+    """ExtensionTools stand-in that answers every page load"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def load_page(self, url, timeout=None, **options):
+        self.calls.append(url)
+        return {"success": True, "url": url}
+
+
+class FakeGateway:
+    """LLM gateway stand-in that records the inputs of every call"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def ainvoke(self, runnable, inputs, metadata=None):
+        self.calls.append(inputs)
+        return types.SimpleNamespace(content="Summary.")
+    
+    async def astream(self, runnable, inputs, metadata=None):
+        self.calls.append(inputs)
+        yield types.SimpleNamespace(content="Summary.")
+
+
+def test_actions_become_the_plan():
+    request = TaskRequest(
+        prompt="Compare two pages",
+        actions=[
+            {"action": "LOAD_PAGE", "url": "https://a.example"},
+            {"action": "WAIT", "duration": 500}
+        ]
+    ).dict()
+    
+    assert explicit_plan(request) == [
+        {"action": "LOAD_PAGE", "url": "https://a.example"},
+        {"action": "WAIT", "duration": 500}
+    ]
+
+
+def test_single_action_and_planning_requests():
+    assert explicit_plan({"action": "FETCH", "url": "https://a.example"}) == [
+        {"action": "FETCH", "url": "https://a.example"}
+    ]
+    assert explicit_plan({"prompt": "Find a bakery"}) is None
+    assert explicit_plan({"prompt": "x", "action": "FETCH", "needsPlanning": True}) is None
+
+
+def test_explicit_plan_skips_the_planner_call():
+    plan = [
+        {"action": "LOAD_PAGE", "url": "https://a.example"},
+        {"action": "LOAD_PAGE", "url": "https://b.example"}
+    ]
+    agent = BrowsingAgent(extension_bridge=None)
+    agent.nodes.tools = tools = FakeTools()
+    agent.nodes.gateway = gateway = FakeGateway()
+    
+    result = asyncio.run(agent.execute_task("Compare two pages", plan=plan))
+    
+    assert result["error"] is None
+    assert result["metadata"]["plan_explicit"] is True
+    assert "plan_created" not in result["metadata"]
+    assert sorted(tools.calls) == ["https://a.example", "https://b.example"]
+    # The only LLM call is the synthesis, never the planner
+    assert len(gateway.calls) == 1
+    assert "tools" not in gateway.calls[0]
+    assert result["result"]["summary"] == "Summary."
@@ -0,0 +1,328 @@
+"""
+Tests for the v2 extension bridge
+"""
+
+import asyncio
+import json
+import time
+
+from services.extension_bridge_v2 import ExtensionBridge, assemble_chunks, is_idempotent, websocket_endpoint
+
+
+class FakeSocket:
+    """WebSocket stand-in: records sent frames, yields queued incoming frames"""
+    
+    def __init__(self, bridge=None, latency=None):
+        self.bridge = bridge
+        self.latency = latency
+        self.sent = []
+        self.inbox = asyncio.Queue()
+        self.outstanding = 0
+        self.peak = 0
+    
+    async def send_text(self, frame):
+        message = json.loads(frame)
+        self.sent.append(message)
+        
+        # Answer commands like an extension would
+        if self.latency is None or message.get("type") in ("abort", "hello_ack"):
+            return
+        commands = message["commands"] if message.get("type") == "batch" else [message]
+        for command in commands:
+            self.outstanding += 1
+            self.peak = max(self.peak, self.outstanding)
+            asyncio.create_task(self._reply(command["command_id"]))
+    
+    async def _reply(self, command_id):
+        await asyncio.sleep(self.latency)
+        self.outstanding -= 1
+        await self.bridge.handle_response({"type": "response", "command_id": command_id, "success": True})
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        frame = await self.inbox.get()
+        if frame is None:
+            raise StopAsyncIteration
+        return frame
+    
+    def receive(self, message):
+        self.inbox.put_nowait(json.dumps(message))
+
+
+def test_slow_event_handler_does_not_delay_responses():
+    async def scenario():
+        bridge = ExtensionBridge(event_concurrency=2)
+        
+        async def slow_handler(data):
+            await asyncio.sleep(1.0)
+        
+        bridge.on_event("session_captured", slow_handler)
+        
+        socket = FakeSocket()
+        endpoint = asyncio.create_task(websocket_endpoint(socket, bridge))
+        await asyncio.sleep(0.01)
+        
+        command = asyncio.create_task(bridge.send_command({"action": "INVISIBLE_BROWSE"}, timeout=5))
+        await asyncio.sleep(0.01)
+        command_id = socket.sent[-1]["command_id"]
+        
+        # Events queued ahead of the response on the same socket
+        started = time.perf_counter()
+        for _ in range(3):
+            socket.receive({"type": "event", "event": "session_captured", "data": {}})
+        socket.receive({"type": "response", "command_id": command_id, "success": True})
+        
+        response = await command
+        latency = time.perf_counter() - started
+        
+        socket.inbox.put_nowait(None)
+        await endpoint
+        return response, latency
+    
+    response, latency = asyncio.run(scenario())
+    
+    assert response["success"] is True
+    assert latency < 0.5
+
+
+def test_commands_prefer_least_loaded_connection():
+    async def scenario():
+        bridge = ExtensionBridge(max_inflight_per_connection=2)
+        slow = FakeSocket(bridge, latency=0.2)
+        fast = FakeSocket(bridge, latency=0.02)
+        await bridge.register_connection(slow, "slow")
+        await bridge.register_connection(fast, "fast")
+        
+        responses = await asyncio.gather(*[
+            bridge.send_command({"action": "LOAD_PAGE"}, timeout=5) for _ in range(20)
+        ])
+        return responses, slow, fast, bridge
+    
+    responses, slow, fast, bridge = asyncio.run(scenario())
+    
+    assert all(response["success"] for response in responses)
+    assert slow.peak <= 2 and fast.peak <= 2
+    assert len(fast.sent) > len(slow.sent)
+    assert all(load["inflight"] == 0 for load in bridge.get_connection_stats().values())
+
+
+def test_lost_idempotent_commands_are_redispatched():
+    async def scenario():
+        bridge = ExtensionBridge()
+        dying = FakeSocket(bridge)
+        healthy = FakeSocket(bridge, latency=0.02)
+        await bridge.register_connection(dying, "dying")
+        await bridge.register_connection(healthy, "healthy")
+        
+        commands = [
+            bridge.send_command({"action": "INVISIBLE_BROWSE"}, timeout=5) for _ in range(4)
+        ] + [bridge.send_command({"action": "REQUEST_LOGIN"}, connection_id="dying", timeout=5)]
+        
+        async def drop():
+            await asyncio.sleep(0.1)
+            await bridge.unregister_connection("dying")
+        
+        results = await asyncio.gather(*commands, drop())
+        return results[:-1], bridge
+    
+    responses, bridge = asyncio.run(scenario())
+    
+    assert all(response["success"] for response in responses[:4])
+    assert responses[4] == {"success": False, "error": "Extension disconnected"}
+    assert not bridge.pending_commands
+
+
+def test_batch_stays_within_inflight_cap():
+    async def scenario():
+        bridge = ExtensionBridge(max_inflight_per_connection=5, batch_size=50)
+        socket = FakeSocket(bridge, latency=0.01)
+        await bridge.register_connection(socket, "c")
+        await bridge.handle_hello("c", {"type": "hello", "features": ["batch"]})
+        
+        responses = await bridge.send_batch(
+            [{"action": "INVISIBLE_BROWSE", "url": str(index)} for index in range(60)],
+            timeout=5
+        )
+        return responses, socket, bridge
+    
+    responses, socket, bridge = asyncio.run(scenario())
+    
+    assert len(responses) == 60 and all(response["success"] for response in responses)
+    assert socket.peak <= 5
+    assert any(message.get("type") == "batch" for message in socket.sent)
+    assert bridge.get_connection_stats()["c"]["inflight"] == 0
+
+
+def test_batch_without_capable_connection_respects_call_limit():
+    async def scenario():
+        bridge = ExtensionBridge()
+        socket = FakeSocket(bridge, latency=0.01)
+        await bridge.register_connection(socket, "legacy")
+        
+        responses = await bridge.send_batch(
+            [{"action": "INVISIBLE_BROWSE", "url": str(index)} for index in range(20)],
+            timeout=5,
+            max_inflight=3
+        )
+        return responses, socket
+    
+    responses, socket = asyncio.run(scenario())
+    
+    assert all(response["success"] for response in responses)
+    assert socket.peak <= 3
+    assert not any(message.get("type") == "batch" for message in socket.sent)
+
+
+def test_batch_fails_when_the_extension_disconnects():
+    async def scenario():
+        bridge = ExtensionBridge(max_inflight_per_connection=2, batch_size=50)
+        socket = FakeSocket(bridge)
+        await bridge.register_connection(socket, "c")
+        await bridge.handle_hello("c", {"type": "hello", "features": ["batch"]})
+        
+        batch = asyncio.create_task(bridge.send_batch(
+            [{"action": "INVISIBLE_BROWSE", "url": str(index)} for index in range(6)],
+            timeout=5
+        ))
+        await asyncio.sleep(0.05)
+        await bridge.unregister_connection("c")
+        
+        try:
+            await batch
+        except Exception as e:
+            error = str(e)
+        else:
+            error = None
+        return error, socket, bridge
+    
+    error, socket, bridge = asyncio.run(scenario())
+    
+    # Not retried one by one as if the extension could not batch
+    assert error == "No extension connected"
+    assert [message.get("type") for message in socket.sent if "type" in message] == ["hello_ack", "batch"]
+    assert not bridge.pending_commands
+
+
+def test_out_of_order_and_repeated_chunks_are_assembled_once():
+    async def scenario():
+        bridge = ExtensionBridge()
+        socket = FakeSocket(bridge)
+        await bridge.register_connection(socket, "c")
+        
+        command = asyncio.create_task(bridge.send_command({"action": "EXTRACT_TEXT"}, timeout=5))
+        await asyncio.sleep(0.01)
+        command_id = socket.sent[-1]["command_id"]
+        
+        for seq, data, final in ((2, "c", True), (0, "a", False), (0, "a", False), (1, "b", False), (1, "b", False)):
+            await bridge.handle_chunk({"command_id": command_id, "seq": seq, "data": data, "final": final})
+        return await command
+    
+    response = asyncio.run(scenario())
+    
+    assert response["data"] == "abc"
+    assert response["chunks"] == 3
+    assert response["success"] is True
+
+
+def test_missing_final_chunk_times_out():
+    async def scenario():
+        bridge = ExtensionBridge()
+        socket = FakeSocket(bridge)
+        await bridge.register_connection(socket, "c")
+        
+        command = asyncio.create_task(bridge.send_command({"action": "EXTRACT_TEXT"}, timeout=0.2))
+        await asyncio.sleep(0.01)
+        command_id = socket.sent[-1]["command_id"]
+        await bridge.handle_chunk({"command_id": command_id, "seq": 0, "data": "a"})
+        return await command, bridge
+    
+    response, bridge = asyncio.run(scenario())
+    
+    assert response == {"success": False, "error": "Command timeout"}
+    assert not bridge.partial_responses
+
+
+def test_streamed_chunks_arrive_in_order():
+    async def scenario():
+        bridge = ExtensionBridge()
+        socket = FakeSocket(bridge)
+        await bridge.register_connection(socket, "c")
+        
+        async def reply():
+            await asyncio.sleep(0.01)
+            command_id = socket.sent[-1]["command_id"]
+            for seq, final in ((1, False), (0, False), (0, False), (2, True)):
+                await bridge.handle_chunk({"command_id": command_id, "seq": seq, "data": [seq], "final": final})
+        
+        replying = asyncio.create_task(reply())
+        chunks = [chunk async for chunk in bridge.stream_command({"action": "EXTRACT_LINKS"}, timeout=5)]
+        await replying
+        return chunks
+    
+    chunks = asyncio.run(scenario())
+    
+    assert [chunk["seq"] for chunk in chunks] == [0, 1, 2]
+    assert chunks[-1]["final"] is True
+
+
+def test_stream_without_connection_ends_with_an_error_chunk():
+    async def scenario():
+        bridge = ExtensionBridge()
+        return [chunk async for chunk in bridge.stream_command({"action": "EXTRACT_TEXT"})], bridge
+    
+    chunks, bridge = asyncio.run(scenario())
+    
+    assert len(chunks) == 1
+    assert chunks[0]["type"] == "error"
+    assert chunks[0]["error"] == "No extension connected"
+    assert chunks[0]["final"] is True
+    assert not bridge.chunk_queues
+
+
+def test_chunk_data_is_assembled_by_type():
+    assert assemble_chunks([[1], None, [2, 3]]) == [1, 2, 3]
+    assert assemble_chunks(["Hello", " world"]) == "Hello world"
+    assert assemble_chunks([{"text": "a", "links": ["x"]}, {"text": "b", "title": "T"}]) == {
+        "text": "ab", "links": ["x"], "title": "T"
+    }
+    assert assemble_chunks([1, 2]) == 2
+    assert assemble_chunks([None]) is None
+
+
+def test_read_only_actions_are_idempotent_unless_flagged():
+    for action in ("LOAD_PAGE", "FETCH", "EXTRACT_MAPS", "EXTRACT_COMPANY_EMPLOYEES", "INVISIBLE_BROWSE"):
+        assert is_idempotent({"action": action})
+    assert not is_idempotent({"action": "REQUEST_LOGIN"})
+    assert not is_idempotent({})
+    assert not is_idempotent({"action": "LOAD_PAGE", "idempotent": False})
+    assert is_idempotent({"action": "REQUEST_LOGIN", "idempotent": True})
+
+
+def test_lost_page_loads_are_redispatched_unless_flagged():
+    async def scenario():
+        bridge = ExtensionBridge()
+        dying = FakeSocket(bridge)
+        healthy = FakeSocket(bridge, latency=0.02)
+        await bridge.register_connection(dying, "dying")
+        await bridge.register_connection(healthy, "healthy")
+        
+        commands = [
+            bridge.send_command({"action": "LOAD_PAGE"}, connection_id="dying", timeout=5),
+            bridge.send_command({"action": "EXTRACT_LINKEDIN"}, connection_id="dying", timeout=5),
+            bridge.send_command({"action": "LOAD_PAGE", "idempotent": False}, connection_id="dying", timeout=5)
+        ]
+        
+        async def drop():
+            await asyncio.sleep(0.05)
+            await bridge.unregister_connection("dying")
+        
+        results = await asyncio.gather(*commands, drop())
+        return results[:-1], bridge
+    
+    responses, bridge = asyncio.run(scenario())
+    
+    assert responses[0]["success"] and responses[1]["success"]
+    assert responses[2] == {"success": False, "error": "Extension disconnected"}
+    assert bridge.redispatched == 2
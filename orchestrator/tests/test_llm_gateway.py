@@ -0,0 +1,188 @@
+"""
+Tests for LLM rate limiting and retries
+"""
+
+import asyncio
+import types
+
+import httpx
+import openai
+import pytest
+
+from services import llm_gateway as gateway_module
+from services.llm_gateway import LLMGateway, _parse_duration, _retry_delay
+
+
+REQUEST = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+
+
+class FakeClock:
+    """Monotonic clock that only moves when the gateway sleeps"""
+    
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+    
+    def monotonic(self):
+        return self.now
+    
+    async def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 3))
+        self.now += seconds
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(gateway_module, "time", types.SimpleNamespace(monotonic=clock.monotonic))
+    monkeypatch.setattr(gateway_module, "asyncio", types.SimpleNamespace(Lock=asyncio.Lock, sleep=clock.sleep))
+    return clock
+
+
+class FakeRunnable:
+    """Chain stand-in that raises the queued errors before answering"""
+    
+    def __init__(self, *errors, mid_stream=False):
+        self.errors = list(errors)
+        self.mid_stream = mid_stream
+        self.calls = 0
+    
+    async def ainvoke(self, inputs):
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        return types.SimpleNamespace(content="Hello world")
+    
+    async def astream(self, inputs):
+        self.calls += 1
+        if self.errors and not self.mid_stream:
+            raise self.errors.pop(0)
+        for chunk in ("Hello", " world"):
+            yield types.SimpleNamespace(content=chunk)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def rate_limit_error(headers):
+    response = httpx.Response(429, headers=headers, request=REQUEST)
+    return openai.RateLimitError("Rate limit reached", response=response, body=None)
+
+
+def server_error():
+    response = httpx.Response(500, request=REQUEST)
+    return openai.InternalServerError("Server error", response=response, body=None)
+
+
+def test_durations_are_parsed():
+    assert _parse_duration("6m0s") == 360
+    assert _parse_duration("20ms") == pytest.approx(0.02)
+    assert _parse_duration("1h2m3.5s") == pytest.approx(3723.5)
+    assert _parse_duration("soon") is None
+
+
+def test_retry_after_ms_wins_over_retry_after():
+    assert _retry_delay({"retry-after-ms": "1500", "retry-after": "30"}) == 1.5
+    assert _retry_delay({"retry-after": "30"}) == 30
+
+
+def test_reset_headers_are_used_without_retry_after():
+    headers = {"x-ratelimit-reset-requests": "20ms", "x-ratelimit-reset-tokens": "6m0s"}
+    assert _retry_delay(headers) == 360
+    assert _retry_delay({"x-ratelimit-reset-requests": "20ms"}) == pytest.approx(0.02)
+    assert _retry_delay({}) is None
+
+
+def test_rate_limit_pauses_every_caller(clock):
+    gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0)
+    gateway._rate_limited(rate_limit_error({"retry-after": "7", "x-ratelimit-remaining-requests": "0"}), 0)
+    
+    assert gateway.blocked_until == clock.now + 7
+    assert gateway.get_stats()["blocked_for"] == 7
+    assert gateway.stats["retries"] == 1
+
+
+def test_empty_bucket_waits_for_refill(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=60, tokens_per_minute=0)
+        gateway.request_bucket = 0
+        timings = {}
+        await gateway._acquire(10, timings)
+        return gateway, timings
+    
+    gateway, timings = asyncio.run(scenario())
+    
+    # One request per second refills in one second
+    assert clock.sleeps == [1.0]
+    assert timings["llm_queue_seconds"] == 1.0
+    assert gateway.request_bucket == pytest.approx(0)
+
+
+def test_rate_limited_call_is_retried_after_the_reported_wait(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0)
+        runnable = FakeRunnable(rate_limit_error({"retry-after-ms": "2500"}))
+        response = await gateway.ainvoke(runnable, {"task": "x"})
+        return gateway, runnable, response
+    
+    gateway, runnable, response = asyncio.run(scenario())
+    
+    assert response.content == "Hello world"
+    assert runnable.calls == 2
+    assert clock.sleeps == [2.5]
+    assert gateway.stats["rate_limited"] == 1
+
+
+def test_connection_and_server_errors_are_retried(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0, max_retries=3)
+        runnable = FakeRunnable(openai.APIConnectionError(request=REQUEST), server_error())
+        response = await gateway.ainvoke(runnable, {"task": "x"})
+        return gateway, runnable, response
+    
+    gateway, runnable, response = asyncio.run(scenario())
+    
+    assert response.content == "Hello world"
+    assert runnable.calls == 3
+    assert clock.sleeps == [0.5, 1.0]
+    assert gateway.stats["transient_errors"] == 2
+
+
+def test_retries_give_up_after_max_retries(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0, max_retries=1)
+        runnable = FakeRunnable(server_error(), server_error())
+        await gateway.ainvoke(runnable, {"task": "x"})
+    
+    with pytest.raises(openai.InternalServerError):
+        asyncio.run(scenario())
+
+
+def test_stream_is_not_retried_after_a_chunk(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0)
+        runnable = FakeRunnable(openai.APIConnectionError(request=REQUEST), mid_stream=True)
+        received = []
+        with pytest.raises(openai.APIConnectionError):
+            async for chunk in gateway.astream(runnable, {"task": "x"}):
+                received.append(chunk.content)
+        return runnable, received
+    
+    runnable, received = asyncio.run(scenario())
+    
+    assert runnable.calls == 1
+    assert received == ["Hello", " world"]
+
+
+def test_stream_is_retried_before_the_first_chunk(clock):
+    async def scenario():
+        gateway = LLMGateway(requests_per_minute=0, tokens_per_minute=0)
+        runnable = FakeRunnable(server_error())
+        received = [chunk.content async for chunk in gateway.astream(runnable, {"task": "x"})]
+        return runnable, received
+    
+    runnable, received = asyncio.run(scenario())
+    
+    assert runnable.calls == 2
+    assert received == ["Hello", " world"]
+    assert clock.sleeps == [0.5]
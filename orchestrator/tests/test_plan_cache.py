@@ -0,0 +1,112 @@
+"""
+Tests for reusing plan templates
+"""
+
+import asyncio
+import json
+
+import pytest
+from langchain_community.chat_models.fake import FakeListChatModel
+
+from agent.graph import BrowsingAgent
+from agent.plan_cache import PlanCache, normalize_task
+from config import settings
+
+
+def profile_plan(url):
+    return [
+        {"action": "LOAD_PAGE", "url": url},
+        {"action": "EXTRACT_LINKEDIN", "url": url}
+    ]
+
+
+def test_tasks_differing_only_in_slots_share_a_template():
+    assert normalize_task("Extract profile https://a.example/in/x.")[0] == normalize_task(
+        "extract  PROFILE https://b.example/in/y."
+    )[0]
+    assert normalize_task('Search maps for "coffee shops"')[0] == normalize_task("Search maps for 'tea rooms'")[0]
+    assert normalize_task("Open @alice.dev on instagram") == ("open {slot0} on instagram", ["@alice.dev"])
+
+
+def test_plan_is_reused_with_new_slot_values():
+    cache = PlanCache()
+    cache.put("Extract profile https://a.example/in/x", profile_plan("https://a.example/in/x"))
+    
+    assert cache.get("Extract profile https://b.example/in/y") == profile_plan("https://b.example/in/y")
+    assert cache.stats["hits"] == 1
+
+
+def test_slots_are_filled_into_argument_values_only():
+    cache = PlanCache()
+    cache.put('Run "FETCH" on https://a.example/', [
+        {"action": "FETCH", "url": "https://a.example/", "params": {"mode": "FETCH", "tags": ["FETCH"]}}
+    ])
+    
+    assert cache.entries["run {slot1} on {slot0}"]["plan"][0]["action"] == "FETCH"
+    assert cache.get('Run "QUERY" on https://b.example/') == [
+        {"action": "FETCH", "url": "https://b.example/", "params": {"mode": "QUERY", "tags": ["QUERY"]}}
+    ]
+
+
+def test_plan_that_does_not_use_every_slot_is_not_stored():
+    cache = PlanCache()
+    cache.put("Compare https://a.example with https://b.example", profile_plan("https://a.example"))
+    
+    assert not cache.entries
+    assert cache.stats["rejected"] == 1
+
+
+def test_template_failing_revalidation_is_evicted(tmp_path):
+    # A template stored by an older version whose action no longer exists
+    path = tmp_path / "plans.json"
+    template, _ = normalize_task("Click https://a.example")
+    path.write_text(json.dumps({
+        template: {"plan": [{"action": "CLICK", "url": "{{slot0}}"}], "stored_at": 4102444800}
+    }))
+    cache = PlanCache(storage_path=str(path))
+    
+    assert template in cache.entries
+    assert cache.get("Click https://b.example") is None
+    assert template not in cache.entries
+    assert cache.stats["misses"] == 1
+
+
+def test_expired_template_is_a_miss():
+    cache = PlanCache(ttl=60)
+    cache.put("Extract profile https://a.example/in/x", profile_plan("https://a.example/in/x"))
+    for entry in cache.entries.values():
+        entry["stored_at"] -= 120
+    
+    assert cache.get("Extract profile https://b.example/in/y") is None
+    assert not cache.entries
+
+
+class FakeTools:
+    """ExtensionTools stand-in that fails every request when told to"""
+    
+    def __init__(self, fail=False):
+        self.fail = fail
+    
+    async def load_page(self, url, timeout=None, **options):
+        if self.fail:
+            raise RuntimeError("Extension unavailable")
+        return {"success": True, "url": url}
+    
+    get_tool_descriptions = staticmethod(lambda: [])
+
+
+@pytest.mark.parametrize("stream_planning", [True, False])
+@pytest.mark.parametrize("fail", [True, False])
+def test_plan_is_cached_only_after_its_steps_succeed(monkeypatch, stream_planning, fail):
+    monkeypatch.setattr(settings, "stream_planning", stream_planning)
+    plan = [{"action": "LOAD_PAGE", "url": "https://a.example"}, {"action": "LOAD_PAGE", "url": "https://b.example"}]
+    
+    agent = BrowsingAgent(extension_bridge=None)
+    agent.llm = agent.nodes.llm = FakeListChatModel(responses=[json.dumps(plan), "Summary."])
+    agent.nodes.tools = FakeTools(fail=fail)
+    agent.nodes.plan_cache = PlanCache()
+    
+    result = asyncio.run(agent.execute_task("Compare https://a.example and https://b.example"))
+    
+    assert (result["error"] is not None) is fail
+    assert bool(agent.nodes.plan_cache.entries) is not fail
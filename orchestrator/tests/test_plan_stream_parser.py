@@ -0,0 +1,73 @@
+"""
+Tests for the incremental plan parser
+"""
+
+import json
+
+from agent.plan_stream import PlanStreamParser
+
+
+def feed_in_chunks(text, size):
+    parser = PlanStreamParser()
+    actions = []
+    for start in range(0, len(text), size):
+        actions.extend(parser.feed(text[start:start + size]))
+    return actions
+
+
+PLAN = [
+    {"action": "LOAD_PAGE", "url": "https://example.com/a"},
+    {"action": "EXTRACT_MAPS", "url": "https://example.com/a", "depends_on": [0]},
+    {"action": "WAIT", "duration": 500}
+]
+
+
+def test_chunking_does_not_change_the_result():
+    text = json.dumps(PLAN, indent=2)
+    for size in (1, 3, 7, len(text)):
+        assert feed_in_chunks(text, size) == PLAN
+
+
+def test_actions_are_returned_as_soon_as_they_are_complete():
+    parser = PlanStreamParser()
+    text = json.dumps(PLAN)
+    first_end = text.index("}") + 1
+    
+    assert parser.feed(text[:first_end - 1]) == []
+    assert parser.feed(text[first_end - 1:first_end]) == [PLAN[0]]
+
+
+def test_text_before_the_array_is_skipped():
+    text = "Here is the plan:\n```json\n" + json.dumps(PLAN) + "\n```"
+    assert feed_in_chunks(text, 5) == PLAN
+
+
+def test_brackets_and_quotes_inside_strings():
+    plan = [
+        {"action": "FETCH", "url": "https://example.com/?q={a}[b]"},
+        {"action": "FETCH", "url": "https://example.com/\"quoted\"\\"}
+    ]
+    assert feed_in_chunks(json.dumps(plan), 1) == plan
+
+
+def test_nested_values_stay_inside_their_action():
+    plan = [{"action": "FETCH", "url": "https://example.com", "options": {"headers": {"a": [1, {"b": 2}]}}}]
+    assert feed_in_chunks(json.dumps(plan), 4) == plan
+
+
+def test_single_object_is_left_to_the_full_parse():
+    parser = PlanStreamParser()
+    assert parser.feed(json.dumps(PLAN[0])) == []
+    assert parser.closed
+
+
+def test_output_after_the_array_is_ignored():
+    parser = PlanStreamParser()
+    actions = parser.feed(json.dumps(PLAN[:1]) + ' and also [{"action": "WAIT"}]')
+    assert actions == PLAN[:1]
+    assert parser.feed('{"action": "WAIT"}') == []
+
+
+def test_malformed_action_is_skipped():
+    parser = PlanStreamParser()
+    assert parser.feed('[{"action": "FETCH", "url": oops}, {"action": "WAIT"}]') == [{"action": "WAIT"}]
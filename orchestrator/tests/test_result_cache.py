@@ -0,0 +1,156 @@
+"""
+Tests for the tool result cache
+"""
+
+import asyncio
+import sqlite3
+
+from agent.result_cache import ResultCache
+
+
+class CountingFetch:
+    """Extension request stand-in that counts calls"""
+    
+    def __init__(self, delay=0.0, fail=False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+    
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("Extension unavailable")
+        return {"success": True, "html": f"<p>version {self.calls}</p>"}
+
+
+def test_concurrent_identical_fetches_share_one_call():
+    async def scenario():
+        cache = ResultCache({"LOAD_PAGE": 60})
+        fetch = CountingFetch(delay=0.05)
+        results = await asyncio.gather(*[
+            cache.get_or_fetch("LOAD_PAGE", "https://example.com/#top", fetch)
+            for _ in range(5)
+        ])
+        return cache, fetch, results
+    
+    cache, fetch, results = asyncio.run(scenario())
+    
+    assert fetch.calls == 1
+    assert all(result == results[0] for result in results)
+    assert cache.stats["shared"] == 4
+
+
+def test_stale_entry_is_served_while_it_is_refreshed():
+    async def scenario():
+        cache = ResultCache({"LOAD_PAGE": 60}, stale_grace=600)
+        fetch = CountingFetch(delay=0.05)
+        first = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch)
+        
+        # Age the entry past its TTL but within the grace period
+        for entry in cache.entries.values():
+            entry["stored_at"] -= 120
+        
+        stale = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch)
+        refreshing = len(cache.refreshing)
+        await asyncio.gather(*cache.refreshing)
+        fresh = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch)
+        return first, stale, refreshing, fresh, fetch, cache
+    
+    first, stale, refreshing, fresh, fetch, cache = asyncio.run(scenario())
+    
+    assert stale == first
+    assert refreshing == 1
+    assert fresh["html"] == "<p>version 2</p>"
+    assert fetch.calls == 2
+    assert cache.stats["refreshes"] == 1
+
+
+def test_stale_entry_covers_for_a_failed_refresh():
+    async def scenario():
+        cache = ResultCache({"LOAD_PAGE": 60}, stale_grace=600)
+        first = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", CountingFetch())
+        for entry in cache.entries.values():
+            entry["stored_at"] -= 120
+        
+        failing = CountingFetch(fail=True)
+        stale = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", failing)
+        await asyncio.gather(*cache.refreshing)
+        return first, stale, failing
+    
+    first, stale, failing = asyncio.run(scenario())
+    
+    assert stale == first
+    assert failing.calls == 1
+
+
+def test_bypass_skips_memory_and_disk(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "results.db")
+        fetch = CountingFetch()
+        await ResultCache({"LOAD_PAGE": 60}, storage_path=path).get_or_fetch(
+            "LOAD_PAGE", "https://example.com", fetch
+        )
+        
+        cache = ResultCache({"LOAD_PAGE": 60}, storage_path=path)
+        await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch)
+        refreshed = await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch, bypass=True)
+        return cache, fetch, refreshed
+    
+    cache, fetch, refreshed = asyncio.run(scenario())
+    
+    assert fetch.calls == 2
+    assert refreshed["html"] == "<p>version 2</p>"
+    assert cache.stats["bypassed"] == 1
+    # The refreshed result replaces the cached one
+    assert cache.get_stats()["entries"] == 1
+
+
+def test_entries_survive_a_new_instance_through_the_disk_tier(tmp_path):
+    async def scenario():
+        path = str(tmp_path / "results.db")
+        fetch = CountingFetch()
+        stored = await ResultCache({"FETCH": 60}, storage_path=path).get_or_fetch(
+            "FETCH", "https://example.com/?utm_source=x", fetch
+        )
+        
+        cache = ResultCache({"FETCH": 60}, storage_path=path)
+        loaded = await cache.get_or_fetch("FETCH", "https://EXAMPLE.com:443/", fetch)
+        return stored, loaded, fetch, cache
+    
+    stored, loaded, fetch, cache = asyncio.run(scenario())
+    
+    assert loaded == stored
+    assert fetch.calls == 1
+    assert cache.stats["disk_hits"] == 1
+
+
+def test_results_are_not_shared_across_tenants_or_sessions():
+    async def scenario():
+        cache = ResultCache({"LOAD_PAGE": 60})
+        fetch = CountingFetch()
+        await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch, tenant="alice")
+        await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch, tenant="bob")
+        await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch, session="s2", tenant="alice")
+        await cache.get_or_fetch("LOAD_PAGE", "https://example.com", fetch, tenant="alice")
+        return fetch
+    
+    assert asyncio.run(scenario()).calls == 3
+
+
+def test_tables_without_a_tenant_column_are_replaced(tmp_path):
+    path = tmp_path / "results.db"
+    conn = sqlite3.connect(str(path))
+    conn.execute(
+        "CREATE TABLE results (action TEXT, url TEXT, session TEXT, stored_at REAL, data TEXT, "
+        "PRIMARY KEY (action, url, session))"
+    )
+    conn.execute("INSERT INTO results VALUES ('LOAD_PAGE', 'https://example.com/', 'default', 0, '{}')")
+    conn.commit()
+    conn.close()
+    
+    cache = ResultCache({"LOAD_PAGE": 60}, storage_path=str(path))
+    columns = {row[1] for row in cache.conn.execute("PRAGMA table_info(results)")}
+    
+    assert "tenant" in columns
+    assert cache.conn.execute("SELECT COUNT(*) FROM results").fetchone()[0] == 0
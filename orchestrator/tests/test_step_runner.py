@@ -0,0 +1,157 @@
+"""
+Tests for dependency-aware plan execution
+"""
+
+import asyncio
+
+from agent.nodes import StepRunner, infer_dependencies
+
+
+def make_state(plan=None, completed=None):
+    return {
+        "task": "test",
+        "task_type": None,
+        "plan": plan or [],
+        "current_step": 0,
+        "actions_executed": [],
+        "results": [],
+        "context": {"completed": completed} if completed else {},
+        "final_result": None,
+        "error": None,
+        "metadata": {},
+        "deadline": None
+    }
+
+
+class FakeNodes:
+    """AgentNodes stand-in that records when each action runs"""
+    
+    def __init__(self, delays=None, fail=()):
+        self.delays = delays or {}
+        self.fail = fail
+        self.log = []
+        self.running = 0
+        self.peak = 0
+    
+    async def _run_action(self, action, state):
+        name = action["name"]
+        self.log.append(("start", name))
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.delays.get(name, 0.02))
+            if name in self.fail:
+                raise RuntimeError(f"{name} failed")
+        finally:
+            self.running -= 1
+        self.log.append(("end", name))
+        return {"name": name}
+
+
+def run_plan(nodes, plan, state=None, completed=0):
+    async def scenario():
+        runner = StepRunner(nodes, state, completed=completed)
+        for action in plan:
+            runner.add(action)
+        await runner.finish()
+    
+    state = state or make_state(plan)
+    asyncio.run(scenario())
+    return state
+
+
+def step(name, url=None, action="LOAD_PAGE", **extra):
+    return {"action": action, "name": name, "url": url, **extra}
+
+
+def test_steps_on_the_same_url_are_chained():
+    plan = [
+        step("load-a", "https://a.example"),
+        step("load-b", "https://b.example"),
+        step("extract-a", "https://a.example", action="EXTRACT_MAPS")
+    ]
+    assert infer_dependencies(plan) == [set(), set(), {0}]
+
+
+def test_wait_is_a_barrier():
+    plan = [
+        step("load-a", "https://a.example"),
+        step("load-b", "https://b.example"),
+        {"action": "WAIT", "name": "wait", "duration": 10},
+        step("load-c", "https://c.example")
+    ]
+    assert infer_dependencies(plan) == [set(), set(), {0, 1}, {2}]
+
+
+def test_explicit_dependencies_ignore_invalid_indices():
+    plan = [
+        step("first", "https://a.example"),
+        step("second", "https://a.example", depends_on=[]),
+        step("third", "https://b.example", depends_on=[0, 2, 5, -1, "1"])
+    ]
+    assert infer_dependencies(plan) == [set(), set(), {0}]
+
+
+def test_independent_steps_run_concurrently():
+    plan = [step(f"load-{index}", f"https://{index}.example") for index in range(4)]
+    nodes = FakeNodes()
+    
+    state = run_plan(nodes, plan)
+    
+    assert nodes.peak > 1
+    assert state["error"] is None
+    assert state["current_step"] == 4
+
+
+def test_dependent_step_starts_after_its_dependency():
+    plan = [
+        step("load", "https://a.example"),
+        step("other", "https://b.example"),
+        step("extract", "https://a.example", action="EXTRACT_MAPS")
+    ]
+    nodes = FakeNodes(delays={"load": 0.05, "other": 0.01})
+    
+    run_plan(nodes, plan)
+    
+    assert nodes.log.index(("end", "load")) < nodes.log.index(("start", "extract"))
+
+
+def test_results_are_stored_in_plan_order():
+    plan = [step(f"load-{index}", f"https://{index}.example") for index in range(3)]
+    # Later steps finish first
+    nodes = FakeNodes(delays={"load-0": 0.06, "load-1": 0.03, "load-2": 0.0})
+    
+    state = run_plan(nodes, plan)
+    
+    assert [result["name"] for result in state["results"]] == ["load-0", "load-1", "load-2"]
+    assert state["actions_executed"] == plan
+
+
+def test_failed_step_cancels_its_dependents():
+    plan = [
+        step("load", "https://a.example"),
+        step("extract", "https://a.example", action="EXTRACT_MAPS"),
+        step("other", "https://b.example")
+    ]
+    nodes = FakeNodes(fail=("load",))
+    
+    state = run_plan(nodes, plan)
+    
+    assert state["error"] == "Action execution failed: load failed"
+    assert ("start", "extract") not in nodes.log
+    assert state["current_step"] == 0
+
+
+def test_checkpointed_steps_are_not_run_again():
+    plan = [
+        step("load-a", "https://a.example"),
+        step("load-b", "https://b.example")
+    ]
+    state = make_state(plan, completed={"0": {"name": "load-a", "resumed": True}})
+    nodes = FakeNodes()
+    
+    run_plan(nodes, plan, state=state)
+    
+    assert ("start", "load-a") not in nodes.log
+    assert state["results"][0] == {"name": "load-a", "resumed": True}
+    assert state["results"][1] == {"name": "load-b"}
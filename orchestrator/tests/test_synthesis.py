@@ -0,0 +1,84 @@
+"""
+Tests for splitting oversized results across chunk summaries
+"""
+
+import asyncio
+import json
+import types
+
+from agent.compaction import estimate_tokens
+from agent.graph import BrowsingAgent
+from agent.nodes import chunk_results
+from config import settings
+
+
+class FakeGateway:
+    """LLM gateway stand-in that records the inputs of every call"""
+    
+    def __init__(self):
+        self.calls = []
+    
+    async def ainvoke(self, runnable, inputs, metadata=None):
+        self.calls.append(inputs)
+        content = "Combined." if "summaries" in inputs else f"Part {len(self.calls)}."
+        return types.SimpleNamespace(content=content)
+
+
+def row(index, size=400):
+    return {"index": index, "text": "x" * size}
+
+
+def test_chunks_stay_within_budget_and_order():
+    results = [row(index) for index in range(10)]
+    budget = estimate_tokens(row(0)) * 3
+    
+    chunks = chunk_results(results, budget)
+    
+    assert [len(chunk) for chunk in chunks] == [3, 3, 3, 1]
+    assert [item for chunk in chunks for item in chunk] == results
+    assert all(sum(estimate_tokens(item) for item in chunk) <= budget for chunk in chunks)
+
+
+def test_oversized_result_gets_a_chunk_of_its_own():
+    results = [row(0), row(1, size=5000), row(2)]
+    
+    chunks = chunk_results(results, estimate_tokens(row(0)) * 2)
+    
+    assert chunks == [[row(0)], [row(1, size=5000)], [row(2)]]
+
+
+def test_large_results_are_summarized_in_chunks_then_combined(monkeypatch):
+    monkeypatch.setattr(settings, "compact_results", False)
+    monkeypatch.setattr(settings, "synthesis_map_reduce", True)
+    monkeypatch.setattr(settings, "synthesis_total_tokens", 500)
+    monkeypatch.setattr(settings, "synthesis_chunk_tokens", 300)
+    
+    agent = BrowsingAgent(extension_bridge=None)
+    agent.nodes.gateway = gateway = FakeGateway()
+    results = [row(index) for index in range(8)]
+    state = {"task": "Summarize", "results": results, "metadata": {}}
+    
+    state = asyncio.run(agent.nodes.synthesize(state))
+    
+    maps = [call for call in gateway.calls if "results" in call]
+    reduces = [call for call in gateway.calls if "summaries" in call]
+    assert len(maps) == state["metadata"]["synthesis_chunks"] > 1
+    assert all(estimate_tokens(json.loads(call["results"])) <= 300 for call in maps)
+    assert sorted(item["index"] for call in maps for item in json.loads(call["results"])) == list(range(8))
+    # One reduce call over every chunk summary
+    assert len(reduces) == 1
+    assert all(f"Part {index + 1}:" in reduces[0]["summaries"] for index in range(len(maps)))
+    assert state["final_result"] == {"summary": "Combined.", "raw_results": results}
+
+
+def test_results_within_budget_use_a_single_prompt(monkeypatch):
+    monkeypatch.setattr(settings, "compact_results", False)
+    
+    agent = BrowsingAgent(extension_bridge=None)
+    agent.nodes.gateway = gateway = FakeGateway()
+    state = {"task": "Summarize", "results": [row(0), row(1)], "metadata": {}}
+    
+    asyncio.run(agent.nodes.synthesize(state))
+    
+    assert len(gateway.calls) == 1
+    assert "synthesis_chunks" not in state["metadata"]
@@ -0,0 +1,106 @@
+"""
+Tests for the task endpoints: batches, NDJSON result streaming and cancellation
+"""
+
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from api import routes
+from services.task_queue import TaskQueue
+
+
+class FakeAgent:
+    """BrowsingAgent stand-in; a prompt like "wait 0.2" takes that long"""
+    
+    async def execute_task(self, task, metadata=None, deadline=None, plan=None, checkpoint_key=None):
+        await asyncio.sleep(float(task.split()[1]))
+        return {"result": task, "plan": None, "error": None}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    queue = TaskQueue(max_concurrent=5, coalesce=False, max_queue_depth=3)
+    monkeypatch.setattr(routes, "task_queue", queue)
+    
+    app = FastAPI()
+    app.include_router(routes.router)
+    
+    @app.on_event("startup")
+    async def start_queue():
+        asyncio.create_task(queue.process_queue(FakeAgent()))
+    
+    @app.on_event("shutdown")
+    async def stop_queue():
+        await queue.shutdown()
+    
+    with TestClient(app) as client:
+        yield client
+
+
+def stream(client, batch_id, **params):
+    response = client.get(f"/api/tasks/batch/{batch_id}/results", params=params)
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in response.text.splitlines()]
+
+
+def test_results_stream_in_completion_order(client):
+    prompts = ["wait 0.3", "wait 0.1", "wait 0.2"]
+    response = client.post("/api/tasks/batch", json=[{"prompt": prompt} for prompt in prompts])
+    assert response.status_code == 200
+    batch = response.json()
+    
+    lines = stream(client, batch["batch_id"])
+    
+    assert [line["result"]["result"] for line in lines] == ["wait 0.1", "wait 0.2", "wait 0.3"]
+    assert {line["task_id"] for line in lines} == set(batch["task_ids"])
+    assert all(line["status"] == "completed" for line in lines)
+
+
+def test_unfinished_tasks_are_reported_at_the_timeout(client):
+    response = client.post("/api/tasks/batch", json=[{"prompt": "wait 0.05"}, {"prompt": "wait 5"}])
+    batch = response.json()
+    
+    lines = stream(client, batch["batch_id"], timeout=0.5)
+    
+    assert [line["status"] for line in lines] == ["completed", "running"]
+    assert lines[1]["task_id"] == batch["task_ids"][1]
+
+
+def test_batch_larger_than_the_queue_is_rejected(client):
+    response = client.post("/api/tasks/batch", json=[{"prompt": "wait 0"}] * 4)
+    
+    assert response.status_code == 413
+    assert "split" in response.json()["detail"]
+
+
+def test_empty_batch_and_unknown_batch(client):
+    assert client.post("/api/tasks/batch", json=[]).status_code == 400
+    assert client.get("/api/tasks/batch/missing/results").status_code == 404
+
+
+def test_cancel_running_task_then_conflict(client):
+    task_id = client.post("/api/tasks/batch", json=[{"prompt": "wait 5"}]).json()["task_ids"][0]
+    
+    response = client.delete(f"/api/tasks/{task_id}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+    
+    # Finished tasks cannot be cancelled again
+    response = client.delete(f"/api/tasks/{task_id}")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Task already cancelled"
+    
+    assert client.delete("/api/tasks/missing").status_code == 404
+
+
+def test_cancel_completed_task_conflicts(client):
+    batch = client.post("/api/tasks/batch", json=[{"prompt": "wait 0"}]).json()
+    stream(client, batch["batch_id"])
+    
+    response = client.delete(f"/api/tasks/{batch['task_ids'][0]}")
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Task already completed"
@@ -0,0 +1,286 @@
+"""
+Tests for the shared SQLite task broker and the worker action relay
+"""
+
+import asyncio
+import time
+
+from api.models import TaskPriority, TaskStatus
+from services.broker_bridge import BrokerExtensionBridge
+from services.task_broker import SQLiteTaskBroker
+from services.task_queue import TaskQueue
+from services.task_store import Task
+
+
+def make_broker(tmp_path, **kwargs):
+    return SQLiteTaskBroker(str(tmp_path / "broker.db"), **kwargs)
+
+
+def submit(broker, task_id, priority=TaskPriority.NORMAL, tenant="default"):
+    task = Task(task_id, {"prompt": task_id})
+    broker.submit(task, priority=priority, tenant=tenant)
+    return task
+
+
+def test_claim_takes_higher_lanes_first_then_oldest(tmp_path):
+    broker = make_broker(tmp_path)
+    submit(broker, "normal-1")
+    submit(broker, "bulk", TaskPriority.BULK)
+    submit(broker, "normal-2")
+    submit(broker, "interactive", TaskPriority.INTERACTIVE)
+    
+    claimed = [broker.claim("w1").task_id for _ in range(4)]
+    
+    assert claimed == ["interactive", "normal-1", "normal-2", "bulk"]
+    assert broker.claim("w1") is None
+    assert broker.qsize() == 0
+    broker.close()
+
+
+def test_tenants_share_a_lane_fairly(tmp_path):
+    broker = make_broker(tmp_path)
+    for index in range(4):
+        submit(broker, f"noisy-{index}", tenant="noisy")
+    submit(broker, "quiet-0", tenant="quiet")
+    submit(broker, "quiet-1", tenant="quiet")
+    
+    claimed = [broker.claim("w1").task_id for _ in range(6)]
+    
+    # The tenant that queued first does not hold the lane until it is drained
+    assert claimed == ["noisy-0", "quiet-0", "noisy-1", "quiet-1", "noisy-2", "noisy-3"]
+    broker.close()
+
+
+def test_tenant_weights_scale_the_share(tmp_path):
+    broker = make_broker(tmp_path, tenant_weights={"gold": 2.0})
+    for index in range(4):
+        submit(broker, f"basic-{index}", tenant="basic")
+        submit(broker, f"gold-{index}", tenant="gold")
+    
+    claimed = [broker.claim("w1").task_id for _ in range(6)]
+    
+    assert sum(task_id.startswith("gold") for task_id in claimed) == 4
+    broker.close()
+
+
+def test_late_tenant_is_not_starved_by_a_backlog(tmp_path):
+    first = make_broker(tmp_path)
+    second = make_broker(tmp_path)
+    for index in range(10):
+        submit(first, f"backlog-{index}", tenant="noisy")
+    first.claim("w1")
+    first.claim("w1")
+    
+    # Submitted through another API process; the lane clock is shared
+    submit(second, "late", tenant="quiet")
+    
+    claimed = [second.claim("w2").task_id for _ in range(2)]
+    assert claimed == ["backlog-2", "late"]
+    first.close()
+    second.close()
+
+
+def test_broker_reports_lane_sizes_and_waits(tmp_path):
+    broker = make_broker(tmp_path)
+    submit(broker, "interactive", TaskPriority.INTERACTIVE)
+    submit(broker, "normal-1")
+    submit(broker, "normal-2")
+    broker.claim("w1")
+    
+    queue = TaskQueue(broker=broker)
+    stats = queue.get_stats()
+    
+    assert stats["queued"] == 2
+    assert stats["queued_by_lane"] == {"interactive": 0, "normal": 2, "bulk": 0}
+    assert stats["queue_wait"]["interactive"]["samples"] == 1
+    assert stats["queue_wait"]["normal"]["samples"] == 0
+    broker.close()
+
+
+def test_each_task_is_claimed_once_across_connections(tmp_path):
+    first = make_broker(tmp_path)
+    second = make_broker(tmp_path)
+    for index in range(20):
+        submit(first, f"task-{index}")
+    
+    claimed = []
+    while True:
+        task = first.claim("w1") or second.claim("w2")
+        if not task:
+            break
+        claimed.append(task.task_id)
+    
+    assert sorted(claimed) == sorted(f"task-{index}" for index in range(20))
+    first.close()
+    second.close()
+
+
+def test_cancel_drops_pending_and_flags_running(tmp_path):
+    broker = make_broker(tmp_path)
+    submit(broker, "running")
+    submit(broker, "pending")
+    broker.claim("w1")
+    
+    assert broker.cancel("pending") is True
+    assert broker.get("pending").status == TaskStatus.CANCELLED
+    
+    assert broker.cancel("running") is True
+    assert broker.get("running").status == TaskStatus.RUNNING
+    assert broker.cancel_requested("w1") == ["running"]
+    assert broker.cancel_requested("w2") == []
+    
+    assert broker.cancel("missing") is False
+    broker.close()
+
+
+def test_finish_writes_the_outcome_back(tmp_path):
+    broker = make_broker(tmp_path)
+    submit(broker, "a")
+    task = broker.claim("w1")
+    task.status = TaskStatus.COMPLETED
+    task.result = {"answer": 42}
+    broker.finish(task)
+    
+    stored = broker.get("a")
+    assert stored.status == TaskStatus.COMPLETED
+    assert stored.result == {"answer": 42}
+    broker.close()
+
+
+def test_requeue_worker_releases_its_running_tasks(tmp_path):
+    broker = make_broker(tmp_path)
+    submit(broker, "a")
+    submit(broker, "b")
+    broker.claim("w1")
+    broker.claim("w2")
+    
+    assert broker.requeue_worker("w1") == 1
+    assert broker.claim("w3").task_id == "a"
+    broker.close()
+
+
+def test_expired_leases_are_requeued(tmp_path):
+    broker = make_broker(tmp_path, lease=0.2)
+    submit(broker, "alive")
+    submit(broker, "dead")
+    submit(broker, "cancelled")
+    broker.claim("alive-worker")
+    broker.claim("dead-worker")
+    broker.claim("dead-worker")
+    broker.cancel("cancelled")
+    
+    time.sleep(0.3)
+    assert broker.heartbeat("alive-worker") == 1
+    assert broker.requeue_expired() == 1
+    
+    assert broker.get("alive").status == TaskStatus.RUNNING
+    assert broker.get("dead").status == TaskStatus.PENDING
+    # Tasks asked to cancel are not run again
+    assert broker.get("cancelled").status == TaskStatus.CANCELLED
+    broker.close()
+
+
+def test_action_round_trip(tmp_path):
+    broker = make_broker(tmp_path)
+    broker.submit_action("action-1", "w1", {"action": "NAVIGATE"}, timeout=5)
+    
+    [(action_id, action, timeout)] = broker.claim_actions()
+    assert (action_id, action, timeout) == ("action-1", {"action": "NAVIGATE"}, 5)
+    assert broker.claim_actions() == []
+    assert broker.take_action_result("action-1") is None
+    
+    broker.finish_action("action-1", result={"success": True})
+    assert broker.take_action_result("action-1") == ({"success": True}, None)
+    # The answer is consumed
+    assert broker.take_action_result("action-1") is None
+    broker.close()
+
+
+def test_aborted_actions_are_reported_and_dropped(tmp_path):
+    broker = make_broker(tmp_path)
+    broker.submit_action("relayed", "w1", {"action": "NAVIGATE"}, timeout=5)
+    broker.submit_action("queued", "w1", {"action": "NAVIGATE"}, timeout=5)
+    broker.claim_actions(limit=1)
+    
+    broker.abort_action("relayed")
+    broker.abort_action("queued")
+    
+    # Queued actions are dropped; relayed ones are flagged for the API process
+    assert broker.aborted_actions(["relayed", "queued"]) == ["relayed"]
+    assert broker.claim_actions() == []
+    
+    # The late answer is discarded along with the action
+    broker.finish_action("relayed", result={"success": True})
+    assert broker.aborted_actions(["relayed"]) == []
+    assert broker.take_action_result("relayed") is None
+    broker.close()
+
+
+class FakeExtensionBridge:
+    """Extension bridge of the API process"""
+    
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.actions = []
+        self.cancelled = 0
+    
+    async def send_action(self, action, timeout=30):
+        self.actions.append(action)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return {"success": True, "echo": action["action"]}
+
+
+def test_worker_actions_are_relayed_through_the_api_process(tmp_path):
+    async def scenario():
+        api_broker = make_broker(tmp_path)
+        worker_broker = make_broker(tmp_path)
+        extension = FakeExtensionBridge()
+        
+        api_queue = TaskQueue(broker=api_broker, poll_interval=0.01)
+        api_loop = asyncio.create_task(api_queue.process_queue(agent=None, extension_bridge=extension))
+        
+        bridge = BrokerExtensionBridge(worker_broker, "w1", poll_interval=0.01)
+        result = await bridge.send_action({"action": "NAVIGATE"}, timeout=2)
+        
+        await api_queue.shutdown()
+        await api_loop
+        api_broker.close()
+        worker_broker.close()
+        return result, extension
+    
+    result, extension = asyncio.run(scenario())
+    
+    assert result == {"success": True, "echo": "NAVIGATE"}
+    assert extension.actions == [{"action": "NAVIGATE"}]
+
+
+def test_abandoned_worker_action_is_cancelled_in_the_api_process(tmp_path):
+    async def scenario():
+        api_broker = make_broker(tmp_path)
+        worker_broker = make_broker(tmp_path)
+        extension = FakeExtensionBridge(delay=5)
+        
+        api_queue = TaskQueue(broker=api_broker, poll_interval=0.01)
+        api_loop = asyncio.create_task(api_queue.process_queue(agent=None, extension_bridge=extension))
+        
+        bridge = BrokerExtensionBridge(worker_broker, "w1", poll_interval=0.01)
+        action = asyncio.create_task(bridge.send_action({"action": "NAVIGATE"}, timeout=10))
+        await asyncio.sleep(0.1)
+        action.cancel()
+        await asyncio.sleep(0.1)
+        
+        relayed = len(api_queue.relayed)
+        await api_queue.shutdown()
+        await api_loop
+        api_broker.close()
+        worker_broker.close()
+        return extension, relayed
+    
+    extension, relayed = asyncio.run(scenario())
+    
+    assert extension.cancelled == 1
+    assert relayed == 0
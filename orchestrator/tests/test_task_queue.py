@@ -0,0 +1,286 @@
+"""
+Tests for the in-process task queue worker pool
+"""
+
+import asyncio
+import time
+
+import pytest
+
+from api.models import TaskStatus
+from services.task_queue import QueueFullError, TaskQueue
+
+
+class FakeAgent:
+    """Agent stand-in that sleeps instead of planning and browsing"""
+    
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.running = 0
+        self.peak = 0
+    
+    async def execute_task(self, task, **kwargs):
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.duration)
+        finally:
+            self.running -= 1
+        return {"success": True, "result": task}
+
+
+class StreamingAgent:
+    """Agent stand-in that streams a planner and an execute update"""
+    
+    async def stream_task(self, task, on_event=None, **kwargs):
+        yield {"planner": {"plan": [{"action": "WAIT"}]}}
+        on_event({"type": "action", "data": {"step": 0}})
+        await asyncio.sleep(0.01)
+        yield {"execute": {"final_result": task}}
+    
+    def format_result(self, final_state):
+        return {"result": final_state["final_result"], "error": None}
+
+
+async def run_tasks(queue, agent, count):
+    runner = asyncio.create_task(queue.process_queue(agent))
+    task_ids = [queue.create_task({"prompt": f"task {index}"}) for index in range(count)]
+    for task_id in task_ids:
+        await queue.enqueue_task(task_id)
+    await queue.queue.join()
+    await queue.shutdown()
+    await runner
+    return task_ids
+
+
+def test_pool_runs_every_task_within_concurrency_limit():
+    queue = TaskQueue(max_concurrent=3, coalesce=False)
+    agent = FakeAgent(duration=0.01)
+    
+    task_ids = asyncio.run(run_tasks(queue, agent, 30))
+    
+    assert agent.peak == 3
+    assert all(queue.get_task(task_id).status == TaskStatus.COMPLETED for task_id in task_ids)
+    assert queue.get_task(task_ids[-1]).result["result"] == "task 29"
+
+
+def test_freed_slot_is_taken_without_polling_delay():
+    queue = TaskQueue(max_concurrent=2, coalesce=False)
+    agent = FakeAgent(duration=0.05)
+    
+    started = time.perf_counter()
+    asyncio.run(run_tasks(queue, agent, 8))
+    elapsed = time.perf_counter() - started
+    
+    # Four back-to-back rounds of 50 ms on two workers
+    assert elapsed < 0.35
+
+
+def test_shutdown_cancels_running_tasks():
+    async def scenario():
+        queue = TaskQueue(max_concurrent=2, coalesce=False)
+        runner = asyncio.create_task(queue.process_queue(FakeAgent(duration=10)))
+        task_id = queue.create_task({"prompt": "long"})
+        await queue.enqueue_task(task_id)
+        await asyncio.sleep(0.05)
+        
+        await queue.shutdown()
+        await runner
+        return queue.get_task(task_id), queue
+    
+    task, queue = asyncio.run(scenario())
+    
+    assert task.status == TaskStatus.CANCELLED
+    assert not queue.running_tasks
+    assert not queue.workers
+
+
+def test_idle_time_does_not_lower_the_service_rate():
+    queue = TaskQueue()
+    for _ in range(2):
+        queue._track_start()
+        time.sleep(0.05)
+        queue._track_finish()
+        # Idle between bursts
+        time.sleep(0.2)
+    
+    # Two completions 0.05s apart on the busy clock
+    assert 10 < queue.service_rate() < 30
+
+
+def test_admission_always_allows_a_full_round_of_work():
+    queue = TaskQueue(max_concurrent=5, max_estimated_wait=1)
+    queue.completion_times.extend([0.0, 10.0])  # 0.1 tasks per second
+    
+    for index in range(5):
+        queue.check_admission()
+        queue.queue.put_nowait(f"task-{index}")
+    
+    with pytest.raises(QueueFullError) as error:
+        queue.check_admission()
+    assert error.value.retry_after == 10
+
+
+def test_cancelled_pending_tasks_leave_the_queue():
+    async def scenario():
+        queue = TaskQueue(max_concurrent=1, coalesce=False, max_queue_depth=2)
+        task_ids = [queue.create_task({"prompt": f"task {index}"}) for index in range(2)]
+        for task_id in task_ids:
+            await queue.enqueue_task(task_id)
+        
+        with pytest.raises(QueueFullError):
+            queue.check_admission()
+        
+        queue.cancel_task(task_ids[0])
+        depth = queue.queue_depth()
+        queue.check_admission()
+        
+        # The worker skips the removed entry and runs the remaining task
+        agent = FakeAgent(duration=0.01)
+        runner = asyncio.create_task(queue.process_queue(agent))
+        await queue.queue.join()
+        await queue.shutdown()
+        await runner
+        return queue, task_ids, depth
+    
+    queue, task_ids, depth = asyncio.run(scenario())
+    
+    assert depth == 1
+    assert queue.get_task(task_ids[0]).status == TaskStatus.CANCELLED
+    assert queue.get_task(task_ids[1]).status == TaskStatus.COMPLETED
+    assert queue.queue_depth() == 0
+
+
+def test_cancelling_a_running_task_stops_the_agent():
+    async def scenario():
+        queue = TaskQueue(max_concurrent=1, coalesce=False)
+        agent = FakeAgent(duration=10)
+        runner = asyncio.create_task(queue.process_queue(agent))
+        task_id = queue.create_task({"prompt": "long"})
+        await queue.enqueue_task(task_id)
+        await asyncio.sleep(0.05)
+        
+        cancelled = queue.cancel_task(task_id)
+        await asyncio.sleep(0.01)
+        running = agent.running
+        again = queue.cancel_task(task_id)
+        
+        await queue.shutdown()
+        await runner
+        return queue.get_task(task_id), cancelled, again, running
+    
+    task, cancelled, again, running = asyncio.run(scenario())
+    
+    assert cancelled is True
+    assert again is False
+    assert running == 0
+    assert task.status == TaskStatus.CANCELLED
+    assert task.error == "Task cancelled"
+
+
+def test_running_task_fails_at_its_deadline():
+    async def scenario():
+        queue = TaskQueue(max_concurrent=1, coalesce=False)
+        agent = FakeAgent(duration=10)
+        runner = asyncio.create_task(queue.process_queue(agent))
+        task_id = queue.create_task({"prompt": "long", "deadline": 0.1})
+        await queue.enqueue_task(task_id)
+        task = await queue.wait_for_task(task_id, timeout=2)
+        
+        await queue.shutdown()
+        await runner
+        return task, agent
+    
+    task, agent = asyncio.run(scenario())
+    
+    assert task.status == TaskStatus.FAILED
+    assert task.error == "Deadline exceeded"
+    assert agent.running == 0
+
+
+def test_waiters_wake_as_soon_as_the_task_completes():
+    async def scenario():
+        queue = TaskQueue(coalesce=False)
+        task_id = queue.create_task({"prompt": "task"})
+        waiters = [asyncio.create_task(queue.wait_for_task(task_id, timeout=5)) for _ in range(3)]
+        await asyncio.sleep(0)
+        pending = not any(waiter.done() for waiter in waiters)
+        
+        queue.set_task_result(task_id, {"success": True})
+        # No timer involved: a few turns of the event loop are enough
+        for _ in range(3):
+            await asyncio.sleep(0)
+        return pending, waiters
+    
+    pending, waiters = asyncio.run(scenario())
+    
+    assert pending
+    assert all(waiter.done() for waiter in waiters)
+    assert all(waiter.result().status == TaskStatus.COMPLETED for waiter in waiters)
+
+
+def test_wait_returns_the_unfinished_task_at_the_timeout():
+    async def scenario():
+        queue = TaskQueue(coalesce=False)
+        task_id = queue.create_task({"prompt": "task"})
+        return await queue.wait_for_task(task_id, timeout=0.01), await queue.wait_for_task("missing")
+    
+    task, missing = asyncio.run(scenario())
+    
+    assert task.status == TaskStatus.PENDING
+    assert missing is None
+
+
+async def drain(updates):
+    """Collect events until the terminal one, then anything arriving after it"""
+    events = []
+    while not events or events[-1]["type"] not in ("result", "error", "cancelled"):
+        events.append(await asyncio.wait_for(updates.get(), timeout=5))
+    await asyncio.sleep(0.05)
+    while not updates.empty():
+        events.append(updates.get_nowait())
+    return events
+
+
+def test_subscriber_gets_node_events_then_one_terminal_event():
+    async def scenario():
+        queue = TaskQueue(coalesce=False)
+        task_id = queue.create_task({"prompt": "task"})
+        updates = queue.subscribe(task_id)
+        dropped = queue.subscribe(task_id)
+        queue.unsubscribe(task_id, dropped)
+        
+        runner = asyncio.create_task(queue.process_queue(StreamingAgent()))
+        await queue.enqueue_task(task_id)
+        events = await drain(updates)
+        
+        # Subscribing after the end still yields the terminal event, once
+        late = await drain(queue.subscribe(task_id))
+        
+        await queue.shutdown()
+        await runner
+        return events, late, dropped
+    
+    events, late, dropped = asyncio.run(scenario())
+    
+    assert [event["type"] for event in events] == ["status", "plan", "action", "result"]
+    assert events[-1]["data"]["result"] == "task"
+    assert [event["type"] for event in late] == ["result"]
+    assert dropped.empty()
+
+
+def test_failed_task_ends_its_stream_with_one_error_event():
+    async def scenario():
+        queue = TaskQueue(coalesce=False)
+        task_id = queue.create_task({"prompt": "task"})
+        updates = queue.subscribe(task_id)
+        queue.update_task_status(task_id, TaskStatus.RUNNING)
+        queue.set_task_error(task_id, "Extension unavailable")
+        return await drain(updates)
+    
+    events = asyncio.run(scenario())
+    
+    assert events == [
+        {"type": "status", "data": TaskStatus.RUNNING},
+        {"type": "error", "data": "Extension unavailable"}
+    ]
@@ -0,0 +1,115 @@
+"""
+Tests for the task stores
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from api.models import TaskStatus
+from services.task_store import (
+    InMemoryTaskStore,
+    SQLiteTaskStore,
+    Task,
+    TaskStore,
+    create_task_store
+)
+
+
+def finished_task(task_id, completed_at=None):
+    task = Task(task_id, {"prompt": task_id})
+    task.status = TaskStatus.COMPLETED
+    task.result = {"answer": task_id}
+    task.completed_at = completed_at or datetime.now()
+    return task
+
+
+def test_task_store_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        TaskStore()
+
+
+def test_memory_store_evicts_least_recently_used_finished_tasks():
+    store = InMemoryTaskStore(max_tasks=2, ttl=None)
+    for task_id in ("a", "b"):
+        task = finished_task(task_id)
+        store.add(task)
+        store.save(task)
+    
+    # Touch "a" so "b" is the least recently used
+    assert store.get("a") is not None
+    
+    task = finished_task("c")
+    store.add(task)
+    store.save(task)
+    
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.get("c") is not None
+    assert len(store) == 2
+
+
+def test_memory_store_keeps_running_tasks():
+    store = InMemoryTaskStore(max_tasks=1, ttl=None)
+    running = Task("running", {"prompt": "running"})
+    store.add(running)
+    
+    for task_id in ("a", "b", "c"):
+        task = finished_task(task_id)
+        store.add(task)
+        store.save(task)
+    
+    # save() ignores unfinished tasks; they are never evicted
+    store.save(running)
+    assert store.get("running") is running
+    assert len(store) == 2
+
+
+def test_memory_store_expires_finished_tasks():
+    store = InMemoryTaskStore(max_tasks=10, ttl=60)
+    stale = finished_task("stale", completed_at=datetime.now() - timedelta(seconds=120))
+    fresh = finished_task("fresh")
+    for task in (stale, fresh):
+        store.add(task)
+        store.save(task)
+    
+    assert store.get("stale") is None
+    assert store.get("fresh") is fresh
+
+
+def test_sqlite_store_round_trip(tmp_path):
+    path = tmp_path / "tasks.db"
+    store = SQLiteTaskStore(db_path=str(path), ttl=None)
+    task = finished_task("a")
+    store.add(task)
+    store.save(task)
+    store.close()
+    
+    # A new store on the same file sees the finished task
+    reopened = SQLiteTaskStore(db_path=str(path), ttl=None)
+    loaded = reopened.get("a")
+    reopened.close()
+    
+    assert loaded is not task
+    assert loaded.status == TaskStatus.COMPLETED
+    assert loaded.result == {"answer": "a"}
+    assert loaded.request == {"prompt": "a"}
+
+
+def test_sqlite_store_purges_expired_tasks(tmp_path):
+    store = SQLiteTaskStore(db_path=str(tmp_path / "tasks.db"), ttl=60)
+    stale = finished_task("stale", completed_at=datetime.now() - timedelta(seconds=120))
+    store.add(stale)
+    store.save(stale)
+    
+    store.purge_expired()
+    
+    assert store.get("stale") is None
+    assert len(store) == 0
+    store.close()
+
+
+def test_create_task_store_rejects_unknown_backend():
+    assert isinstance(create_task_store("memory"), InMemoryTaskStore)
+    with pytest.raises(ValueError):
+        create_task_store("redis")
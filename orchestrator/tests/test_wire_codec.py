@@ -0,0 +1,117 @@
+"""
+Tests for extension bridge message framing
+"""
+
+import asyncio
+import json
+
+import pytest
+
+from services.extension_bridge_v2 import ExtensionBridge
+from services.wire_codec import FLAG_COMPRESSED, WireCodec
+
+msgpack = pytest.importorskip("msgpack")
+zstandard = pytest.importorskip("zstandard")
+
+
+MESSAGE = {
+    "type": "response",
+    "command_id": "abc",
+    "success": True,
+    "data": {"html": "<p>hello</p>" * 10, "count": 3, "ratio": 0.5, "tags": ["a", "b"], "missing": None}
+}
+
+
+def test_extension_without_hello_details_gets_json():
+    codec = WireCodec.negotiate({"type": "hello"})
+    assert codec.encoding == "json"
+    assert codec.compression is None
+
+
+def test_negotiation_picks_msgpack_and_zstd_when_offered():
+    codec = WireCodec.negotiate({"encodings": ["msgpack", "json"], "compression": ["zstd"]})
+    assert codec.describe() == {"encoding": "msgpack", "compression": "zstd", "compression_threshold": 16384}
+
+
+def test_binary_frames_can_be_disabled():
+    codec = WireCodec.negotiate({"encodings": ["msgpack", "json"]}, binary_frames=False)
+    assert codec.encoding == "json"
+
+
+def test_json_round_trip():
+    codec = WireCodec()
+    frame = codec.encode(MESSAGE)
+    assert isinstance(frame, str)
+    assert codec.decode(frame) == MESSAGE
+
+
+def test_msgpack_round_trip():
+    codec = WireCodec("msgpack")
+    frame = codec.encode(MESSAGE)
+    assert isinstance(frame, bytes)
+    assert frame[0] == 0
+    assert codec.decode(frame) == MESSAGE
+
+
+def test_large_frames_are_compressed():
+    codec = WireCodec("msgpack", "zstd", compression_threshold=1024)
+    small = codec.encode({"command_id": "a"})
+    large_message = {"command_id": "b", "data": "repeated text " * 1000}
+    large = codec.encode(large_message)
+    
+    assert not small[0] & FLAG_COMPRESSED
+    assert large[0] & FLAG_COMPRESSED
+    assert len(large) < len(json.dumps(large_message)) / 10
+    assert codec.decode(large) == large_message
+
+
+def test_text_frames_are_accepted_after_switching_to_binary():
+    codec = WireCodec("msgpack", "zstd")
+    assert codec.decode(json.dumps(MESSAGE)) == MESSAGE
+
+
+def test_stats_count_frames_and_bytes():
+    codec = WireCodec("msgpack")
+    frame = codec.encode(MESSAGE)
+    codec.decode(frame)
+    assert codec.stats == {"frames_out": 1, "bytes_out": len(frame), "frames_in": 1, "bytes_in": len(frame)}
+
+
+def test_empty_binary_frame_is_rejected():
+    with pytest.raises(ValueError):
+        WireCodec("msgpack").decode(b"")
+
+
+class RecordingSocket:
+    """WebSocket stand-in that records text and binary frames"""
+    
+    def __init__(self):
+        self.frames = []
+    
+    async def send_text(self, frame):
+        self.frames.append(frame)
+    
+    async def send_bytes(self, frame):
+        self.frames.append(frame)
+
+
+def test_bridge_switches_to_binary_frames_after_hello():
+    async def scenario():
+        bridge = ExtensionBridge()
+        socket = RecordingSocket()
+        await bridge.register_connection(socket, "c")
+        await bridge.handle_hello("c", {"type": "hello", "encodings": ["msgpack", "json"]})
+        
+        command = asyncio.create_task(bridge.send_command({"action": "INVISIBLE_BROWSE"}, timeout=5))
+        await asyncio.sleep(0.01)
+        command.cancel()
+        await asyncio.gather(command, return_exceptions=True)
+        return socket.frames
+    
+    frames = asyncio.run(scenario())
+    acks = [json.loads(frame) for frame in frames if isinstance(frame, str)]
+    binary = [frame for frame in frames if isinstance(frame, bytes)]
+    
+    # The acknowledgement is JSON; the command after it is MessagePack
+    assert acks[-1]["type"] == "hello_ack" and acks[-1]["encoding"] == "msgpack"
+    assert WireCodec("msgpack").decode(binary[0])["action"] == "INVISIBLE_BROWSE"
@@ -0,0 +1,23 @@
+"""
+Statistics helpers
+Shared by the services that report latency percentiles
+"""
+
+from typing import List, Optional
+
+
+def percentile(ordered: List[float], fraction: float) -> Optional[float]:
+    """
+    Nearest-rank percentile of a sorted list
+    
+    Args:
+        ordered: Samples sorted ascending
+        fraction: Percentile as a fraction, e.g. 0.99
+    
+    Returns:
+        Sample at that rank rounded to 4 places, or None if there are no samples
+    """
+    if not ordered:
+        return None
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return round(ordered[index], 4)
@@ -0,0 +1,42 @@
+"""
+URL helpers
+Shared by the caches and the task queue so equivalent URLs match everywhere
+"""
+
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "igshid", "mc_cid", "mc_eid", "ref_src", "si"}
+
+DEFAULT_PORTS = {"http": "80", "https": "443"}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so equivalent spellings compare equal
+    
+    Lowercases scheme and host, drops default ports, fragments and
+    tracking parameters (utm_* and friends), sorts the query and strips a
+    trailing slash from the path.
+    
+    Args:
+        url: URL as given in a request or plan
+    
+    Returns:
+        Normalized URL
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    
+    if parts.port and str(parts.port) != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+    
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
@@ -0,0 +1,128 @@
+"""
+Task Worker
+Runs queued tasks from the shared broker in separate processes
+
+Start the API with TASK_BROKER_PATH set, then start workers on the same
+machine with the same setting:
+
+    python worker.py --processes 4
+
+Worker IDs are derived from --name, so a restarted group picks up the
+tasks its crashed processes left running and resumes them from their
+checkpoints. Tasks of workers that never come back are requeued once
+their lease (TASK_LEASE_SECONDS) runs out.
+
+The browser extension stays connected to the API process only. Workers
+queue their browser actions in the broker and the API process relays
+them to the extension, so at least one API process must be running.
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import signal
+
+from config import settings
+
+
+async def run_worker(worker_id: str, concurrency: int):
+    """
+    Claim and execute tasks until the process is stopped
+    
+    Args:
+        worker_id: Identifier of this worker process
+        concurrency: Maximum tasks run at once in this process
+    """
+    # Imported here so each process builds its own agent and broker connection
+    from agent.graph import BrowsingAgent
+    from services.broker_bridge import BrokerExtensionBridge
+    from services.task_broker import SQLiteTaskBroker
+    from services.task_queue import TaskQueue
+    
+    broker = SQLiteTaskBroker(settings.task_broker_path, lease=settings.task_lease_seconds)
+    queue = TaskQueue(max_concurrent=concurrency, coalesce=False, broker=broker)
+    # Browser actions go through the API process, which holds the extension
+    agent = BrowsingAgent(BrokerExtensionBridge(broker, worker_id))
+    
+    # Pick up tasks a previous process with this ID left running
+    requeued = broker.requeue_worker(worker_id)
+    if requeued:
+        print(f"Worker {worker_id} requeued {requeued} interrupted tasks")
+    
+    # Stop gracefully on terminate so running tasks are reported as cancelled
+    consumer = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, consumer.cancel)
+    
+    print(f"Worker {worker_id} started (concurrency {concurrency})")
+    
+    try:
+        await queue.consume_broker(agent, worker_id)
+    except asyncio.CancelledError:
+        pass
+    finally:
+        # Running tasks write their cancellation back before the broker closes
+        await queue.shutdown()
+        broker.close()
+        print(f"Worker {worker_id} stopped")
+
+
+def worker_main(worker_id: str, concurrency: int):
+    """Process entry point"""
+    # Ctrl+C is handled by the parent, which terminates the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    asyncio.run(run_worker(worker_id, concurrency))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run task worker processes")
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Number of worker processes (default: CPU count)"
+    )
+    parser.add_argument(
+        "--name",
+        default="worker",
+        help="Worker group name; restarting a group with the same name and "
+             "process count resumes the tasks it left running"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.max_concurrent_tasks,
+        help="Concurrent tasks per process"
+    )
+    args = parser.parse_args()
+    
+    if not settings.task_broker_path:
+        parser.error("TASK_BROKER_PATH must be set to share the queue with the API")
+    
+    processes = [
+        multiprocessing.Process(
+            target=worker_main,
+            args=(f"{args.name}-{index}", args.concurrency),
+            daemon=True
+        )
+        for index in range(args.processes)
+    ]
+    
+    for process in processes:
+        process.start()
+    
+    print(f"Started {len(processes)} worker processes")
+    
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        print("Stopping workers...")
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()